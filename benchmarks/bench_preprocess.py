@@ -0,0 +1,292 @@
+"""
+Before/after benchmark for the preprocessing stage.
+
+Runs the original notebook implementation (data/preprocess_6_congress.ipynb,
+reproduced below without its file I/O) and src/preprocess.py on the same
+input, reporting wall time and peak traced memory for each, and checks that
+both produce the same outcomes and features.
+
+Usage:
+    python benchmarks/bench_preprocess.py --csv data/bills_with_features_full.csv
+    python benchmarks/bench_preprocess.py --synthetic 76897 --json bench_preprocess.json
+"""
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import preprocess
+
+FULL_DATASET_ROWS = 76897
+
+# --- Original notebook implementation -------------------------------------------
+
+def legacy_calculate_smart_days_active(df):
+    df['introduced_date'] = pd.to_datetime(df['introduced_date'], errors='coerce')
+    df['latest_action_date'] = pd.to_datetime(df['latest_action_date'], errors='coerce')
+    df['days_to_latest_action'] = (df['latest_action_date'] - df['introduced_date']).dt.days
+    df['days_to_latest_action'] = df['days_to_latest_action'].fillna(30)
+    df['days_active'] = df['days_to_latest_action'].clip(1, 730)
+    df['legislative_velocity'] = df['action_count'] / (df['days_active'] + 1)
+    if 'days_since_introduction' in df.columns:
+        df = df.drop('days_since_introduction', axis=1)
+    return df
+
+def legacy_identify_outcomes_by_congress(df, current_date):
+    for congress, end_date in preprocess.CONGRESS_END_DATES.items():
+        congress_bills = df['congress'] == congress
+        if current_date > end_date:
+            pending = congress_bills & (df['passed'] == -1)
+            df.loc[pending, 'passed'] = 0
+            n_updated = pending.sum()
+            if n_updated > 0:
+                print(f"Congress {congress}: Marked {n_updated} pending bills as failed (congress ended)")
+
+    failed_bills = df['passed'] == 0
+    never_left_committee = failed_bills & (
+        (df['action_count'] <= 2) |
+        (df['latest_action'].str.contains('referred to', case=False, na=False))
+    )
+    df.loc[never_left_committee, 'failure_reason'] = 'died_in_committee'
+    some_progress = failed_bills & (
+        (df['action_count'] > 2) &
+        (df['action_count'] <= 10) &
+        (~never_left_committee)
+    )
+    df.loc[some_progress, 'failure_reason'] = 'stalled_in_process'
+    significant_progress = failed_bills & (
+        (df['action_count'] > 10) |
+        (df['latest_action'].str.contains('passed|reported', case=False, na=False))
+    ) & (~some_progress) & (~never_left_committee)
+    df.loc[significant_progress, 'failure_reason'] = 'failed_to_complete'
+    remaining_failed = failed_bills & (df['failure_reason'].isna())
+    df.loc[remaining_failed, 'failure_reason'] = 'congress_ended'
+
+    print(f"Passed: {(df['passed'] == 1).sum()} ({(df['passed'] == 1).mean()*100:.1f}%)")
+    print(f"Failed: {(df['passed'] == 0).sum()} ({(df['passed'] == 0).mean()*100:.1f}%)")
+    print(f"Pending: {(df['passed'] == -1).sum()}")
+    print(pd.crosstab(df['congress'], df['passed'], normalize='index') * 100)
+    return df
+
+def legacy_add_temporal_features(df):
+    df['month_introduced'] = pd.to_datetime(df['introduced_date']).dt.month
+    df['quarter_introduced'] = pd.to_datetime(df['introduced_date']).dt.quarter
+    df['year_introduced'] = pd.to_datetime(df['introduced_date']).dt.year
+    df['is_election_year'] = df['year_introduced'] % 2 == 0
+    df['is_first_session'] = df['year_introduced'] % 2 == 1
+    df['early_activity'] = df['action_count'] / (df['days_active'].clip(upper=30) + 1)
+    df['sustained_activity'] = df['action_count'] / (df['days_active'].clip(upper=180) + 1)
+    df['committee_engagement_speed'] = df['committee_count'] / (df['days_active'] / 30).clip(lower=1)
+    df = df.drop('year_introduced', axis=1)
+    return df
+
+def legacy_validate_data_quality(df):
+    duplicates = df.duplicated(subset=['bill_id'])
+    if duplicates.sum() > 0:
+        df = df[~duplicates]
+    for field in preprocess.CRITICAL_FIELDS:
+        if field in df.columns:
+            missing = df[field].isna().sum()
+            if missing > 0:
+                print(f"Missing {field}: {missing} rows")
+    for field in preprocess.NUMERIC_FIELDS:
+        if field in df.columns:
+            df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
+    for field in preprocess.BOOLEAN_FIELDS:
+        if field in df.columns:
+            df[field] = df[field].astype(bool).astype(int)
+    return df
+
+def legacy_analyze_dataset_characteristics(df):
+    for congress in sorted(df['congress'].unique()):
+        congress_df = df[df['congress'] == congress]
+        pass_rate = (congress_df['passed'] == 1).mean() * 100
+        print(f"- {congress}th Congress: {pass_rate:.1f}% ({len(congress_df)} bills)")
+    print(f"- Overall pass rate: {(df['passed'] == 1).mean() * 100:.1f}%")
+    for col in ['action_count', 'cosponsor_count', 'committee_count', 'is_bipartisan']:
+        if col in df.columns:
+            missing = df[col].isna().sum()
+            print(f"- {col}: {(1 - missing/len(df)) * 100:.1f}% complete")
+    if 'is_bipartisan' in df.columns:
+        print(df[df['is_bipartisan'] == 1]['passed'].mean() * 100)
+        print(df[df['is_bipartisan'] == 0]['passed'].mean() * 100)
+
+def legacy_pipeline(path, current_date):
+    df = pd.read_csv(path)
+    df = legacy_calculate_smart_days_active(df)
+    df = legacy_identify_outcomes_by_congress(df, current_date)
+    df = legacy_add_temporal_features(df)
+    df = legacy_validate_data_quality(df)
+    legacy_analyze_dataset_characteristics(df[df['passed'] != -1].copy())
+    return df
+
+def vectorized_pipeline(path, current_date):
+    df = preprocess.preprocess(preprocess.load_dataset(path), current_date=current_date)
+    preprocess.analyze_dataset_characteristics(df[df['passed'] != -1])
+    return df
+
+# --- Harness ------------------------------------------------------------------------
+
+def make_synthetic_dataset(path, n_rows=FULL_DATASET_ROWS, seed=42):
+    """
+    Write a CSV with the extracted dataset's columns and realistic distributions
+    """
+    rng = np.random.default_rng(seed)
+    congress = rng.choice(np.arange(113, 119), size=n_rows)
+    start_year = 2013 + (congress - 113) * 2
+    introduced = pd.to_datetime(start_year.astype(str) + '-01-03') + pd.to_timedelta(rng.integers(0, 720, n_rows), unit='D')
+    span = rng.exponential(60, n_rows).astype(int)
+    latest = introduced + pd.to_timedelta(span, unit='D')
+    action_count = rng.geometric(0.3, n_rows)
+    actions = np.array(['Referred to the Committee on Ways and Means.', 'Passed House without objection.',
+                        'Reported by the Committee on Finance.', 'Became Public Law No: 118-1.',
+                        'Introduced in House'])
+    passed = rng.choice([-1, 0, 1], size=n_rows, p=[0.6, 0.37, 0.03])
+    df = pd.DataFrame({
+        'bill_id': [f'{c}-HR-{i}' for i, c in enumerate(congress)],
+        'congress': congress,
+        'bill_type': rng.choice(['HR', 'S', 'HJRES', 'SJRES'], n_rows),
+        'bill_number': np.arange(n_rows),
+        'title': 'A bill to amend title 42 of the United States Code',
+        'introduced_date': introduced.strftime('%Y-%m-%d'),
+        'year_introduced': introduced.year,
+        'policy_area': rng.choice(['Health', 'Taxation', 'Energy', 'Unknown'], n_rows),
+        'sponsor_party': rng.choice(['D', 'R', 'I'], n_rows),
+        'sponsor_count': 1,
+        'dem_sponsors': rng.integers(0, 2, n_rows),
+        'rep_sponsors': rng.integers(0, 2, n_rows),
+        'cosponsor_count': rng.poisson(8, n_rows),
+        'original_cosponsor_count': rng.poisson(3, n_rows),
+        'is_bipartisan': rng.integers(0, 2, n_rows),
+        'committee_count': rng.integers(0, 4, n_rows),
+        'latest_action': rng.choice(actions, n_rows),
+        'latest_action_date': latest.strftime('%Y-%m-%d'),
+        'action_count': action_count,
+        'subject_count': rng.poisson(5, n_rows),
+        'title_length': rng.integers(20, 300, n_rows),
+        'passed': passed,
+        'days_since_introduction': rng.integers(100, 4000, n_rows)
+    })
+    df.to_csv(path, index=False)
+    return path
+
+def measure(fn, *args):
+    """
+    Wall time and peak traced memory for one call, with the pipeline's prints silenced.
+    Timing and tracing are separate runs since tracemalloc slows allocation-heavy code.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def expected_dtypes(before):
+    """
+    The legacy frame's dtypes with the vectorized pipeline's deliberate narrowing
+    applied: CSV_DTYPES on load, int8 flags and a categorical failure_reason
+    """
+    expected = before.dtypes.astype(str)
+    narrowed = {**preprocess.CSV_DTYPES, **{f: 'int8' for f in preprocess.BOOLEAN_FIELDS},
+                'failure_reason': 'category'}
+    for col, dtype in narrowed.items():
+        if col in expected.index:
+            expected[col] = dtype
+    return expected
+
+def check_equivalent(before, after):
+    """
+    Confirm both implementations give the same columns, with the expected
+    dtypes, and the same values in every column
+    """
+    assert list(before.columns) == list(after.columns), (
+        f"column sets differ: only before {sorted(set(before.columns) - set(after.columns))}, "
+        f"only after {sorted(set(after.columns) - set(before.columns))}")
+    mismatched = {col: (dtype, str(after[col].dtype)) for col, dtype in expected_dtypes(before).items()
+                  if str(after[col].dtype) != dtype}
+    assert not mismatched, f"unexpected dtypes (expected, got): {mismatched}"
+
+    for col in before.columns:
+        if pd.api.types.is_numeric_dtype(after[col]) or pd.api.types.is_bool_dtype(after[col]):
+            np.testing.assert_allclose(before[col].to_numpy(dtype=float, na_value=np.nan),
+                                       after[col].to_numpy(dtype=float, na_value=np.nan),
+                                       rtol=1e-5, err_msg=col)
+        else:
+            as_text = lambda values: values.astype(object).where(values.notna(), '').astype(str)
+            assert (as_text(before[col]) == as_text(after[col])).all(), col
+
+def run_benchmark(args, path, source):
+    """
+    Time both pipelines on the CSV at path and check they agree; source labels the input in the report
+    """
+    current_date = datetime(2025, 10, 1)
+    results = {}
+    outputs = {}
+    for name, fn in [('before', legacy_pipeline), ('after', vectorized_pipeline)]:
+        times = []
+        peaks = []
+        for _ in range(args.repeat):
+            outputs[name], elapsed, peak = measure(fn, path, current_date)
+            times.append(elapsed)
+            peaks.append(peak)
+        results[name] = {
+            'best_seconds': min(times),
+            'median_seconds': float(np.median(times)),
+            'peak_memory_mb': max(peaks) / 1024 ** 2,
+            'frame_memory_mb': outputs[name].memory_usage(deep=True).sum() / 1024 ** 2
+        }
+
+    check_equivalent(outputs['before'], outputs['after'])
+
+    rows = len(outputs['after'])
+    print(f"Preprocessing benchmark on {rows:,} rows ({source})")
+    print(f"{'':8} {'best (s)':>10} {'median (s)':>11} {'peak MB':>9} {'frame MB':>9}")
+    for name, r in results.items():
+        print(f"{name:8} {r['best_seconds']:10.3f} {r['median_seconds']:11.3f} "
+              f"{r['peak_memory_mb']:9.1f} {r['frame_memory_mb']:9.1f}")
+    print(f"speedup: {results['before']['best_seconds'] / results['after']['best_seconds']:.1f}x, "
+          f"peak memory: {results['after']['peak_memory_mb'] / results['before']['peak_memory_mb']:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': rows, 'source': source, 'results': results}, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark preprocessing before/after vectorization')
+    parser.add_argument('--csv', help='Extracted dataset (bills_with_features_full.csv)')
+    parser.add_argument('--synthetic', type=int, default=FULL_DATASET_ROWS,
+                        help='Rows of synthetic data to generate when --csv is not given')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    if args.csv:
+        run_benchmark(args, args.csv, args.csv)
+        return
+    # Synthetic input goes to a temporary directory, not the source tree
+    tmp_dir = tempfile.mkdtemp(prefix='bench_preprocess_')
+    try:
+        path = os.path.join(tmp_dir, f'synthetic_{args.synthetic}.csv')
+        make_synthetic_dataset(path, args.synthetic)
+        run_benchmark(args, path, 'synthetic')
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Cold-start report for the Streamlit app.
+
+Each measurement runs in a fresh interpreter with `python -X importtime`, so
+nothing is already in sys.modules:
+- the modules src/app.py imports at the top (what a container wakeup pays
+  before the page shell renders), together and one by one
+- the modules the app only imports when a panel renders
+- the heaviest packages pulled in by the eager set
+and, when the models are present, the model package load from component
+files vs the consolidated bundle (python src/scoring.py --bundle).
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 1500 --json bench_startup.json
+"""
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+APP_PATH = os.path.join(SRC_DIR, 'app.py')
+# Imported lazily by src modules rather than by app.py itself
+LAZY_DEPENDENCIES = ['sklearn.ensemble']  # scoring, when rebuilding an ensemble
+
+def app_imports(path=APP_PATH):
+    """
+    (eager, deferred) non-stdlib modules imported by app.py: eager ones at the
+    top of the script, deferred ones inside the functions and blocks that use them
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    def modules(nodes):
+        names = []
+        for node in nodes:
+            if isinstance(node, ast.Import):
+                names += [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                names.append(node.module)
+        return [name for name in dict.fromkeys(names) if name.split('.')[0] not in sys.stdlib_module_names]
+
+    top_level = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    nested = [node for node in ast.walk(tree) if isinstance(node, (ast.Import, ast.ImportFrom)) and node not in top_level]
+    eager = modules(top_level)
+    return eager, [name for name in modules(nested) if name not in eager]
+
+def run_importtime(modules):
+    """
+    Import modules in a fresh interpreter. Returns [(name, depth, cumulative_ms)]
+    from the -X importtime log, or raises ImportError with the failure.
+    """
+    code = '; '.join(f'import {m}' for m in modules) or 'pass'
+    env = dict(os.environ, PYTHONPATH=SRC_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.rstrip()[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(cumulative_us) / 1000))
+    return entries
+
+def importtime(modules, repeat=3):
+    """
+    Best-of-repeat ms to import these modules in a fresh interpreter, excluding
+    what the bare interpreter imports at startup (site, encodings, ...)
+    """
+    def once(mods):
+        return sum(ms for _, depth, ms in run_importtime(mods) if depth == 0)
+    baseline = min(once([]) for _ in range(repeat))
+    return min(once(modules) for _ in range(repeat)) - baseline
+
+def heaviest_packages(modules, top=10):
+    """
+    Top-level packages pulled in by these modules, by cumulative ms
+    """
+    packages = {}
+    startup = {name for name, _, _ in run_importtime([])}
+    for name, _, ms in run_importtime(modules):
+        if '.' not in name and name not in startup:
+            packages[name] = max(packages.get(name, 0), ms)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+def model_load_times():
+    """
+    Package load time from component files and from the bundle, in a fresh interpreter each
+    """
+    times = {}
+    for label, use_bundle in [('component_files', False), ('bundle', True)]:
+        code = ('import time; t = time.perf_counter(); import scoring; '
+                f'scoring.load_model_package(use_bundle={use_bundle}); print(time.perf_counter() - t)')
+        if use_bundle:
+            code = f'import scoring, sys; sys.exit(3) if not scoring.bundle_is_current() else None; {code}'
+        env = dict(os.environ, PYTHONPATH=SRC_DIR)
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                env=env, cwd=os.path.join(SRC_DIR, '..'))
+        if result.returncode == 0:
+            times[label] = float(result.stdout.strip().splitlines()[-1])
+        elif result.returncode == 3:
+            times[label] = 'no bundle (run python src/scoring.py --bundle)'
+        else:
+            times[label] = 'unavailable: ' + result.stderr.strip().splitlines()[-1]
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time and model-load report for the app')
+    parser.add_argument('--budget-ms', type=float, help='Fail if the eager imports take longer than this')
+    parser.add_argument('--top', type=int, default=10, help='Heaviest packages to list')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    parser.add_argument('--skip-models', action='store_true')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    eager_modules, deferred_modules = app_imports()
+    deferred_modules += LAZY_DEPENDENCIES
+    report = {'eager': {}, 'deferred': {}}
+    available = []
+    print("Eager imports (paid before the page renders):")
+    for module in eager_modules:
+        try:
+            total = importtime([module], args.repeat)
+        except ImportError as e:
+            print(f"  {module:<24} not importable ({str(e)})")
+            continue
+        available.append(module)
+        report['eager'][module] = total
+        print(f"  {module:<24} {total:8.1f} ms alone")
+
+    eager_total = importtime(available, args.repeat)
+    report['eager_total_ms'] = eager_total
+    print(f"  {'all together':<24} {eager_total:8.1f} ms")
+
+    print("\nDeferred imports (paid when their panel first renders):")
+    for module in deferred_modules:
+        try:
+            total = importtime(available + [module], args.repeat)
+        except ImportError as e:
+            print(f"  {module:<24} not importable ({str(e)})")
+            continue
+        report['deferred'][module] = total - eager_total
+        print(f"  {module:<24} {total - eager_total:+8.1f} ms on top of the eager set")
+
+    print("\nHeaviest packages in the eager set:")
+    heaviest = heaviest_packages(available, args.top)
+    report['heaviest'] = dict(heaviest)
+    for name, ms in heaviest:
+        print(f"  {name:<24} {ms:8.1f} ms")
+
+    if not args.skip_models:
+        report['model_load_s'] = model_load_times()
+        print("\nModel package load:")
+        for label, value in report['model_load_s'].items():
+            print(f"  {label:<24} {value:.2f} s" if isinstance(value, float) else f"  {label:<24} {value}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.budget_ms is not None and eager_total > args.budget_ms:
+        print(f"\nOver budget: eager imports took {eager_total:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Offline benchmark suite for the app's hot paths.
+
+Everything runs without network access: API calls go to src/local_api.py
+serving the fixtures in benchmarks/fixtures (one 500-action, 150-cosponsor
+bill, 118/hr/9001, regenerated with --write-fixtures) or another fixture
+root given with --fixtures, e.g. one written by
+`python src/local_api.py --record ...`. Models are the shipped models/*
+artifacts (or --model-dir).
+
+Benchmarks:
+- fetch:     fetch_comprehensive_bill_data latency at each --delays value
+             (simulated per-request network latency)
+- features:  build_feature_frame for 1, 1k and 76,897 bills
+- inference: predict_stage throughput per model/stage at batch 1 and 1k
+- load:      load_model_package cold time and RSS in a fresh interpreter,
+             from the component files and from the bundle
+- timeline:  build_timeline for a 500-action bill
+
+Results are written as JSON (--json); --compare flags results more than
+--tolerance slower than a previous run and exits non-zero if any are.
+
+Usage:
+    python benchmarks/bench_suite.py --json bench_results.json
+    python benchmarks/bench_suite.py --only fetch,timeline --delays 0 0.05
+    python benchmarks/bench_suite.py --json new.json --compare bench_results.json
+    python benchmarks/bench_suite.py --only fetch --fixtures recorded/ --bill 118/hr/1234
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import subprocess
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_BILL = '118/hr/9001'
+
+FULL_DATASET_ROWS = 76897
+BENCHMARKS = ['fetch', 'features', 'inference', 'load', 'timeline']
+
+def measure(func, repeat=5, warmup=1):
+    """
+    Run func repeat times after warmup runs; returns timing stats in ms
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    times = np.array(times)
+    return {
+        'median_ms': float(np.median(times)),
+        'p95_ms': float(np.percentile(times, 95)),
+        'min_ms': float(times.min()),
+        'repeat': repeat
+    }
+
+# --- Synthetic inputs -----------------------------------------------------------
+
+def synthetic_actions(n, seed=0):
+    """
+    Raw API action records spanning about two years, newest first
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime(2023, 1, 3)
+    days = np.sort(rng.integers(0, 700, n))[::-1]
+    texts = ['Referred to the Committee on Energy and Commerce.', 'Introduced in House',
+             'Ordered to be Reported', 'Committee Hearings Held', 'Motion to reconsider laid on the table',
+             'Received in the Senate and Read twice and referred to the Committee on Finance.']
+    return [{
+        'actionDate': (start + timedelta(days=int(d))).strftime('%Y-%m-%d'),
+        'text': f"{texts[i % len(texts)]} ({i})",
+        'type': 'Committee',
+        'sourceSystem': {'name': 'House floor actions' if i % 3 else 'Senate'},
+        'committees': [{'name': 'Energy and Commerce Committee'}] if i % 4 == 0 else []
+    } for i, d in enumerate(days)]
+
+def write_synthetic_fixtures(root, bill=FIXTURE_BILL, actions=500, cosponsors=150, seed=0):
+    """
+    Write one bill with many actions and cosponsors in the local_api fixture layout
+    """
+    rng = np.random.default_rng(seed)
+    congress, bill_type, number = bill.split('/')
+    base = os.path.join(root, 'bill', congress, bill_type)
+    os.makedirs(os.path.join(base, number), exist_ok=True)
+
+    def write(name, payload):
+        with open(os.path.join(base, name), 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+
+    write(f'{number}.json', {'bill': {
+        'congress': int(congress), 'type': bill_type.upper(), 'number': number,
+        'title': 'Synthetic Benchmark Act of 2023', 'introducedDate': '2023-01-03', 'updateDate': '2024-12-01',
+        'policyArea': {'name': 'Energy'},
+        'sponsors': [{'fullName': 'Rep. Sponsor [D-NY-1]', 'party': 'D', 'state': 'NY', 'bioguideId': 'S000001'}],
+        'cosponsors': {'count': cosponsors}, 'committees': {'count': 2},
+        'latestAction': {'actionDate': '2024-12-01', 'text': 'Received in the Senate.'}
+    }})
+    write(f'{number}/actions.json', {'actions': synthetic_actions(actions, seed)})
+    write(f'{number}/cosponsors.json', {'cosponsors': [{
+        'fullName': f'Rep. Member {i}', 'party': 'DR'[i % 2], 'state': 'NY', 'district': i % 20 + 1,
+        'sponsorshipDate': '2023-01-03', 'isOriginalCosponsor': bool(i < 10), 'bioguideId': f'M{i:06d}'
+    } for i in range(cosponsors)]})
+    write(f'{number}/subjects.json', {'subjects': {
+        'legislativeSubjects': [{'name': f'Subject {i}'} for i in range(int(rng.integers(5, 30)))],
+        'policyArea': {'name': 'Energy'}
+    }})
+    write(f'{number}/titles.json', {'titles': [{'titleType': 'Short Title(s) as Introduced',
+                                                 'title': 'Synthetic Benchmark Act'}]})
+    write(f'{number}/text.json', {'textVersions': [{
+        'type': 'Introduced in House', 'date': '2023-01-03T05:00:00Z',
+        'formats': [{'type': 'Formatted Text', 'url': 'http://127.0.0.1/text/synthetic.htm'}]
+    }]})
+    return bill
+
+def synthetic_training_frame(n, label_encoders, seed=0):
+    """
+    Training-set-shaped bills for similar_bills.historical_raw_features
+    """
+    rng = np.random.default_rng(seed)
+    parties = list(label_encoders['party'].classes_)
+    policies = list(label_encoders['policy'].classes_)
+    return pd.DataFrame({
+        'sponsor_party': rng.choice(parties, n),
+        'policy_area': rng.choice(policies, n),
+        'dem_sponsors': rng.integers(0, 2, n),
+        'rep_sponsors': rng.integers(0, 2, n),
+        'ind_sponsors': np.zeros(n, dtype=int),
+        'cosponsor_count': rng.poisson(8, n),
+        'dem_cosponsors': rng.poisson(4, n),
+        'rep_cosponsors': rng.poisson(4, n),
+        'original_cosponsor_count': rng.poisson(3, n),
+        'title_length': rng.integers(20, 400, n),
+        'title_word_count': rng.integers(3, 60, n),
+        'subject_count': rng.integers(1, 20, n),
+        'is_bipartisan': rng.integers(0, 2, n),
+        'days_active': rng.integers(1, 730, n),
+        'action_count': rng.integers(1, 60, n),
+        'committee_count': rng.integers(0, 4, n),
+        'congress': rng.integers(113, 119, n),
+        'month_introduced': rng.integers(1, 13, n),
+        'quarter_introduced': rng.integers(1, 5, n),
+        'is_election_year': rng.integers(0, 2, n)
+    })
+
+# --- Benchmarks -----------------------------------------------------------------
+
+def bench_fetch(args):
+    import data_fetch
+    import local_api
+
+    fixtures, bill = args.fixtures, args.bill
+    congress, bill_type, number = bill.split('/')
+    results = {}
+    original_base = data_fetch.CONGRESS_API_BASE
+    try:
+        for delay in args.delays:
+            server = local_api.serve(fixtures, port=0, delay=delay, background=True)
+            data_fetch.CONGRESS_API_BASE = f'http://127.0.0.1:{server.server_port}/v3'
+            try:
+                def run():
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        data = data_fetch.fetch_comprehensive_bill_data(number, int(congress), bill_type)
+                    assert data is not None, f"No fixture data for {bill}"
+                stats = measure(run, repeat=args.repeat)
+            finally:
+                server.shutdown()
+                server.server_close()
+            results[f'fetch_comprehensive_bill_data[delay={delay * 1000:g}ms]'] = stats
+    finally:
+        data_fetch.CONGRESS_API_BASE = original_base
+    return results
+
+def bench_features(args, label_encoders):
+    from features import build_feature_frame
+    from similar_bills import historical_raw_features
+
+    raw = historical_raw_features(synthetic_training_frame(FULL_DATASET_ROWS, label_encoders))
+    results = {}
+    for n in [1, 1000, FULL_DATASET_ROWS]:
+        batch = raw.iloc[:n]
+        repeat = args.repeat if n < FULL_DATASET_ROWS else max(1, args.repeat // 2)
+        stats = measure(lambda: build_feature_frame(batch, label_encoders), repeat=repeat)
+        stats['rows_per_s'] = n / (stats['median_ms'] / 1000)
+        results[f'build_feature_frame[n={n}]'] = stats
+    return results
+
+def bench_inference(args, package):
+    from features import build_feature_frame
+    from similar_bills import historical_raw_features
+    from scoring import STAGES, predict_stage
+
+    label_encoders = package['label_encoders']
+    features_df = build_feature_frame(historical_raw_features(synthetic_training_frame(1000, label_encoders)),
+                                      label_encoders)
+    results = {}
+    for model_type in ['viability', 'passage']:
+        for stage in STAGES:
+            model = package[f'{model_type}_models'][stage]
+            for n in [1, 1000]:
+                batch = features_df.iloc[:n]
+                stats = measure(lambda: predict_stage(model, batch), repeat=args.repeat)
+                stats['bills_per_s'] = n / (stats['median_ms'] / 1000)
+                results[f'predict_stage[{model_type}/{stage}, n={n}]'] = stats
+    return results
+
+def bench_load(args):
+    """
+    Cold load in a fresh interpreter: wall time and RSS growth
+    """
+    code = f"""
+import sys, json, time, resource
+sys.path.insert(0, {SRC_DIR!r})
+import scoring
+use_bundle = sys.argv[1] == 'bundle'
+if use_bundle and not scoring.bundle_is_current({args.model_dir!r}, {args.data_dir!r}):
+    sys.exit(3)
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+before = rss_mb()
+start = time.perf_counter()
+scoring.load_model_package({args.model_dir!r}, {args.data_dir!r}, use_bundle=use_bundle)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'cold_ms': elapsed * 1000, 'rss_mb': rss_mb(), 'rss_growth_mb': rss_mb() - before}}))
+"""
+    results = {}
+    for source in ['components', 'bundle']:
+        runs = []
+        for _ in range(max(1, args.repeat // 2)):
+            proc = subprocess.run([sys.executable, '-W', 'ignore', '-c', code, source],
+                                  capture_output=True, text=True, cwd=os.path.join(SRC_DIR, '..'))
+            if proc.returncode == 3:
+                print(f"  load[{source}]: no current bundle (python src/scoring.py --bundle)")
+                break
+            if proc.returncode != 0:
+                print(f"  load[{source}]: failed: {proc.stderr.strip().splitlines()[-1]}")
+                break
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        if runs:
+            results[f'load_model_package[{source}]'] = {
+                'median_ms': float(np.median([r['cold_ms'] for r in runs])),
+                'rss_mb': float(np.median([r['rss_mb'] for r in runs])),
+                'rss_growth_mb': float(np.median([r['rss_growth_mb'] for r in runs])),
+                'repeat': len(runs)
+            }
+    return results
+
+def bench_timeline(args):
+    from timeline import build_timeline
+
+    actions = pd.DataFrame([{
+        'date': pd.Timestamp(a['actionDate']), 'text': a['text'], 'source_system': a['sourceSystem']['name']
+    } for a in synthetic_actions(500)])
+    stats = measure(lambda: build_timeline(actions.copy()), repeat=args.repeat)
+    return {'build_timeline[actions=500]': stats}
+
+# --- Driver ---------------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=SRC_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path, tolerance):
+    """
+    Print each result against a baseline run; returns the names that regressed
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    print(f"\nAgainst {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['median_ms'], stats['median_ms']
+        change = (new - old) / old if old else 0.0
+        flag = ' REGRESSION' if change > tolerance else ''
+        print(f"  {name:<55} {old:10.2f} -> {new:10.2f} ms ({change:+.0%}){flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for fetch, features, inference, load and timeline')
+    parser.add_argument('--only', help=f'Comma-separated subset of {",".join(BENCHMARKS)}')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Fixture root in the local_api layout')
+    parser.add_argument('--bill', default=FIXTURE_BILL, help='CONGRESS/TYPE/NUMBER in --fixtures')
+    parser.add_argument('--write-fixtures', action='store_true',
+                        help=f'Regenerate the synthetic bill {FIXTURE_BILL} under --fixtures and exit')
+    parser.add_argument('--delays', type=float, nargs='+', default=[0.0, 0.05],
+                        help='Simulated per-request latency in seconds')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help='Compare against a previous --json run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown before flagging (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_synthetic_fixtures(args.fixtures)
+        print(f"Wrote {FIXTURE_BILL} under {args.fixtures}")
+        return
+
+    selected = args.only.split(',') if args.only else BENCHMARKS
+    results = {}
+
+    if 'fetch' in selected:
+        results.update(bench_fetch(args))
+    if 'features' in selected or 'inference' in selected:
+        import joblib
+        label_encoders = joblib.load(os.path.join(args.model_dir, 'metadata.pkl'))['label_encoders']
+        if 'features' in selected:
+            results.update(bench_features(args, label_encoders))
+        if 'inference' in selected:
+            from scoring import load_model_package
+            try:
+                results.update(bench_inference(args, load_model_package(args.model_dir, args.data_dir)))
+            except (FileNotFoundError, KeyError) as e:
+                print(f"  inference: skipped, models unavailable ({str(e)})")
+    if 'load' in selected:
+        results.update(bench_load(args))
+    if 'timeline' in selected:
+        results.update(bench_timeline(args))
+
+    for name, stats in results.items():
+        extra = ', '.join(f"{k} {v:,.1f}" for k, v in stats.items() if k not in ('median_ms', 'p95_ms', 'min_ms', 'repeat'))
+        p95 = f" (p95 {stats['p95_ms']:.2f})" if 'p95_ms' in stats else ''
+        print(f"{name:<55} {stats['median_ms']:10.2f} ms{p95}{'  ' + extra if extra else ''}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,63 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.express as px
 import os
-from sklearn.ensemble import VotingClassifier
-from sklearn.calibration import CalibratedClassifierCV
 
 # Import data fetch functions
 from data_fetch import (fetch_bill, fetch_bill_actions, fetch_public_comments, 
                        fetch_comprehensive_bill_data, fetch_cosponsors, fetch_subjects)
+from records import Action
+from features import raw_features_from_bill, build_feature_frame
+from timeline import build_timeline
+from scoring import load_model_package
+from trajectory import score_trajectory, trajectory_figure
+from compare import parse_bill_refs, compare_bills, comparison_figure
+from embeddings import EMBEDDING_DIR, EmbeddingCache
+from telemetry import span, start_trace
+import ratelimit
+# Plotly, similar_bills and scipy (explain) are imported where their panels render,
+# so the page shell comes up before any of them load
+
+def timed_predict(stage_model, member, X, target):
+    """Class-1 probability from one ensemble member, timed as a predict_proba span"""
+    with span('predict_proba', target=target, model=member):
+        return stage_model[member].predict_proba(X)[0, 1]
+
+def show_request_timing(request_trace, model_package=None):
+    """Timing waterfall for this request, hidden unless the URL has ?debug=1"""
+    if st.query_params.get('debug') == '1':
+        with st.expander("⏱️ Request Timing", expanded=True):
+            timings = request_trace.to_frame()
+            st.caption(f"{len(timings)} spans, {request_trace.elapsed_ms:.0f} ms total")
+            limiter = ratelimit.get_limiter()
+            if limiter is not None:
+                usage = limiter.quota_usage()
+                st.caption(f"API budget: {usage['requests']} requests in the last hour "
+                           f"({usage['budget_used']:.0%} of {usage['requests_per_hour']:.0f}), "
+                           f"{usage['tokens']:.0f} tokens available")
+            for name, encoder in ((model_package or {}).get('label_encoders') or {}).items():
+                drift = encoder.drift()
+                if drift['unseen']:
+                    st.caption(f"Encoder '{name}': {drift['unseen']} of {drift['encoded']} values since the models "
+                               f"loaded were not seen in training (scored as Unknown): {drift['top_unseen'][:5]}")
+            if not timings.empty:
+                import plotly.graph_objects as go
+                labels = [f"{row.span} ({', '.join(str(v) for v in row.attrs.values())})" if row.attrs else row.span
+                          for row in timings.itertuples()]
+                fig_timing = go.Figure(go.Bar(
+                    y=labels,
+                    x=timings['duration_ms'],
+                    base=timings['start_ms'],
+                    orientation='h',
+                    marker_color=['#d62728' if error else '#1f77b4' for error in timings['error']],
+                    hovertemplate='%{y}<br>start %{base:.1f} ms, %{x:.1f} ms<extra></extra>'
+                ))
+                fig_timing.update_yaxes(autorange='reversed')
+                fig_timing.update_layout(height=max(250, 24 * len(timings)), xaxis_title='ms since request start',
+                                         margin=dict(l=10, r=10, t=10, b=10))
+                st.plotly_chart(fig_timing, use_container_width=True)
+                st.dataframe(timings.drop(columns='attrs').round(1), hide_index=True)
 
 # Page configuration
 st.set_page_config(
@@ -73,6 +119,94 @@ with st.sidebar:
     - Varies by Congress (1.7%-3.8%)
     """)
 
+# Load models from optimized split component files (shared by both modes)
+@st.cache_resource
+def load_models():
+    """Load models from optimized split component files"""
+    try:
+        return load_model_package()
+    except FileNotFoundError as e:
+        st.error(str(e))
+        return None
+    except Exception as e:
+        st.error(f"Error loading models: {str(e)}")
+        import traceback
+        st.code(traceback.format_exc())
+        return None
+
+compare_mode = st.toggle("Compare several bills", value=False)
+
+if compare_mode:
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        refs_input = st.text_area('Bills to compare', placeholder='e.g., HR 1234, S 567, 117/hr/3076 (comma or one per line)')
+    with col2:
+        congress = st.number_input('Congress', min_value=110, max_value=120, value=118,
+                                   help='Used for references without a congress')
+    
+    if refs_input:
+        try:
+            refs = parse_bill_refs(refs_input, congress)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        
+        request_trace = start_trace(f"compare-{len(refs)}")
+        with st.spinner(f'Fetching and scoring {len(refs)} bills...'):
+            with span('load_models'):
+                model_package = load_models()
+            if model_package is None:
+                st.stop()
+            comparison, errors = compare_bills(refs, model_package)
+        
+        for label, error in errors.items():
+            st.warning(f"{label}: {error}")
+        
+        if len(comparison):
+            st.subheader(f"📊 Comparing {len(comparison)} Bills")
+            ranked = comparison.sort_values('viability', ascending=False)
+            table = ranked.assign(
+                viability=ranked['viability'] * 100,
+                passage=ranked['passage'] * 100,
+                overall_chance=ranked['overall_chance'] * 100
+            )[['bill', 'title', 'sponsor', 'status', 'stage', 'viability', 'passage', 'overall_chance',
+               'days_active', 'cosponsor_count', 'action_count', 'committee_count', 'bipartisan_score',
+               'policy_area', 'latest_action_date']]
+            st.dataframe(
+                table,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'bill': 'Bill',
+                    'title': st.column_config.TextColumn('Title', width='large'),
+                    'sponsor': 'Sponsor',
+                    'status': 'Status',
+                    'stage': 'Model',
+                    'viability': st.column_config.ProgressColumn('Viability', format='%.1f%%', min_value=0, max_value=100),
+                    'passage': st.column_config.NumberColumn('Passage (if viable)', format='%.1f%%'),
+                    'overall_chance': st.column_config.NumberColumn('Overall', format='%.2f%%'),
+                    'days_active': 'Days Active',
+                    'cosponsor_count': 'Cosponsors',
+                    'action_count': 'Actions',
+                    'committee_count': 'Committees',
+                    'bipartisan_score': st.column_config.NumberColumn('Bipartisan', format='%.2f'),
+                    'policy_area': 'Policy Area',
+                    'latest_action_date': 'Latest Action'
+                }
+            )
+            with span('chart', chart='comparison'):
+                st.plotly_chart(comparison_figure(ranked), use_container_width=True)
+            st.caption("Scores are the raw model output for each bill's current stage; "
+                       "bills that already became law are not adjusted as they are in the single-bill view.")
+            st.download_button(
+                label="Download comparison as CSV",
+                data=comparison.to_csv(index=False),
+                file_name="bill_comparison.csv",
+                mime="text/csv"
+            )
+        show_request_timing(request_trace, model_package)
+    st.stop()
+
 # Main input
 col1, col2, col3 = st.columns([2, 1, 1])
 with col1:
@@ -92,8 +226,11 @@ with st.expander("📊 Display Options"):
     with col2:
         show_feature_analysis = st.checkbox("Show feature importance", value=True)
         show_similar_bills = st.checkbox("Show similar bills analysis", value=False)
+        show_trajectory = st.checkbox("Show score trajectory", value=True)
 
 if bill_input:
+    request_trace = start_trace(f"{bill_type}{bill_input}-{congress}")
+    model_package = None
     try:
         # Fetch bill data
         with st.spinner('Fetching bill information...'):
@@ -105,9 +242,8 @@ if bill_input:
                 st.error("Could not fetch bill data. Please check the bill number.")
                 st.stop()
             
-            df = comprehensive_data['bill_info']
-            actions_df = comprehensive_data['actions']
-            cosponsors_df = comprehensive_data['cosponsors']
+            bill = comprehensive_data['bill_info']
+            actions_df = Action.to_frame(comprehensive_data['actions'])
             subjects_data = comprehensive_data['subjects']
             metrics = comprehensive_data['metrics']
         
@@ -123,17 +259,17 @@ if bill_input:
             days_since_last_action = 0
         
         # Bill header with verification - use correct title from comprehensive data
-        if not df.empty:
+        if bill is not None:
             # Get title from the comprehensive data which includes titles from the separate API call
             full_title = None
             display_title = None # Not used because it doesn't provide the actual title
             
             # Check for short_title first (from the titles API call)
-            if 'short_title' in df.columns and df['short_title'].values[0]:
-                display_title = df['short_title'].values[0]
-                full_title = df['title'].values[0] if 'title' in df.columns else display_title
-            elif 'title' in df.columns and df['title'].values[0]:
-                full_title = df['title'].values[0]
+            if bill.short_title:
+                display_title = bill.short_title
+                full_title = bill.title or display_title
+            elif bill.title:
+                full_title = bill.title
                 display_title = full_title[:100] + "..." if len(full_title) > 100 else full_title
             
             if display_title:
@@ -147,22 +283,13 @@ if bill_input:
                 with col1:
                     st.write(f"**Bill Number:** {bill_type.upper()}.{bill_input}")
                     st.write(f"**Congress:** {congress}th")
-                    if 'introduced_date' in df.columns:
-                        st.write(f"**Introduced:** {df['introduced_date'].values[0]}")
-                    if 'sponsor' in df.columns:
-                        st.write(f"**Sponsor:** {df['sponsor'].values[0]}")
+                    st.write(f"**Introduced:** {bill.introduced_date}")
                 with col2:
-                    if 'status' in df.columns:
-                        st.write(f"**Status:** {df['status'].values[0]}")
-                    if 'policy_area' in df.columns:
-                        st.write(f"**Policy Area:** {df['policy_area'].values[0]}")
-                    if 'committees' in df.columns:
-                        st.write(f"**Committees:** {df['committees'].values[0]}")
+                    st.write(f"**Status:** {bill.status}")
+                    st.write(f"**Policy Area:** {bill.policy_area}")
+                    st.write(f"**Committees:** {bill.committees}")
                 
-                if 'title' in df.columns:
-                    st.write(f"**Full Title:** {df['title'].values[0]}")
-                elif 'official_title' in df.columns:
-                    st.write(f"**Full Title:** {df['official_title'].values[0]}")
+                st.write(f"**Full Title:** {bill.title}")
                 
                 st.info("💡 If this is not the bill you're looking for, please verify the bill number and congress session.")
         else:
@@ -178,9 +305,9 @@ if bill_input:
         with col3:
             st.metric("Committees", metrics.get('committee_count', 0))
         with col4:
-            st.metric("Cosponsors", df['cosponsor_count'].values[0] if not df.empty else 0)
+            st.metric("Cosponsors", bill.cosponsor_count if bill is not None else 0)
         with col5:
-            bipartisan = "Yes" if df['is_bipartisan'].values[0] else "No"
+            bipartisan = "Yes" if bill is not None and bill.is_bipartisan else "No"
             st.metric("Bipartisan", bipartisan)
         with col6:
             activity_rate = metrics.get('total_actions', 0) / max(days_active, 1)
@@ -190,70 +317,11 @@ if bill_input:
         if not actions_df.empty:
             st.subheader("📅 Legislative Activity Timeline")
             
-            # Parse dates with multiple possible formats
-            def parse_action_date(date_str):
-                """Parse dates from various formats the API might return"""
-                if pd.isna(date_str) or not date_str:
-                    return None
-                
-                # Try different date formats
-                formats = [
-                    '%Y-%m-%d',  # Standard ISO format
-                    '%Y-%m-%dT%H:%M:%S',  # ISO with time
-                    '%Y-%m-%dT%H:%M:%SZ',  # ISO with UTC
-                    '%Y-%m-%dT%H:%M:%S.%fZ',  # ISO with milliseconds
-                    '%m/%d/%Y',  # US format
-                    '%d/%m/%Y',  # European format
-                ]
-                
-                for fmt in formats:
-                    try:
-                        return pd.to_datetime(date_str, format=fmt)
-                    except:
-                        continue
-                
-                # If all formats fail, try pandas general parser
-                try:
-                    return pd.to_datetime(date_str)
-                except:
-                    return None
-            
-            # Apply parsing to all dates
-            actions_df['parsed_date'] = actions_df['date'].apply(parse_action_date)
-            
-            # Remove any rows with invalid dates
-            valid_actions = actions_df.dropna(subset=['parsed_date']).copy()
+            with span('build_timeline', actions=len(actions_df)):
+                valid_actions, timeline_df = build_timeline(actions_df)
             
             if len(valid_actions) == 0:
                 st.warning("No valid dates found in legislative actions.")
-            else:
-                # Sort by date in descending order (most recent first)
-                valid_actions = valid_actions.sort_values('parsed_date', ascending=False)
-            
-            # Remove true duplicates (same date AND same text)
-            # But keep actions that happened on the same date with different text
-            valid_actions['date_str'] = valid_actions['parsed_date'].dt.strftime('%Y-%m-%d')
-            valid_actions = valid_actions.drop_duplicates(subset=['date_str', 'text'], keep='first')
-            
-            # Format the data for display
-            timeline_data = []
-            for _, action in valid_actions.iterrows():
-                # Clean and truncate action text
-                action_text = str(action['text']).strip()
-                if len(action_text) > 200:
-                    action_text = action_text[:197] + "..."
-                
-                # Calculate days ago
-                days_ago = (datetime.now() - action['parsed_date']).days
-                
-                timeline_data.append({
-                    'Date': action['parsed_date'].strftime('%B %d, %Y'),
-                    'Action': action_text,
-                    'Days Ago': days_ago,
-                    'Chamber': action.get('source_system', 'Unknown') if 'source_system' in action else 'Congress'
-                })
-            
-            timeline_df = pd.DataFrame(timeline_data)
             
             # Show total count and date range
             col1, col2, col3 = st.columns(3)
@@ -356,146 +424,29 @@ if bill_input:
         
         st.markdown("---")
         
-        # UPDATED: Load models from optimized split component files
+        with span('load_models'):
+            model_package = load_models()
+        
         @st.cache_resource
-        def load_models():
-            """Load models from optimized split component files"""
+        def load_similar_bills():
+            """Load the historical nearest-neighbor index if it has been built"""
+            from similar_bills import SimilarBills
             try:
-                # Check if models directory exists
-                if not os.path.exists('models'):
-                    st.error("Models directory not found. Please train the models first.")
-                    return None
-                
-                # Load metadata and encoders
-                metadata_package = joblib.load('models/metadata.pkl')
-                
-                # Load viability pass rate data if available
-                viability_pass_rates = None
-                viability_pass_rates_fine = None
-                if os.path.exists('data/viability_pass_rates.csv'):
-                    viability_pass_rates = pd.read_csv('data/viability_pass_rates.csv')
-                if os.path.exists('data/viability_pass_rates_fine.csv'):
-                    viability_pass_rates_fine = pd.read_csv('data/viability_pass_rates_fine.csv')
-                
-                # Function to reconstruct ensemble from components
-                def reconstruct_ensemble(rf_model, gb_model, lr_model, ensemble_config):
-                    """Reconstruct VotingClassifier from individual models and config"""
-                    # Create a custom ensemble that uses pre-fitted models
-                    ensemble = VotingClassifier(
-                        estimators=[
-                            ('rf', rf_model),
-                            ('gb', gb_model),
-                            ('lr', lr_model)
-                        ],
-                        voting=ensemble_config['voting'],
-                        weights=ensemble_config['weights']
-                    )
-                    # Set the fitted flag manually since our estimators are already fitted
-                    ensemble.estimators_ = [rf_model, gb_model, lr_model]
-                    ensemble.named_estimators_ = {
-                        'rf': rf_model,
-                        'gb': gb_model,
-                        'lr': lr_model
-                    }
-                    ensemble.classes_ = rf_model.classes_
-                    ensemble.le_ = None  # Not used for pre-fitted estimators
-                    return ensemble
-                
-                # Function to reconstruct calibrated model if needed
-                def reconstruct_calibrated_model(base_model, calibration_data):
-                    """Reconstruct calibrated model from base model and calibration data"""
-                    # For now, return the base model as calibration reconstruction is complex
-                    # In production, you'd need to properly reconstruct the calibrators
-                    return base_model
-                
-                # Function to load a single model stage from optimized components
-                def load_model_stage_optimized(model_type, stage):
-                    """Load all components for a single model stage from optimized structure"""
-                    model_dir = f'models/{model_type}_{stage}'
-                    
-                    if not os.path.exists(model_dir):
-                        st.error(f"Model directory {model_dir} not found!")
-                        return None
-                    
-                    # Load RF model (separate file)
-                    rf_model = joblib.load(f'{model_dir}/rf_model.pkl')
-                    
-                    # Load combined components
-                    components = joblib.load(f'{model_dir}/components.pkl')
-                    gb_model = components['gb_model']
-                    lr_model = components['lr_model']
-                    scaler = components['scaler']
-                    selector = components['selector']
-                    metadata = components['metadata']
-                    
-                    # Load ensemble config
-                    ensemble_config = joblib.load(f'{model_dir}/ensemble_config.pkl')
-                    
-                    # Reconstruct ensemble
-                    ensemble = reconstruct_ensemble(rf_model, gb_model, lr_model, ensemble_config)
-                    
-                    # Check if calibration exists
-                    final_model = ensemble
-                    if metadata['is_calibrated'] and os.path.exists(f'{model_dir}/calibration.pkl'):
-                        calibration_data = joblib.load(f'{model_dir}/calibration.pkl')
-                        # For simplicity, we'll use the ensemble as final model
-                        # In production, you'd reconstruct the calibrated model properly
-                        final_model = ensemble  # reconstruct_calibrated_model(ensemble, calibration_data)
-                    
-                    # Return model dictionary
-                    return {
-                        'model': final_model,
-                        'ensemble': ensemble,
-                        'rf_model': rf_model,
-                        'gb_model': gb_model,
-                        'lr_model': lr_model,
-                        'scaler': scaler,
-                        'selector': selector,
-                        'features': metadata['features'],
-                        'selected_features': metadata['selected_features'],
-                        'threshold': metadata['threshold'],
-                        'performance': metadata['performance']
-                    }
-                
-                # Load all model stages
-                viability_models = {}
-                passage_models = {}
-                
-                for stage in ['new_bill', 'early_stage', 'progressive']:
-                    # Load viability model
-                    viability_model = load_model_stage_optimized('viability', stage)
-                    if viability_model:
-                        viability_models[stage] = viability_model
-                    else:
-                        st.error(f"Failed to load viability_{stage} model")
-                        return None
-                    
-                    # Load passage model
-                    passage_model = load_model_stage_optimized('passage', stage)
-                    if passage_model:
-                        passage_models[stage] = passage_model
-                    else:
-                        st.error(f"Failed to load passage_{stage} model")
-                        return None
-                
-                # Return complete model package
-                return {
-                    'viability_models': viability_models,
-                    'passage_models': passage_models,
-                    'label_encoders': metadata_package['label_encoders'],
-                    'feature_sets': metadata_package['metadata'].get('feature_sets', {}),
-                    'metadata': metadata_package['metadata'],
-                    'viability_pass_rates': viability_pass_rates,
-                    'viability_pass_rates_fine': viability_pass_rates_fine
-                }
-                
+                return SimilarBills.load()
             except Exception as e:
-                st.error(f"Error loading models: {str(e)}")
-                import traceback
-                st.code(traceback.format_exc())
+                st.warning(f"Could not load similar bills index: {str(e)}")
                 return None
         
-        model_package = load_models()
+        @st.cache_resource
+        def load_title_embeddings():
+            """Open the title embedding cache; the encoder itself loads on first use"""
+            if not os.path.exists(os.path.join(EMBEDDING_DIR, 'index.db')):
+                return None
+            try:
+                return EmbeddingCache()
+            except Exception as e:
+                st.warning(f"Could not load title embeddings: {str(e)}")
+                return None
         
         if model_package:
             # Extract components
@@ -533,9 +484,9 @@ if bill_input:
             has_passed_senate = False
             has_become_law = False
             
-            # Check status from df
-            if not df.empty and 'status' in df.columns:
-                status_text = str(df['status'].values[0]).lower()
+            # Check status from the bill record
+            if bill is not None:
+                status_text = str(bill.status).lower()
                 if 'passed house' in status_text or 'received in the senate' in status_text:
                     has_passed_house = True
                 if 'passed senate' in status_text or 'received in the house' in status_text:
@@ -553,68 +504,11 @@ if bill_input:
                 if 'passed senate' in action_texts:
                     has_passed_senate = True
             
-            # Prepare features
-            feature_data = {
-                # Basic features
-                'sponsor_party': df['sponsor_parties'].values[0] if not df.empty else 'Unknown',
-                'sponsor_party_encoded': 0,  # Will be encoded below
-                'sponsor_count': len(df['sponsors'].values[0].split(',')) if not df.empty else 1,
-                'original_cosponsor_count': metrics.get('original_cosponsor_count', 0),
-                'cosponsor_count': df['cosponsor_count'].values[0] if not df.empty else 0,
-                'month_introduced': datetime.now().month,
-                'quarter_introduced': (datetime.now().month - 1) // 3 + 1,
-                'is_election_year': int(datetime.now().year % 4 == 0),
-                'title_length': len(df['short_title'].values[0]) if not df.empty and 'short_title' in df.columns and df['short_title'].values[0] else len(df['title'].values[0]) if not df.empty and 'title' in df.columns and df['title'].values[0] else 100,
-                'title_word_count': len(df['short_title'].values[0].split()) if not df.empty and 'short_title' in df.columns and df['short_title'].values[0] else len(df['title'].values[0].split()) if not df.empty and 'title' in df.columns and df['title'].values[0] else 20,
-                'title_complexity': 0,  # Will be calculated
-                'subject_count': len(subjects_data.get('subjects', [])),
-                'policy_area': df['policy_area'].values[0] if not df.empty else 'Unknown',
-                'policy_area_encoded': 0,  # Will be encoded
-                'dem_total': metrics.get('dem_total', 0),
-                'rep_total': metrics.get('rep_total', 0),
-                'party_balance': 0,  # Will be calculated
-                'party_dominance': 0,  # Will be calculated
-                'bipartisan_score': metrics.get('bipartisan_score', 0),
-                'has_bipartisan_support': int(df['is_bipartisan'].values[0]) if not df.empty else 0,
-                
-                # Extended features
-                'total_sponsors': 0,  # Will be calculated
-                'is_fresh': int(days_active <= 30),
-                'support_velocity': 0,  # Will be calculated
-                'cosponsor_growth': 0,  # Will be calculated
-                
-                # Progressive features
-                'days_active': days_active,
-                'log_days_active': np.log1p(days_active),
-                'sqrt_days_active': np.sqrt(days_active),
-                'action_count': metrics.get('total_actions', 0),
-                'activity_rate': activity_rate,
-                'normalized_activity': metrics.get('total_actions', 0) / np.log1p(days_active),
-                'early_activity': metrics.get('total_actions', 0) / (min(days_active, 30) + 1),
-                'sustained_activity': metrics.get('total_actions', 0) / (min(days_active, 180) + 1),
-                'is_active': int(days_active <= 90),
-                'is_stale': int(days_active > 180),
-                'committee_count': metrics.get('committee_count', 0),
-                'has_committee': int(metrics.get('committee_count', 0) > 0),
-                'multi_committee': int(metrics.get('committee_count', 0) >= 2),
-                'committee_density': metrics.get('committee_count', 0) / max(days_active / 30, 1),
-                'bipartisan_momentum': 0,  # Will be calculated
-                'committee_activity': 0,  # Will be calculated
-                
-                # Congress-specific features (new)
-                'congress_numeric': congress,
-                'is_recent_congress': int(congress >= 117)
-            }
-            
-            # Calculate derived features
-            feature_data['total_sponsors'] = feature_data['sponsor_count'] + feature_data['cosponsor_count']
-            feature_data['title_complexity'] = feature_data['title_length'] / (feature_data['title_word_count'] + 1)
-            feature_data['party_balance'] = (feature_data['dem_total'] - feature_data['rep_total']) / (feature_data['total_sponsors'] + 1)
-            feature_data['party_dominance'] = abs(feature_data['party_balance'])
-            feature_data['support_velocity'] = feature_data['total_sponsors'] / np.sqrt(days_active)
-            feature_data['cosponsor_growth'] = (feature_data['cosponsor_count'] - feature_data['original_cosponsor_count']) / max(days_active / 30, 1)
-            feature_data['bipartisan_momentum'] = feature_data['bipartisan_score'] * feature_data['normalized_activity']
-            feature_data['committee_activity'] = feature_data['committee_count'] * feature_data['activity_rate']
+            # Prepare features (shared with the batch scorer)
+            with span('build_features'):
+                raw_features = raw_features_from_bill(bill, metrics, subjects_data, days_active, congress)
+                bill_df = build_feature_frame([raw_features], label_encoders)
+            feature_data = bill_df.iloc[0].to_dict()
             
             # Adjust features for bills that have already progressed
             if has_become_law:
@@ -631,18 +525,7 @@ if bill_input:
                 # Add a note about the special case but don't artificially boost features
                 st.info(f"📊 Note: This bill has already {'passed the House' if has_passed_house else 'passed the Senate'}. The model predictions reflect the bill's characteristics at its current stage.")
             
-            # Encode categorical variables
-            try:
-                feature_data['sponsor_party_encoded'] = label_encoders['party'].transform([feature_data['sponsor_party']])[0]
-            except:
-                feature_data['sponsor_party_encoded'] = 0
-            
-            try:
-                feature_data['policy_area_encoded'] = label_encoders['policy'].transform([feature_data['policy_area']])[0]
-            except:
-                feature_data['policy_area_encoded'] = 0
-            
-            # Create DataFrame
+            # Carry any adjustments back into the model input
             bill_df = pd.DataFrame([feature_data])
             
             # Get model components
@@ -663,16 +546,16 @@ if bill_input:
                 # Create DataFrame with selected features to preserve names
                 X_selected_df = pd.DataFrame(X_selected, columns=viability_model['selected_features'])
                 
-                rf_viability = viability_model['rf_model'].predict_proba(X_selected_df)[0, 1]
-                gb_viability = viability_model['gb_model'].predict_proba(X_selected_df)[0, 1]
-                lr_viability = viability_model['lr_model'].predict_proba(X_selected_df)[0, 1]
+                rf_viability = timed_predict(viability_model, 'rf_model', X_selected_df, 'viability')
+                gb_viability = timed_predict(viability_model, 'gb_model', X_selected_df, 'viability')
+                lr_viability = timed_predict(viability_model, 'lr_model', X_selected_df, 'viability')
                 viability_scores = [rf_viability, gb_viability, lr_viability]
             except:
                 # Fall back to ensemble only
                 viability_scores = []
             
             # Ensemble prediction - also use DataFrame
-            ensemble_viability = viability_model['model'].predict_proba(X_selected_df)[0, 1]
+            ensemble_viability = timed_predict(viability_model, 'model', X_selected_df, 'viability')
             
             # Calculate confidence interval if we have individual models
             if viability_scores:
@@ -744,41 +627,43 @@ if bill_input:
                     # Calculate needle angle (180 degree arc from 0 to 100%)
                     angle = 180 - (ensemble_viability * 180)  # 180 degrees at 0%, 0 degrees at 100%
                     
-                    fig_viability = go.Figure()
+                    with span('chart', chart='viability_gauge'):
+                        import plotly.graph_objects as go
+                        fig_viability = go.Figure()
                     
-                    # Add the gauge background
-                    fig_viability.add_trace(go.Indicator(
-                        mode = "gauge+number",
-                        value = ensemble_viability * 100,
-                        number = {'suffix': "%", 'font': {'size': 40}},
-                        domain = {'x': [0, 1], 'y': [0, 1]},
-                        gauge = {
-                            'axis': {'range': [0, 100], 
-                                    'tickwidth': 2, 
-                                    'tickcolor': "darkgray",
-                                    'tickvals': [0, 25, 50, 75, 100],
-                                    'ticktext': ['0', '25', '50', '75', '100']},
-                            'bar': {'color': "darkblue", 'thickness': 0.3},  # Thin bar as needle
-                            'bgcolor': "white",
-                            'borderwidth': 2,
-                            'bordercolor': "gray",
-                            'steps': [
-                                {'range': [0, 30], 'color': '#ffcccc'},
-                                {'range': [30, 50], 'color': '#ffffcc'},
-                                {'range': [50, 100], 'color': '#ccffcc'}
-                            ]
-                        }
-                    ))
+                        # Add the gauge background
+                        fig_viability.add_trace(go.Indicator(
+                            mode = "gauge+number",
+                            value = ensemble_viability * 100,
+                            number = {'suffix': "%", 'font': {'size': 40}},
+                            domain = {'x': [0, 1], 'y': [0, 1]},
+                            gauge = {
+                                'axis': {'range': [0, 100], 
+                                        'tickwidth': 2, 
+                                        'tickcolor': "darkgray",
+                                        'tickvals': [0, 25, 50, 75, 100],
+                                        'ticktext': ['0', '25', '50', '75', '100']},
+                                'bar': {'color': "darkblue", 'thickness': 0.3},  # Thin bar as needle
+                                'bgcolor': "white",
+                                'borderwidth': 2,
+                                'bordercolor': "gray",
+                                'steps': [
+                                    {'range': [0, 30], 'color': '#ffcccc'},
+                                    {'range': [30, 50], 'color': '#ffffcc'},
+                                    {'range': [50, 100], 'color': '#ccffcc'}
+                                ]
+                            }
+                        ))
                     
-                    fig_viability.update_layout(
-                        height=250,
-                        margin=dict(l=30, r=30, t=30, b=30),
-                        showlegend=False,
-                        paper_bgcolor="rgba(0,0,0,0)",
-                        plot_bgcolor="rgba(0,0,0,0)"
-                    )
+                        fig_viability.update_layout(
+                            height=250,
+                            margin=dict(l=30, r=30, t=30, b=30),
+                            showlegend=False,
+                            paper_bgcolor="rgba(0,0,0,0)",
+                            plot_bgcolor="rgba(0,0,0,0)"
+                        )
                     
-                    st.plotly_chart(fig_viability, use_container_width=True)
+                        st.plotly_chart(fig_viability, use_container_width=True)
                     
                     # Clear PASS/FAIL indicator
                     is_viable = ensemble_viability >= 0.5
@@ -806,15 +691,15 @@ if bill_input:
                             # Create DataFrame with selected features to preserve names
                             X_passage_selected_df = pd.DataFrame(X_passage_selected, columns=passage_model['selected_features'])
                             
-                            rf_passage = passage_model['rf_model'].predict_proba(X_passage_selected_df)[0, 1]
-                            gb_passage = passage_model['gb_model'].predict_proba(X_passage_selected_df)[0, 1]
-                            lr_passage = passage_model['lr_model'].predict_proba(X_passage_selected_df)[0, 1]
+                            rf_passage = timed_predict(passage_model, 'rf_model', X_passage_selected_df, 'passage')
+                            gb_passage = timed_predict(passage_model, 'gb_model', X_passage_selected_df, 'passage')
+                            lr_passage = timed_predict(passage_model, 'lr_model', X_passage_selected_df, 'passage')
                             passage_scores = [rf_passage, gb_passage, lr_passage]
                         except:
                             passage_scores = []
                         
                         # Use DataFrame for ensemble too
-                        ensemble_passage = passage_model['model'].predict_proba(X_passage_selected_df)[0, 1]
+                        ensemble_passage = timed_predict(passage_model, 'model', X_passage_selected_df, 'passage')
                         
                         if passage_scores:
                             passage_low = min(passage_scores)
@@ -840,40 +725,42 @@ if bill_input:
                             st.metric("Passage Score", f"{ensemble_passage:.1%}")
                         
                         # Passage gauge with thin bar as needle
-                        fig_passage = go.Figure()
+                        with span('chart', chart='passage_gauge'):
+                            import plotly.graph_objects as go
+                            fig_passage = go.Figure()
                         
-                        fig_passage.add_trace(go.Indicator(
-                            mode = "gauge+number",
-                            value = ensemble_passage * 100,
-                            number = {'suffix': "%", 'font': {'size': 40}},
-                            domain = {'x': [0, 1], 'y': [0, 1]},
-                            gauge = {
-                                'axis': {'range': [0, 100],
-                                        'tickwidth': 2,
-                                        'tickcolor': "darkgray",
-                                        'tickvals': [0, 25, 50, 75, 100],
-                                        'ticktext': ['0', '25', '50', '75', '100']},
-                                'bar': {'color': "darkgreen", 'thickness': 0.3},  # Thin bar as needle
-                                'bgcolor': "white",
-                                'borderwidth': 2,
-                                'bordercolor': "gray",
-                                'steps': [
-                                    {'range': [0, 30], 'color': '#ffcccc'},
-                                    {'range': [30, 50], 'color': '#ffffcc'},
-                                    {'range': [50, 100], 'color': '#ccffcc'}
-                                ]
-                            }
-                        ))
+                            fig_passage.add_trace(go.Indicator(
+                                mode = "gauge+number",
+                                value = ensemble_passage * 100,
+                                number = {'suffix': "%", 'font': {'size': 40}},
+                                domain = {'x': [0, 1], 'y': [0, 1]},
+                                gauge = {
+                                    'axis': {'range': [0, 100],
+                                            'tickwidth': 2,
+                                            'tickcolor': "darkgray",
+                                            'tickvals': [0, 25, 50, 75, 100],
+                                            'ticktext': ['0', '25', '50', '75', '100']},
+                                    'bar': {'color': "darkgreen", 'thickness': 0.3},  # Thin bar as needle
+                                    'bgcolor': "white",
+                                    'borderwidth': 2,
+                                    'bordercolor': "gray",
+                                    'steps': [
+                                        {'range': [0, 30], 'color': '#ffcccc'},
+                                        {'range': [30, 50], 'color': '#ffffcc'},
+                                        {'range': [50, 100], 'color': '#ccffcc'}
+                                    ]
+                                }
+                            ))
                         
-                        fig_passage.update_layout(
-                            height=250,
-                            margin=dict(l=30, r=30, t=30, b=30),
-                            showlegend=False,
-                            paper_bgcolor="rgba(0,0,0,0)",
-                            plot_bgcolor="rgba(0,0,0,0)"
-                        )
+                            fig_passage.update_layout(
+                                height=250,
+                                margin=dict(l=30, r=30, t=30, b=30),
+                                showlegend=False,
+                                paper_bgcolor="rgba(0,0,0,0)",
+                                plot_bgcolor="rgba(0,0,0,0)"
+                            )
                         
-                        st.plotly_chart(fig_passage, use_container_width=True)
+                            st.plotly_chart(fig_passage, use_container_width=True)
                         
                         # Clear PASS/FAIL indicator for passage
                         if ensemble_passage >= 0.7:
@@ -908,6 +795,18 @@ if bill_input:
                     percentile = (1 - overall_chance) * 100
                     st.metric("Percentile Rank", f"Top {100-percentile:.0f}%")
                 
+                # Score trajectory: the bill re-scored as of every action / cosponsor date
+                if show_trajectory:
+                    st.subheader("📈 Score Trajectory")
+                    try:
+                        with span('score_trajectory'):
+                            trajectory = score_trajectory(comprehensive_data, model_package, congress=congress)
+                        st.plotly_chart(trajectory_figure(trajectory), use_container_width=True)
+                        st.caption(f"Scores recomputed as of {len(trajectory)} dates in the bill's history "
+                                   "(dotted lines mark a switch to the next stage model)")
+                    except Exception as e:
+                        st.info(f"Score trajectory unavailable: {str(e)}")
+                
                 # Individual model breakdown
                 if show_model_breakdown:
                     st.subheader("🔍 Individual Model Predictions")
@@ -992,54 +891,55 @@ if bill_input:
                             'Passage': [ensemble_passage if is_viable else 0]
                         })
                     
-                    fig_breakdown = px.bar(
-                        model_data.melt(id_vars='Model', var_name='Prediction', value_name='Probability'),
-                        x='Model',
-                        y='Probability',
-                        color='Prediction',
-                        barmode='group',
-                        title='Model Predictions Comparison',
-                        color_discrete_map={'Viability': '#1f77b4', 'Passage': '#2ca02c'}
-                    )
-                    fig_breakdown.update_yaxes(tickformat='.0%', range=[0, 1])
-                    fig_breakdown.update_layout(height=400)
-                    st.plotly_chart(fig_breakdown, use_container_width=True)
+                    with span('chart', chart='model_breakdown'):
+                        import plotly.express as px
+                        fig_breakdown = px.bar(
+                            model_data.melt(id_vars='Model', var_name='Prediction', value_name='Probability'),
+                            x='Model',
+                            y='Probability',
+                            color='Prediction',
+                            barmode='group',
+                            title='Model Predictions Comparison',
+                            color_discrete_map={'Viability': '#1f77b4', 'Passage': '#2ca02c'}
+                        )
+                        fig_breakdown.update_yaxes(tickformat='.0%', range=[0, 1])
+                        fig_breakdown.update_layout(height=400)
+                        st.plotly_chart(fig_breakdown, use_container_width=True)
                 
                 # Feature importance
                 if show_feature_analysis:
                     st.subheader("📊 Key Factors Analysis")
                     
-                    # Get feature values for important features
-                    important_features = viability_model['selected_features'][:10]
-                    
-                    feature_display = []
-                    for feat in important_features:
-                        if feat in feature_data:
-                            value = feature_data[feat]
-                            # Format based on feature type
-                            if isinstance(value, bool):
-                                display_value = "Yes" if value else "No"
-                            elif isinstance(value, (int, float)):
-                                if 'rate' in feat or 'score' in feat or 'ratio' in feat:
-                                    display_value = f"{value:.2f}"
-                                else:
-                                    display_value = f"{value:.0f}"
-                            else:
-                                display_value = str(value)
-                            
-                            feature_display.append({
-                                'Feature': feat.replace('_', ' ').title(),
-                                'Value': display_value,
-                                'Impact': 'Positive' if value > 0 else 'Negative' if value < 0 else 'Neutral'
+                    # Per-feature contributions to this bill's viability score
+                    try:
+                        from explain import get_explainer, top_factors
+                        with span('explain'):
+                            contributions = get_explainer(viability_model).explain_selected(X_selected_df.to_numpy())
+                        raising, lowering = top_factors(contributions, feature_data)
+                        st.caption(f"How each feature moves the viability score away from the model's "
+                                   f"baseline of {contributions['base'].iloc[0]*100:.1f}%")
+
+                        def format_value(feat, value):
+                            if 'rate' in feat or 'score' in feat or 'ratio' in feat:
+                                return f"{value:.2f}"
+                            return f"{value:.0f}"
+
+                        def factor_table(factors):
+                            return pd.DataFrame({
+                                'Feature': factors['feature'].str.replace('_', ' ').str.title(),
+                                'Value': [format_value(f, v) for f, v in zip(factors['feature'], factors['value'])],
+                                'Effect': [f"{c*100:+.1f} pts" for c in factors['contribution']]
                             })
-                    
-                    feature_df = pd.DataFrame(feature_display)
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.dataframe(feature_df.head(5), hide_index=True)
-                    with col2:
-                        st.dataframe(feature_df.tail(5), hide_index=True)
+
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.markdown("**Raising viability**")
+                            st.dataframe(factor_table(raising), hide_index=True)
+                        with col2:
+                            st.markdown("**Lowering viability**")
+                            st.dataframe(factor_table(lowering), hide_index=True)
+                    except Exception as e:
+                        st.info(f"Feature contributions unavailable: {str(e)}")
                 
                 # Strategic recommendations
                 st.markdown("---")
@@ -1072,42 +972,53 @@ if bill_input:
                 if show_similar_bills:
                     st.subheader("📚 Historical Comparison")
                     
+                    # Nearest historical bills in the model's feature space
+                    similar_index = load_similar_bills()
+                    if similar_index is not None:
+                        with span('similar_bills'):
+                            neighbors = similar_index.query(bill_df, model_package, k=10)
+                        from similar_bills import outcome_summary
+                        summary = outcome_summary(neighbors)
+                        if summary['known']:
+                            st.markdown(f"**{summary['passed']} of the {summary['known']} most similar historical bills "
+                                        f"passed ({summary['pass_rate']:.0f}%)**")
+                        display_neighbors = neighbors[['bill_id', 'title', 'congress', 'passed', 'failure_reason',
+                                                       'action_count', 'cosponsor_count', 'distance']].copy()
+                        display_neighbors['passed'] = display_neighbors['passed'].map({1: 'Passed', 0: 'Failed'}).fillna('Pending')
+                        display_neighbors.columns = ['Bill', 'Title', 'Congress', 'Outcome', 'Failure Reason',
+                                                     'Actions', 'Cosponsors', 'Distance']
+                        st.dataframe(display_neighbors, hide_index=True)
+                    else:
+                        st.caption("Similar bills index not built. Run `python src/similar_bills.py --build` to enable it.")
+                    
+                    # Historical bills with the closest titles
+                    title_cache = load_title_embeddings()
+                    if title_cache is not None and len(title_cache) and full_title:
+                        current_bill_id = f"{congress}-{bill_type.upper()}-{bill_input}"
+                        with st.spinner('Comparing titles...'):
+                            # Encoded but not stored: the cache holds historical bills only
+                            title_vector = title_cache.embed([full_title])[0]
+                            similar_titles = title_cache.nearest(title_vector, k=5, exclude=current_bill_id)
+                        if not similar_titles.empty:
+                            st.markdown("**Bills with the most similar titles:**")
+                            similar_titles['similarity'] = similar_titles['similarity'].round(3)
+                            similar_titles.columns = ['Bill', 'Similarity']
+                            st.dataframe(similar_titles, hide_index=True)
+                    
                     # Get actual pass rate from data if available
                     pass_rate_data = model_package.get('viability_pass_rates')
-                    pass_rate_fine = model_package.get('viability_pass_rates_fine')
+                    pass_rate_lookup = model_package.get('pass_rate_lookup')
                     
                     if pass_rate_data is not None and not pass_rate_data.empty:
-                        # Find the appropriate bin for this viability score
-                        viability_pct = ensemble_viability * 100
+                        # Precompiled searchsorted lookup: closest fine bin, else the containing bin
+                        estimated_pass_rate, rate_source, bin_match = pass_rate_lookup.lookup(ensemble_viability)
                         
-                        # Find the matching bin
-                        bin_match = None
-                        for _, row in pass_rate_data.iterrows():
-                            if row['min_viability'] * 100 <= viability_pct < row['max_viability'] * 100:
-                                bin_match = row
-                                break
-                        
-                        # Try to get more precise estimate from fine-grained data
-                        precise_rate = None
-                        if pass_rate_fine is not None and not pass_rate_fine.empty:
-                            # Find closest viability score in fine data
-                            closest_idx = (pass_rate_fine['viability_score'] - ensemble_viability).abs().idxmin()
-                            closest_data = pass_rate_fine.loc[closest_idx]
-                            
-                            # Only use if we have enough bills in that range
-                            if closest_data['bill_count'] >= 10:
-                                precise_rate = closest_data['pass_rate']
-                        
-                        # Use precise rate if available, otherwise use bin rate
-                        if precise_rate is not None:
-                            estimated_pass_rate = precise_rate
+                        if rate_source == 'fine':
                             data_source = "precise historical data"
-                        elif bin_match is not None:
-                            estimated_pass_rate = bin_match['pass_rate']
+                        elif rate_source == 'bin':
                             data_source = f"{bin_match['bill_count']:,} bills in {bin_match['viability_range']} range"
                         else:
                             # Fallback if no bin matches
-                            estimated_pass_rate = 2.7  # Overall average
                             data_source = "overall average (no specific data for this range)"
                         
                         st.info(f"""
@@ -1167,6 +1078,8 @@ if bill_input:
         with st.expander("🐛 Debug Information"):
             import traceback
             st.code(traceback.format_exc())
+    
+    show_request_timing(request_trace, model_package)
 
 # Footer
 st.markdown("---")
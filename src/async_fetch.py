@@ -0,0 +1,301 @@
+"""
+Asyncio version of the data_fetch API for bulk lookups.
+
+Same functions, arguments and return values as data_fetch (the response
+parsing is shared), but as coroutines on one event loop:
+- one pooled aiohttp session per loop, so connections are reused across bills
+- one global semaphore (MAX_IN_FLIGHT) caps requests on the wire, so hundreds
+  of lookups can be scheduled at once without flooding the API
+- list pages after the first and the per-bill sub-resources are fetched
+  concurrently
+
+Requires aiohttp (pip install aiohttp); data_fetch stays the synchronous path
+used by the app.
+
+Usage:
+    python src/async_fetch.py --bills 118/hr/1 118/hr/77 118/s/5
+    python src/async_fetch.py --congress 118 --type hr --range 1-300 --max-in-flight 64
+"""
+import os
+import copy
+import time
+import asyncio
+import argparse
+
+import pandas as pd
+
+import data_fetch
+import ratelimit
+from data_fetch import (PAGE_LIMIT, parse_bill, parse_bill_titles, apply_short_title, extract_actions,
+                        parse_bill_actions, extract_cosponsors, parse_cosponsors, extract_subjects,
+                        parse_subjects, extract_text_versions, parse_text_versions, compile_bill_data)
+from records import Subjects
+from normalize import loads
+from telemetry import span, timed
+
+MAX_IN_FLIGHT = int(os.getenv('ASYNC_MAX_IN_FLIGHT', 32))  # Requests on the wire at once
+REQUEST_TIMEOUT = 60  # seconds
+
+_pool = None
+_in_flight = {}  # bill key -> task fetching it
+
+class _Pool:
+    """
+    Session and semaphore shared by every request made on one event loop
+    """
+
+    def __init__(self, max_in_flight):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("async_fetch needs aiohttp: pip install aiohttp")
+
+        self.loop = asyncio.get_running_loop()
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        connector = aiohttp.TCPConnector(limit=max_in_flight, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+
+def _get_pool():
+    global _pool
+    if _pool is None or _pool.loop is not asyncio.get_running_loop() or _pool.session.closed:
+        _pool = _Pool(MAX_IN_FLIGHT)
+    return _pool
+
+async def close():
+    """
+    Close the pooled session; call before the event loop ends (run() does this)
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.session.close()
+        _pool = None
+
+def set_max_in_flight(n):
+    """
+    Change the global request cap; takes effect for the next session
+    """
+    global MAX_IN_FLIGHT
+    MAX_IN_FLIGHT = n
+
+def _url(path):
+    # Read the base at call time so a CONGRESS_API_BASE override on data_fetch applies here too
+    return f'{data_fetch.CONGRESS_API_BASE}/{path}?api_key={data_fetch.CONGRESS_API_KEY}'
+
+async def _get_json(url):
+    """
+    (status_code, json or None) for one GET, waiting for an API token (see
+    ratelimit.py) and then a slot on the global semaphore
+    """
+    pool = _get_pool()
+    # Wait for an API token outside the semaphore so a throttled request doesn't hold a slot
+    await ratelimit.acquire_async()
+    async with pool.semaphore:
+        async with pool.session.get(url) as response:
+            if response.status == 429:
+                await ratelimit.throttled_async(response.headers.get('Retry-After'))
+            if response.status != 200:
+                return response.status, None
+            return response.status, loads(await response.read())
+
+async def fetch_all_pages(path, extract, limit=PAGE_LIMIT):
+    """
+    Async fetch_all_pages: the first page gives pagination.count, the other
+    offsets are then requested together and merged back in offset order.
+    Failed pages are retried together with backoff, as in data_fetch.
+    Returns (first_page_json, items), or (None, status_code) if the first page
+    fails or a later one still fails after data_fetch.PAGE_RETRIES.
+    """
+    url = f'{_url(path)}&limit={limit}'
+
+    with span('fetch_first_page', path=path):
+        status, first = await _get_json(f'{url}&offset=0')
+    if first is None:
+        return None, status
+
+    items = list(extract(first))
+    count = first.get('pagination', {}).get('count', len(items))
+    offsets = list(range(limit, count, limit))
+
+    if offsets:
+        with span('fetch_remaining_pages', path=path, pages=len(offsets)):
+            # gather() keeps submission order, so pages merge in offset order
+            pages = dict(zip(offsets, await asyncio.gather(*[_get_json(f'{url}&offset={offset}') for offset in offsets])))
+
+        delay = data_fetch.PAGE_RETRY_DELAY
+        for attempt in range(data_fetch.PAGE_RETRIES):
+            failed = [offset for offset in offsets if pages[offset][1] is None]
+            if not failed:
+                break
+            print(f"Error for {path} (offsets {failed}): {[pages[offset][0] for offset in failed]}, retrying in {delay}s")
+            await asyncio.sleep(delay)
+            delay *= 2
+            with span('fetch_page_retry', path=path, pages=len(failed), attempt=attempt + 1):
+                retried = await asyncio.gather(*[_get_json(f'{url}&offset={offset}') for offset in failed])
+            pages.update(zip(failed, retried))
+
+        for offset in offsets:
+            page_status, page = pages[offset]
+            if page is None:
+                print(f"Error for {path} (offset {offset}): {page_status}, giving up")
+                return None, page_status
+            items.extend(extract(page))
+
+    return first, items
+
+@timed('async_fetch_bill_titles')
+async def fetch_bill_titles(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch all titles for a bill
+    """
+    status, data = await _get_json(_url(f'bill/{congress}/{bill_type}/{bill_id}/titles'))
+    if data is None:
+        return {'short_title': '', 'official_title': '', 'display_title': ''}
+    return parse_bill_titles(data)
+
+@timed('async_fetch_bill')
+async def fetch_bill(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch bill information; the titles request goes out alongside the bill request
+    """
+    (status, data), titles_info = await asyncio.gather(
+        _get_json(_url(f'bill/{congress}/{bill_type}/{bill_id}')),
+        fetch_bill_titles(bill_id, congress, bill_type)
+    )
+    if data is None:
+        print(f"Error for bill {bill_id}: {status}")
+        return None
+    return apply_short_title(parse_bill(data, bill_id, congress, bill_type), titles_info)
+
+@timed('async_fetch_bill_actions')
+async def fetch_bill_actions(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch all bill actions
+    """
+    first, actions_data = await fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/actions', extract_actions)
+    if first is None:
+        print(f"Error for actions {bill_id}: {actions_data}")
+        return []
+    return parse_bill_actions(actions_data, bill_id, congress, bill_type)
+
+@timed('async_fetch_cosponsors')
+async def fetch_cosponsors(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch detailed cosponsor information: (DataFrame, party counts)
+    """
+    first, cosponsors_data = await fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/cosponsors',
+                                                   extract_cosponsors)
+    if first is None:
+        print(f"Error for cosponsors {bill_id}: {cosponsors_data}")
+        return [], {}
+    return parse_cosponsors(cosponsors_data, bill_id, congress, bill_type)
+
+@timed('async_fetch_subjects')
+async def fetch_subjects(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch bill subjects
+    """
+    first, legislative_subjects = await fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/subjects',
+                                                        extract_subjects)
+    if first is None:
+        print(f"Error for subjects {bill_id}: {legislative_subjects}")
+        return Subjects()
+    return parse_subjects(first, legislative_subjects)
+
+@timed('async_fetch_text_versions')
+async def fetch_text_versions(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch available text versions of the bill
+    """
+    first, text_versions_data = await fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/text',
+                                                      extract_text_versions)
+    if first is None:
+        print(f"Error for text versions {bill_id}: {text_versions_data}")
+        return pd.DataFrame()
+    return parse_text_versions(text_versions_data)
+
+@timed('async_fetch_comprehensive_bill_data')
+async def fetch_comprehensive_bill_data(bill_id, congress=118, bill_type='hr'):
+    """
+    Fetch all available data for a bill, every endpoint at once.
+    Returns None if the bill itself can't be fetched. Concurrent calls for the
+    same bill on this loop share one fetch; each caller gets its own copy.
+    """
+    key = f"{congress}-{bill_type.upper()}-{str(bill_id).strip().upper()}"
+    task = _in_flight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_fetch_comprehensive_bill_data(bill_id, congress, bill_type))
+        _in_flight[key] = task
+        task.add_done_callback(lambda t: _in_flight.pop(key, None) if _in_flight.get(key) is t else None)
+    # shield() so one caller being cancelled doesn't cancel the fetch for the others
+    return copy.deepcopy(await asyncio.shield(task))
+
+async def _fetch_comprehensive_bill_data(bill_id, congress, bill_type):
+    bill, actions, (cosponsors, party_breakdown), subjects_data, text_versions_df = await asyncio.gather(
+        fetch_bill(bill_id, congress, bill_type),
+        fetch_bill_actions(bill_id, congress, bill_type),
+        fetch_cosponsors(bill_id, congress, bill_type),
+        fetch_subjects(bill_id, congress, bill_type),
+        fetch_text_versions(bill_id, congress, bill_type)
+    )
+    if bill is None:
+        return None
+    return compile_bill_data(bill, actions, cosponsors, party_breakdown, subjects_data, text_versions_df)
+
+async def fetch_many(bills, fetch=fetch_comprehensive_bill_data):
+    """
+    Run `fetch` for every (bill_id, congress, bill_type) at once; results come
+    back in input order. A lookup that raises yields the exception instead of
+    cancelling the others.
+    """
+    return await asyncio.gather(*[fetch(*bill) for bill in bills], return_exceptions=True)
+
+def run(coro):
+    """
+    asyncio.run() that closes the pooled session before the loop shuts down
+    """
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close()
+    return asyncio.run(main())
+
+def parse_bill_key(key):
+    """
+    '118/hr/1' -> ('1', 118, 'hr')
+    """
+    congress, bill_type, bill_id = key.strip('/').split('/')
+    return bill_id, int(congress), bill_type.lower()
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch many bills concurrently with asyncio')
+    parser.add_argument('--bills', nargs='*', default=[], help='Bills as congress/type/number, e.g. 118/hr/1')
+    parser.add_argument('--congress', type=int, default=118)
+    parser.add_argument('--type', default='hr', help='Bill type for --range')
+    parser.add_argument('--range', help='Bill numbers for --congress/--type, e.g. 1-300')
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    bills = [parse_bill_key(key) for key in args.bills]
+    if args.range:
+        start, end = (int(n) for n in args.range.split('-'))
+        bills += [(str(n), args.congress, args.type.lower()) for n in range(start, end + 1)]
+    if not bills:
+        parser.error('give --bills and/or --range')
+
+    set_max_in_flight(args.max_in_flight)
+    ratelimit.set_default_priority('bulk')
+    start = time.perf_counter()
+    results = run(fetch_many(bills))
+    elapsed = time.perf_counter() - start
+
+    fetched = sum(1 for r in results if isinstance(r, dict))
+    failed = [(bill, r) for bill, r in zip(bills, results) if isinstance(r, Exception)]
+    for (bill_id, congress, bill_type), error in failed:
+        print(f"Failed {congress}/{bill_type}/{bill_id}: {type(error).__name__}: {error}")
+    print(f"Fetched {fetched}/{len(bills)} bills in {elapsed:.2f}s "
+          f"({len(bills) / elapsed:.1f} bills/s, max {args.max_in_flight} requests in flight)")
+
+if __name__ == "__main__":
+    main()
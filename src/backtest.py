@@ -0,0 +1,317 @@
+"""
+Point-in-time backtest of the stage models over past congresses.
+
+Every extracted bill in the checkpoint (see extract_pipeline.py) is rebuilt
+as it stood N days after introduction (day 1, 30 and 90 by default) with the
+same as-of logic as the app's score trajectory (trajectory.bill_history /
+as_of_raw), scored by the stage model the app would have used at that age
+(or by every stage with --all-stages), and compared with how the bill
+actually ended. Work is sharded by congress across a process pool; each
+worker builds one feature frame for its congress and scores it in one batch
+per stage model.
+
+Outputs (Parquet, or CSV when pyarrow isn't installed) in --output-dir:
+    snapshots    one row per bill, horizon and stage with scores and outcomes
+    metrics      ROC-AUC, Brier score, calibration error and top-decile lift
+                 per congress (plus 'all'), horizon, stage and target
+    calibration  predicted vs. observed rate per probability bin
+    lift         outcome rate and lift per score decile
+
+Snapshots past the end of the bill's congress are skipped, and bills still
+pending are left out. The models were trained on these bills' final
+features, so this measures how early the models rank bills well, not
+out-of-sample accuracy.
+
+Usage:
+    python src/backtest.py --congresses 113-118 --workers 6
+    python src/backtest.py --congresses 117,118 --horizons 1,7,30,90,180 --all-stages
+"""
+import os
+import time
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_fetch import parse_bill, parse_bill_actions, parse_cosponsors, parse_subjects
+from extract_pipeline import CHECKPOINT_DB, CheckpointStore, parse_congresses
+from features import build_feature_frame
+from normalize import as_list, normalize
+from preprocess import CONGRESS_END_DATES, identify_outcomes_by_congress, viability_target
+from scoring import MODEL_DIR, DATA_DIR, STAGES, load_model_package, score_bills
+from trajectory import bill_history, as_of_raw
+
+BACKTEST_DIR = 'data/backtest'
+DEFAULT_HORIZONS = [1, 30, 90]  # days after introduction
+CALIBRATION_BINS = 10
+LIFT_BINS = 10
+
+# score column, label column, rows it applies to (passage is only trained on viable bills)
+TARGETS = [
+    ('viability', 'viable', None),
+    ('passage', 'passed', 'viable'),
+    ('overall_chance', 'passed', None)
+]
+
+# Checkpoint feature fields needed to settle each bill's outcome
+OUTCOME_FIELDS = ['bill_id', 'congress', 'passed', 'action_count', 'committee_count',
+                  'cosponsor_count', 'latest_action']
+
+_package = None
+
+def _model_package(model_dir, data_dir):
+    """
+    Load the models once per worker process
+    """
+    global _package
+    if _package is None:
+        _package = load_model_package(model_dir, data_dir)
+    return _package
+
+def bill_data_from_payload(bill_key, payload):
+    """
+    The parts of fetch_comprehensive_bill_data output that as-of replay reads,
+    rebuilt from a raw checkpoint payload with the app's own parsers
+    """
+    congress, bill_type, number = bill_key.split('-', 2)
+    congress = int(congress)
+
+    bill = parse_bill({'bill': payload.get('bill') or {}}, number, congress, bill_type)
+    # The /bill payload usually only links to the committees; the extraction also
+    # fetched the committees endpoint, which is what committee_count was trained on
+    names = [name for name in bill.committees.split(', ') if name]
+    for committee in normalize('committees', payload.get('committees')):
+        if committee['name'] and committee['name'] not in names:
+            names.append(committee['name'])
+    bill.committees = ', '.join(names)
+
+    subjects = payload.get('subjects') or {}
+    if not isinstance(subjects, dict):
+        subjects = {}
+    return {
+        'bill_info': bill,
+        'actions': parse_bill_actions(payload.get('actions') or [], number, congress, bill_type, verbose=False),
+        'cosponsors': parse_cosponsors(payload.get('cosponsors') or [], number, congress, bill_type)[0],
+        'subjects': parse_subjects({'subjects': subjects}, as_list(subjects.get('legislativeSubjects', [])))
+    }
+
+def backtest_congress(congress, checkpoint_db=CHECKPOINT_DB, horizons=DEFAULT_HORIZONS, all_stages=False,
+                      model_dir=MODEL_DIR, data_dir=DATA_DIR):
+    """
+    Snapshot, score and label every extracted bill of one congress.
+    Returns (snapshots DataFrame, stats dict).
+    """
+    start_time = time.perf_counter()
+    package = _model_package(model_dir, data_dir)
+    store = CheckpointStore(checkpoint_db)
+
+    end = CONGRESS_END_DATES.get(congress)
+    end_day = np.datetime64(end.date(), 'D') if end else None
+    offsets = np.asarray(horizons, dtype='timedelta64[D]')
+
+    parts = {}
+    bill_ids = []
+    horizon_parts = []
+    outcomes = []
+    skipped = 0
+    for bill_key, features, payload in store.iter_bills([congress]):
+        history = bill_history(bill_data_from_payload(bill_key, payload), congress, today=end_day)
+        snapshot_days = history.start + offsets
+        keep = snapshot_days <= end_day if end_day is not None else np.ones(len(offsets), dtype=bool)
+        skipped += int((~keep).sum())
+        outcomes.append({field: features.get(field) for field in OUTCOME_FIELDS})
+        if not keep.any():
+            continue
+
+        for col, values in as_of_raw(history, snapshot_days[keep]).items():
+            parts.setdefault(col, []).append(values)
+        bill_ids.extend([features['bill_id']] * int(keep.sum()))
+        horizon_parts.append(np.asarray(horizons)[keep])
+    store.conn.close()
+
+    stats = {'congress': congress, 'bills': len(outcomes), 'skipped_snapshots': skipped}
+    if not bill_ids:
+        stats.update(snapshots=0, seconds=time.perf_counter() - start_time)
+        return pd.DataFrame(), stats
+
+    # Final outcomes, settled the same way as the training set
+    labels = identify_outcomes_by_congress(pd.DataFrame(outcomes))
+    labels['viable'] = viability_target(labels)
+    labels = labels.loc[labels['passed'] != -1, ['bill_id', 'passed', 'viable']]
+
+    raw = pd.DataFrame({col: np.concatenate(values) for col, values in parts.items()})
+    features_df = build_feature_frame(raw, package['label_encoders'])
+    if all_stages:
+        scores = pd.concat([score_bills(features_df, package, stages=np.full(len(features_df), stage))
+                            for stage in STAGES], ignore_index=True)
+        repeat = len(STAGES)
+    else:
+        scores = score_bills(features_df, package)
+        repeat = 1
+
+    keys = pd.DataFrame({
+        'bill_id': np.tile(bill_ids, repeat),
+        'congress': congress,
+        'horizon': np.tile(np.concatenate(horizon_parts), repeat)
+    })
+    for col in ['days_active', 'action_count', 'cosponsor_count', 'committee_count']:
+        keys[col] = np.tile(features_df[col].to_numpy(), repeat)
+    snapshots = pd.concat([keys, scores[['stage', 'viability', 'passage', 'overall_chance']].reset_index(drop=True)],
+                          axis=1)
+    snapshots = snapshots.merge(labels, on='bill_id', how='inner')
+
+    stats.update(snapshots=len(snapshots), seconds=time.perf_counter() - start_time)
+    return snapshots, stats
+
+def _calibration_table(y, p, bins=CALIBRATION_BINS):
+    """
+    Mean prediction vs. observed rate in equal-width probability bins
+    """
+    index = np.clip((p * bins).astype(int), 0, bins - 1)
+    n = np.bincount(index, minlength=bins)
+    predicted = np.bincount(index, weights=p, minlength=bins)
+    observed = np.bincount(index, weights=y, minlength=bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'bin_low': np.arange(bins) / bins,
+            'bin_high': np.arange(1, bins + 1) / bins,
+            'n': n,
+            'mean_predicted': predicted / n,
+            'observed_rate': observed / n
+        })
+
+def _lift_table(y, p, bins=LIFT_BINS):
+    """
+    Outcome rate per score decile (1 = highest scores), its lift over the base
+    rate and the share of all positives captured down to that decile
+    """
+    order = np.argsort(-p, kind='stable')
+    groups = np.array_split(y[order], bins)
+    base_rate = y.mean()
+    positives = np.array([g.sum() for g in groups])
+    n = np.array([len(g) for g in groups])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = positives / n
+        return pd.DataFrame({
+            'decile': np.arange(1, bins + 1),
+            'n': n,
+            'rate': rate,
+            'lift': rate / base_rate,
+            'cumulative_capture': np.cumsum(positives) / max(positives.sum(), 1)
+        })
+
+def evaluate(snapshots):
+    """
+    (metrics, calibration, lift) DataFrames by congress (and 'all'), horizon,
+    stage and target
+    """
+    from sklearn.metrics import roc_auc_score
+
+    pooled = snapshots.assign(congress='all')
+    frames = pd.concat([snapshots.assign(congress=snapshots['congress'].astype(str)), pooled], ignore_index=True)
+
+    metrics, calibration, lift = [], [], []
+    for (congress, horizon, stage), group in frames.groupby(['congress', 'horizon', 'stage'], sort=False):
+        for score, label, subset in TARGETS:
+            rows = group if subset is None else group[group[subset] == 1]
+            if rows.empty:
+                continue
+            y = rows[label].to_numpy(dtype=float)
+            p = rows[score].to_numpy(dtype=float)
+            key = {'congress': congress, 'horizon': horizon, 'stage': stage, 'target': score}
+
+            cal = _calibration_table(y, p)
+            filled = cal['n'] > 0
+            ece = float((cal['n'][filled] / len(y) * (cal['mean_predicted'] - cal['observed_rate'])[filled].abs()).sum())
+            lifts = _lift_table(y, p)
+            metrics.append({
+                **key,
+                'n': len(y),
+                'base_rate': y.mean(),
+                'roc_auc': roc_auc_score(y, p) if 0 < y.sum() < len(y) else np.nan,
+                'brier': float(np.mean((p - y) ** 2)),
+                'ece': ece,
+                'top_decile_lift': lifts['lift'].iloc[0]
+            })
+            calibration.append(cal.assign(**key))
+            lift.append(lifts.assign(**key))
+
+    return pd.DataFrame(metrics), pd.concat(calibration, ignore_index=True), pd.concat(lift, ignore_index=True)
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) for engine in ['pyarrow', 'fastparquet'])
+
+def run_backtest(congresses, checkpoint_db=CHECKPOINT_DB, horizons=DEFAULT_HORIZONS, all_stages=False,
+                 workers=None, model_dir=MODEL_DIR, data_dir=DATA_DIR, output_dir=BACKTEST_DIR):
+    """
+    Backtest every congress in a process pool, then compute and save the metrics
+    """
+    start = time.perf_counter()
+    workers = workers or min(len(congresses), os.cpu_count() or 1)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(backtest_congress, congress, checkpoint_db, horizons, all_stages, model_dir, data_dir)
+                   for congress in congresses]
+        for future in as_completed(futures):
+            snapshots, stats = future.result()
+            print(f"Congress {stats['congress']}: {stats['bills']:,} bills, {stats['snapshots']:,} scored snapshots "
+                  f"({stats['skipped_snapshots']:,} past the congress end skipped) in {stats['seconds']:.1f}s")
+            results.append(snapshots)
+
+    results = [snapshots for snapshots in results if not snapshots.empty]
+    if not results:
+        print("No extracted bills with raw payloads in the checkpoint for these congresses")
+        return None
+
+    snapshots = pd.concat(results, ignore_index=True)
+    snapshots = snapshots.sort_values(['congress', 'horizon', 'stage', 'bill_id'], ignore_index=True)
+    metrics, calibration, lift = evaluate(snapshots)
+
+    os.makedirs(output_dir, exist_ok=True)
+    use_parquet = parquet_available()
+    if not use_parquet:
+        print("pyarrow not installed; writing CSV instead (pip install pyarrow for Parquet)")
+    for name, df in [('snapshots', snapshots), ('metrics', metrics), ('calibration', calibration), ('lift', lift)]:
+        path = os.path.join(output_dir, f"{name}.{'parquet' if use_parquet else 'csv'}")
+        if use_parquet:
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        print(f"Wrote {path} ({len(df):,} rows)")
+    print(f"Backtest finished in {time.perf_counter() - start:.1f}s with {workers} workers")
+    return metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Point-in-time backtest of the stage models')
+    parser.add_argument('--congresses', default='113-118', help="'113-118' or '117,118'")
+    parser.add_argument('--horizons', default=','.join(str(h) for h in DEFAULT_HORIZONS),
+                        help='Days after introduction to snapshot each bill at')
+    parser.add_argument('--all-stages', action='store_true',
+                        help='Score every snapshot with every stage model, not just the one the app would use')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per congress, up to the CPU count)')
+    parser.add_argument('--db', default=CHECKPOINT_DB, help='Extraction checkpoint database')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--output-dir', default=BACKTEST_DIR)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Checkpoint {args.db} not found; run src/extract_pipeline.py first")
+    else:
+        metrics = run_backtest(
+            parse_congresses(args.congresses),
+            checkpoint_db=args.db,
+            horizons=[int(h) for h in args.horizons.split(',')],
+            all_stages=args.all_stages,
+            workers=args.workers,
+            model_dir=args.model_dir,
+            data_dir=args.data_dir,
+            output_dir=args.output_dir
+        )
+        if metrics is not None:
+            summary = metrics[metrics['congress'] == 'all'].pivot_table(
+                index=['horizon', 'stage'], columns='target', values=['roc_auc', 'top_decile_lift'])
+            with pd.option_context('display.width', 160):
+                print(summary.round(3).to_string())
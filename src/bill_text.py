@@ -0,0 +1,284 @@
+"""
+Bill full-text ingestion and text features.
+
+Text versions (XML preferred, then formatted text) are streamed to disk in
+chunks and cached content-addressed: each version's URL maps to a fixed path
+under data/bill_text, and an SQLite index records the content hash, size and
+the features extracted from it. A version is downloaded and processed once;
+later calls read the stored features, so large omnibus bills are never
+refetched or re-parsed.
+
+Features per version:
+- compact statistics (words, unique-word ratio, sections, amendments to
+  existing law, dollar amounts)
+- a hashed bag-of-words vector (sklearn HashingVectorizer, stateless so it is
+  built chunk by chunk), saved next to the text; tfidf_matrix() turns a set of
+  them into TF-IDF rows
+
+Usage:
+    python src/bill_text.py 118 hr 1234
+    python src/bill_text.py 118 hr 1234 --all-versions
+"""
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import argparse
+from datetime import datetime
+
+import numpy as np
+import requests
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+from data_fetch import CONGRESS_API_KEY, fetch_text_versions
+
+TEXT_CACHE_DIR = 'data/bill_text'
+CHUNK_SIZE = 64 * 1024
+LINES_PER_BATCH = 2000
+HASH_FEATURES = 2 ** 18
+
+# Download preference among the formats Congress.gov offers
+FORMAT_PREFERENCE = ['Formatted XML', 'Formatted Text']
+FORMAT_EXTENSIONS = {'Formatted XML': 'xml', 'Formatted Text': 'htm'}
+
+# Fallbacks for bills whose text hasn't been processed
+TEXT_FEATURE_DEFAULTS = {
+    'text_bytes': 0,
+    'text_word_count': 0,
+    'text_unique_ratio': 0.0,
+    'text_section_count': 0,
+    'text_amends_count': 0,
+    'text_dollar_count': 0
+}
+
+TAG_RE = re.compile(r'<[^>]+>')
+WORD_RE = re.compile(r'(?u)\b\w\w+\b')
+XML_SECTION_RE = re.compile(r'<section\b')
+TEXT_SECTION_RE = re.compile(r'\bSEC\. \d+')
+AMENDS_RE = re.compile(r'\bis amended\b|\bare amended\b', re.IGNORECASE)
+DOLLAR_RE = re.compile(r'\$\s?\d[\d,]*')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS text_versions (
+    version_key TEXT PRIMARY KEY,
+    bill_id TEXT,
+    version_type TEXT,
+    version_date TEXT,
+    format TEXT,
+    url TEXT,
+    path TEXT,
+    content_sha256 TEXT,
+    bytes INTEGER,
+    features TEXT,
+    processed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_text_versions_bill ON text_versions (bill_id, version_date);
+"""
+
+_vectorizer = HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, norm=None,
+                                stop_words='english', dtype=np.float32)
+
+def version_key(url):
+    """
+    Content address for a text version: its source URL identifies the version
+    """
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def stream_download(url, path, chunk_size=CHUNK_SIZE):
+    """
+    Stream a URL to disk without holding it in memory. Returns (sha256, bytes).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = path + '.part'
+    params = {'api_key': CONGRESS_API_KEY} if 'api.congress.gov' in url else None
+    with requests.get(url, params=params, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    os.replace(tmp_path, path)
+    return digest.hexdigest(), size
+
+def extract_text_features(path):
+    """
+    Read a downloaded version line by line and build its statistics and
+    hashed term-count vector without loading the whole file
+    """
+    section_re = XML_SECTION_RE if path.endswith('.xml') else TEXT_SECTION_RE
+    words = 0
+    unique = set()
+    sections = amends = dollars = 0
+    counts = sparse.csr_matrix((1, HASH_FEATURES), dtype=np.float32)
+    batch = []
+
+    def flush():
+        nonlocal counts
+        if batch:
+            counts = counts + sparse.csr_matrix(_vectorizer.transform(batch).sum(axis=0))
+            batch.clear()
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for raw_line in f:
+            sections += len(section_re.findall(raw_line))
+            line = TAG_RE.sub(' ', raw_line)
+            tokens = WORD_RE.findall(line.lower())
+            if not tokens:
+                continue
+            words += len(tokens)
+            unique.update(tokens)
+            amends += len(AMENDS_RE.findall(line))
+            dollars += len(DOLLAR_RE.findall(line))
+            batch.append(line)
+            if len(batch) >= LINES_PER_BATCH:
+                flush()
+    flush()
+
+    stats = {
+        'text_bytes': os.path.getsize(path),
+        'text_word_count': words,
+        'text_unique_ratio': len(unique) / words if words else 0.0,
+        'text_section_count': sections,
+        'text_amends_count': amends,
+        'text_dollar_count': dollars
+    }
+    return stats, counts
+
+def pick_format(urls):
+    """
+    Preferred (format, url) among a version's formats, or (None, None)
+    """
+    for fmt in FORMAT_PREFERENCE:
+        if urls.get(fmt):
+            return fmt, urls[fmt]
+    return None, None
+
+class BillTextStore:
+    """
+    Content-addressed cache of bill text versions and their features
+    """
+
+    def __init__(self, root=TEXT_CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f'{key}.{ext}')
+
+    def get(self, key):
+        row = self.conn.execute('SELECT * FROM text_versions WHERE version_key = ?', (key,)).fetchone()
+        return dict(row) if row else None
+
+    def ingest_version(self, bill_key, version_type, version_date, fmt, url):
+        """
+        Download and process one version unless it was done before
+        """
+        key = version_key(url)
+        existing = self.get(key)
+        if existing and existing['features']:
+            return existing
+
+        path = self._path(key, FORMAT_EXTENSIONS.get(fmt, 'txt'))
+        content_sha256, size = stream_download(url, path)
+        stats, counts = extract_text_features(path)
+        sparse.save_npz(self._path(key, 'npz'), counts)
+
+        record = {
+            'version_key': key,
+            'bill_id': bill_key,
+            'version_type': version_type,
+            'version_date': version_date,
+            'format': fmt,
+            'url': url,
+            'path': path,
+            'content_sha256': content_sha256,
+            'bytes': size,
+            'features': json.dumps(stats),
+            'processed_at': datetime.now().isoformat()
+        }
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO text_versions ({', '.join(record)}) VALUES ({', '.join('?' * len(record))})",
+                tuple(record.values())
+            )
+        return record
+
+    def ingest_bill(self, bill_id, congress=118, bill_type='hr', all_versions=False):
+        """
+        Ingest a bill's latest text version (or every version). Returns the records.
+        """
+        bill_key = f"{congress}-{bill_type.upper()}-{bill_id}"
+        versions = fetch_text_versions(bill_id, congress, bill_type)
+        if versions.empty or 'urls' not in versions.columns:
+            return []
+
+        versions = versions.sort_values('date', ascending=False)
+        if not all_versions:
+            versions = versions.head(1)
+
+        records = []
+        for version in versions.itertuples(index=False):
+            fmt, url = pick_format(version.urls)
+            if url is None:
+                continue
+            try:
+                records.append(self.ingest_version(bill_key, version.type, version.date, fmt, url))
+            except requests.RequestException as e:
+                print(f"Error downloading text for {bill_key} ({version.type}): {str(e)}")
+        return records
+
+    def text_features(self, bill_key):
+        """
+        Statistics for a bill's most recent processed version (defaults if none)
+        """
+        row = self.conn.execute(
+            """SELECT features FROM text_versions WHERE bill_id = ? AND features IS NOT NULL
+               ORDER BY version_date DESC LIMIT 1""",
+            (bill_key,)
+        ).fetchone()
+        features = dict(TEXT_FEATURE_DEFAULTS)
+        if row:
+            features.update(json.loads(row['features']))
+        return features
+
+    def hashed_counts(self, version_keys):
+        """
+        Stack stored hashed term counts for these versions (one row each)
+        """
+        rows = [sparse.load_npz(self._path(key, 'npz')) for key in version_keys]
+        if not rows:
+            return sparse.csr_matrix((0, HASH_FEATURES), dtype=np.float32)
+        return sparse.vstack(rows).tocsr()
+
+    def tfidf_matrix(self, version_keys, transformer=None):
+        """
+        TF-IDF rows for these versions. Pass a fitted TfidfTransformer to reuse
+        corpus document frequencies; otherwise one is fitted here.
+        Returns (matrix, transformer).
+        """
+        counts = self.hashed_counts(version_keys)
+        if transformer is None:
+            transformer = TfidfTransformer(sublinear_tf=True).fit(counts)
+        return transformer.transform(counts), transformer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Download bill text and extract text features')
+    parser.add_argument('congress', type=int)
+    parser.add_argument('bill_type')
+    parser.add_argument('bill_id')
+    parser.add_argument('--all-versions', action='store_true')
+    parser.add_argument('--cache-dir', default=TEXT_CACHE_DIR)
+    args = parser.parse_args()
+
+    store = BillTextStore(args.cache_dir)
+    for record in store.ingest_bill(args.bill_id, args.congress, args.bill_type.lower(), args.all_versions):
+        print(f"{record['version_type']} ({record['version_date']}): {record['bytes']:,} bytes")
+        print(json.dumps(json.loads(record['features']), indent=2))
@@ -0,0 +1,182 @@
+"""
+Single-flight request coalescing for the fetch layer.
+
+When many sessions open the same bill at once, only one of them fetches it:
+- within a process, concurrent calls with the same key wait on the first
+  caller's fetch (SingleFlight)
+- across processes (several app workers on one host), set FETCH_COALESCE_DB
+  to a shared SQLite file; the first process takes a lock row for the key and
+  the others wait for its result instead of calling the API (SharedFlight).
+  Results stay there for FETCH_COALESCE_TTL seconds, enough to absorb a
+  burst, not a substitute for a cache.
+
+Every caller gets its own deep copy of the result, since callers mutate the
+DataFrames they receive.
+"""
+import os
+import copy
+import time
+import pickle
+import sqlite3
+import threading
+
+from telemetry import span
+
+DEFAULT_TTL = 30  # seconds a shared result is reused (FETCH_COALESCE_TTL)
+LOCK_TIMEOUT = 120  # seconds before another process's lock is considered abandoned
+POLL_INTERVAL = 0.05  # seconds between checks while another process fetches
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetch_locks (
+    key TEXT PRIMARY KEY,
+    owner TEXT,
+    acquired_at REAL
+);
+CREATE TABLE IF NOT EXISTS fetch_results (
+    key TEXT PRIMARY KEY,
+    payload BLOB,
+    fetched_at REAL
+);
+"""
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key in this process into one
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call for key is already in flight, in which case wait
+        for it. Returns (result, shared); errors are raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            with span('coalesced_wait', key=key):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, call.waiters > 0
+
+class SharedFlight:
+    """
+    Cross-process single flight through a lock table in a shared SQLite file
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, lock_timeout=LOCK_TIMEOUT):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.owner = f'{os.getpid()}-{id(self)}'
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _cached(self, conn, key):
+        row = conn.execute('SELECT payload FROM fetch_results WHERE key = ? AND fetched_at > ?',
+                           (key, time.time() - self.ttl)).fetchone()
+        return (True, pickle.loads(row[0])) if row else (False, None)
+
+    def _acquire(self, conn, key):
+        with conn:
+            conn.execute('DELETE FROM fetch_locks WHERE key = ? AND acquired_at < ?',
+                         (key, time.time() - self.lock_timeout))
+            cursor = conn.execute('INSERT OR IGNORE INTO fetch_locks VALUES (?, ?, ?)',
+                                  (key, self.owner, time.time()))
+        return cursor.rowcount == 1
+
+    def _release(self, conn, key, result=None, store=False):
+        with conn:
+            if store:
+                conn.execute('INSERT OR REPLACE INTO fetch_results VALUES (?, ?, ?)',
+                             (key, pickle.dumps(result), time.time()))
+            conn.execute('DELETE FROM fetch_locks WHERE key = ? AND owner = ?', (key, self.owner))
+            conn.execute('DELETE FROM fetch_results WHERE fetched_at < ?', (time.time() - self.ttl,))
+
+    def do(self, key, fn):
+        """
+        Return a fresh shared result for key, or take the lock and run fn(), or
+        wait for the process holding the lock. Returns (result, shared).
+        """
+        conn = self._connect()
+        try:
+            with span('coalesced_wait', key=key, shared=True) as attrs:
+                while True:
+                    found, result = self._cached(conn, key)
+                    if found:
+                        return result, True
+                    if self._acquire(conn, key):
+                        break
+                    time.sleep(POLL_INTERVAL)
+                attrs['leader'] = True
+
+            try:
+                result = fn()
+            except Exception:
+                self._release(conn, key)
+                raise
+            self._release(conn, key, result, store=True)
+            return result, False
+        finally:
+            conn.close()
+
+_local = SingleFlight()
+_shared = None
+_shared_lock = threading.Lock()
+
+def _get_shared():
+    # Read the settings on first use so values from .env (loaded by data_fetch) apply
+    global _shared
+    if _shared is None and os.getenv('FETCH_COALESCE_DB'):
+        with _shared_lock:
+            if _shared is None:
+                _shared = SharedFlight(os.getenv('FETCH_COALESCE_DB'),
+                                       ttl=float(os.getenv('FETCH_COALESCE_TTL', DEFAULT_TTL)))
+    return _shared
+
+def fetch_once(key, fn):
+    """
+    fn() coalesced with concurrent calls for the same key, in this process
+    and, when FETCH_COALESCE_DB is set, across processes sharing that file
+    """
+    shared = _get_shared()
+    if shared is not None:
+        fetch = lambda: shared.do(key, fn)[0]
+    else:
+        fetch = fn
+    result, _ = _local.do(key, fetch)
+    return copy.deepcopy(result)
@@ -0,0 +1,297 @@
+"""
+Compact random forests for the stage models.
+
+A fitted RandomForestClassifier keeps 80 bytes per node (int64 children and
+feature, float64 threshold/impurity/sample counts, float64 class values).
+CompactForest keeps only what prediction and explanations need, in one set
+of flat arrays shared by all trees:
+- int32 children, int16 feature, float32 threshold, float32 class-1 value
+- identical subtrees (and leaves) anywhere in the forest stored once, so the
+  trees become a DAG over a single node table
+- optionally only the first n trees (trees are i.i.d., so any prefix is an
+  unbiased smaller forest); the smallest size within --max-auc-loss of the
+  full forest's held-out ROC-AUC is picked per stage
+
+Thresholds are rounded down to float32, which is exact: sklearn compares
+float32 inputs, and x <= t holds for a float32 x exactly when x <= the
+largest float32 not above t.
+
+Compacted forests are written as rf_compact.pkl next to rf_model.pkl and
+scoring.load_model_stage prefers them.
+
+Usage:
+    python src/compact_models.py --training data/bills_6congress_training.csv
+    python src/compact_models.py --trees 25 50 100 --max-auc-loss 0.002 --write
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+import numpy as np
+
+# Ranked sizes tried when choosing how many trees to keep
+TREE_COUNTS = [10, 25, 50, 75, 100, 150, 200, 300]
+MAX_AUC_LOSS = 0.002
+COMPACT_NAME = 'rf_compact.pkl'
+
+def floor_float32(values):
+    """
+    Largest float32 <= each float64 value
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    too_big = rounded.astype(np.float64) > values
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))
+    return rounded
+
+class CompactForest:
+    """
+    Float32, subtree-deduplicated stand-in for a fitted RandomForestClassifier
+    (binary). Supports predict_proba and path contributions.
+    """
+
+    def __init__(self, roots, left, right, feature, threshold, value, classes, n_features):
+        # value holds P(class 1), or of the last class if 1 isn't a label
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def from_forest(cls, forest, n_trees=None):
+        """
+        Compact the first n_trees trees of a fitted forest
+        """
+        classes = list(forest.classes_)
+        position = classes.index(1) if 1 in classes else len(classes) - 1
+        estimators = forest.estimators_[:n_trees] if n_trees else forest.estimators_
+
+        canonical = {}
+        left, right, feature, threshold, value = [], [], [], [], []
+        roots = []
+        for estimator in estimators:
+            t = estimator.tree_
+            counts = t.value[:, 0, :]
+            node_value = (counts[:, position] / counts.sum(axis=1)).astype(np.float32)
+            node_threshold = floor_float32(t.threshold)
+            node_ids = np.empty(t.node_count, dtype=np.int64)
+            # sklearn numbers children after their parents, so walking backwards sees children first
+            for node in range(t.node_count - 1, -1, -1):
+                if t.children_left[node] < 0:
+                    key = (float(node_value[node]),)
+                else:
+                    key = (int(t.feature[node]), float(node_threshold[node]), float(node_value[node]),
+                           int(node_ids[t.children_left[node]]), int(node_ids[t.children_right[node]]))
+                node_id = canonical.get(key)
+                if node_id is None:
+                    node_id = len(left)
+                    canonical[key] = node_id
+                    if len(key) == 1:
+                        left.append(-1)
+                        right.append(-1)
+                        feature.append(0)
+                        threshold.append(0.0)
+                    else:
+                        left.append(key[3])
+                        right.append(key[4])
+                        feature.append(key[0])
+                        threshold.append(key[1])
+                    value.append(node_value[node])
+                node_ids[node] = node_id
+            roots.append(node_ids[0])
+
+        feature_dtype = np.int16 if forest.n_features_in_ < np.iinfo(np.int16).max else np.int32
+        return cls(
+            roots=np.asarray(roots, dtype=np.int32),
+            left=np.asarray(left, dtype=np.int32),
+            right=np.asarray(right, dtype=np.int32),
+            feature=np.asarray(feature, dtype=feature_dtype),
+            threshold=np.asarray(threshold, dtype=np.float32),
+            value=np.asarray(value, dtype=np.float32),
+            classes=forest.classes_,
+            n_features=forest.n_features_in_
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.left)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in [self.roots, self.left, self.right, self.feature, self.threshold, self.value])
+
+    def _walk(self, X, on_step=None):
+        """
+        Route every (row, tree) pair to its leaf, level by level. on_step(rows, nodes, next_nodes)
+        is called for each split taken.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n = len(X)
+        nodes = np.broadcast_to(self.roots, (n, self.n_trees)).ravel().astype(np.int64)
+        rows = np.repeat(np.arange(n), self.n_trees)
+        active = np.flatnonzero(self.left[nodes] >= 0)
+        while len(active):
+            current = nodes[active]
+            go_left = X[rows[active], self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.left[current], self.right[current])
+            if on_step is not None:
+                on_step(rows[active], current, following)
+            nodes[active] = following
+            active = active[self.left[following] >= 0]
+        return nodes.reshape(n, self.n_trees)
+
+    def predict_proba(self, X):
+        p = self.value[self._walk(X)].astype(np.float64).mean(axis=1)
+        classes = list(self.classes_)
+        proba = np.column_stack([1 - p, 1 - p])
+        proba[:, classes.index(1) if 1 in classes else len(classes) - 1] = p
+        return proba
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+    def path_contributions(self, X):
+        """
+        (bias, n x features) tree-path contributions to the class-1 probability
+        """
+        X = np.asarray(X, dtype=np.float32)
+        contributions = np.zeros((len(X), self.n_features_in_))
+
+        def credit(rows, nodes, following):
+            delta = self.value[following].astype(np.float64) - self.value[nodes]
+            np.add.at(contributions, (rows, self.feature[nodes].astype(np.int64)), delta)
+
+        self._walk(X, credit)
+        return float(self.value[self.roots].astype(np.float64).mean()), contributions / self.n_trees
+
+def forest_nbytes(forest):
+    """
+    Bytes held by a sklearn forest's tree arrays (nodes + values)
+    """
+    return sum(est.tree_.__getstate__()['nodes'].nbytes + est.tree_.value.nbytes for est in forest.estimators_)
+
+def load_rss_mb(path):
+    """
+    RSS growth from loading one pickled model in a fresh interpreter
+    """
+    code = f"""
+import sys, resource
+sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+import joblib, sklearn.ensemble, compact_models
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+before = rss()
+model = joblib.load({path!r})
+print((rss() - before) / 1e6)
+"""
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return float('nan')
+    return float(result.stdout.strip().splitlines()[-1])
+
+def holdout_sets(training_path, model_dir, data_dir):
+    """
+    The notebook's 80/20 stratified test split for each target, as
+    {('viability'|'passage', stage): (X_selected, y)}
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    from features import build_feature_frame
+    from preprocess import viability_target
+    from scoring import STAGES, load_model_package, prepare_stage_input
+    from similar_bills import historical_raw_features
+
+    df = pd.read_csv(training_path)
+    df['viable'] = viability_target(df)
+
+    package = load_model_package(model_dir, data_dir, use_bundle=False)
+    features_df = build_feature_frame(historical_raw_features(df), package['label_encoders'])
+
+    sets = {}
+    for model_type, rows, target in [('viability', df.index, 'viable'),
+                                     ('passage', df.index[df['viable'] == 1], 'passed')]:
+        y = df.loc[rows, target].astype(int).to_numpy()
+        _, test = train_test_split(np.arange(len(rows)), test_size=0.2, random_state=42, stratify=y)
+        for stage in STAGES:
+            model = package[f'{model_type}_models'][stage]
+            X = prepare_stage_input(model, features_df.loc[rows[test]]).to_numpy(dtype=np.float32)
+            sets[(model_type, stage)] = (X, y[test])
+    return package, sets
+
+def compact_stage(forest, X, y, tree_counts=TREE_COUNTS, max_auc_loss=MAX_AUC_LOSS):
+    """
+    Try each tree count; returns (chosen CompactForest, report rows)
+    """
+    from sklearn.metrics import roc_auc_score
+
+    full_auc = roc_auc_score(y, forest.predict_proba(X)[:, 1])
+    counts = sorted({c for c in tree_counts if c < len(forest.estimators_)} | {len(forest.estimators_)})
+    chosen = None
+    rows = []
+    for n_trees in counts:
+        compact = CompactForest.from_forest(forest, n_trees)
+        auc = roc_auc_score(y, compact.predict_proba(X)[:, 1])
+        rows.append({'trees': n_trees, 'nodes': compact.node_count, 'kb': compact.nbytes / 1024,
+                     'roc_auc': auc, 'auc_loss': full_auc - auc})
+        if chosen is None and full_auc - auc <= max_auc_loss:
+            chosen = compact
+    return chosen, full_auc, rows
+
+if __name__ == "__main__":
+    import joblib
+
+    import compact_models
+    from scoring import MODEL_DIR, DATA_DIR
+
+    parser = argparse.ArgumentParser(description='Compact the stage random forests (float32, shared subtrees, pruned)')
+    parser.add_argument('--training', default='data/bills_6congress_training.csv')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--trees', type=int, nargs='+', default=TREE_COUNTS, help='Tree counts to try')
+    parser.add_argument('--max-auc-loss', type=float, default=MAX_AUC_LOSS,
+                        help='Largest held-out ROC-AUC drop accepted for fewer trees')
+    parser.add_argument('--write', action='store_true', help=f'Save the chosen forests as {COMPACT_NAME}')
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    package, sets = holdout_sets(args.training, args.model_dir, args.data_dir)
+    report = {}
+    for (model_type, stage), (X, y) in sets.items():
+        stage_dir = f'{args.model_dir}/{model_type}_{stage}'
+        forest = package[f'{model_type}_models'][stage]['rf_model']
+        chosen, full_auc, rows = compact_models.compact_stage(forest, X, y, args.trees, args.max_auc_loss)
+
+        print(f"\n{model_type}/{stage}: {len(forest.estimators_)} trees, "
+              f"{forest_nbytes(forest) / 1e6:.1f} MB of tree arrays, ROC-AUC {full_auc:.4f}")
+        for row in rows:
+            marker = '  <- chosen' if chosen is not None and row['trees'] == chosen.n_trees else ''
+            print(f"  {row['trees']:4d} trees: {row['nodes']:9,d} nodes {row['kb'] / 1024:7.2f} MB "
+                  f"ROC-AUC {row['roc_auc']:.4f} ({-row['auc_loss']:+.4f}){marker}")
+
+        entry = {'trees': len(forest.estimators_), 'roc_auc': full_auc, 'candidates': rows,
+                 'rss_mb': load_rss_mb(f'{stage_dir}/rf_model.pkl')}
+        if args.write and chosen is not None:
+            joblib.dump(chosen, f'{stage_dir}/{COMPACT_NAME}')
+            entry['compact_trees'] = chosen.n_trees
+            entry['compact_rss_mb'] = load_rss_mb(f'{stage_dir}/{COMPACT_NAME}')
+            print(f"  RSS on load: {entry['rss_mb']:.1f} MB -> {entry['compact_rss_mb']:.1f} MB "
+                  f"({stage_dir}/{COMPACT_NAME})")
+        else:
+            print(f"  RSS on load: {entry['rss_mb']:.1f} MB")
+        report[f'{model_type}/{stage}'] = entry
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
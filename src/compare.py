@@ -0,0 +1,201 @@
+"""
+Side-by-side comparison of several bills.
+
+compare_bills() fetches every bill at once and scores them together: all
+endpoints of all bills go out concurrently through async_fetch when aiohttp
+is installed, otherwise each bill gets its own thread. Either way the wait
+is about the slowest single bill, not the sum. The scoring is one
+scoring.score_bills call, so each stage model runs once per comparison
+however many bills are in it.
+
+Scores are the raw model output: the "already became law" feature boost the
+single-bill view applies is not used here, the status column says so instead.
+
+Usage:
+    python src/compare.py "HR 1234" "S 567" 117/hr/3076 --congress 118
+"""
+import re
+import time
+import argparse
+import contextvars
+import importlib.util
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import data_fetch
+from features import raw_features_from_bill, build_feature_frame
+from scoring import score_bills
+from telemetry import span
+
+BILL_TYPES = ['hr', 's', 'hjres', 'sjres', 'hres', 'sres', 'hconres', 'sconres']
+MAX_BILLS = 25  # per comparison
+MAX_THREADS = 16  # fetch threads when aiohttp isn't installed
+
+_REF = re.compile(r'(?:(\d{2,3})\s*[-/ ]\s*)?([a-z][a-z.\s]*?)\s*[-/]?\s*(\d+)')
+
+def parse_bill_refs(text, congress=118):
+    """
+    Bill references separated by commas, semicolons or new lines -> [(bill_id, congress, bill_type)].
+    Accepts 'HR 1234', 'H.R.1234', 's567', '117/hr/3076' and '117-HR-3076';
+    references without a congress use `congress`. Duplicates are dropped.
+    """
+    refs = []
+    for ref in re.split(r'[,;\n]+', text):
+        ref = ref.strip()
+        if not ref:
+            continue
+        match = _REF.fullmatch(ref.lower())
+        bill_type = re.sub(r'[.\s]', '', match.group(2)) if match else None
+        if bill_type not in BILL_TYPES:
+            raise ValueError(f"Can't read bill reference '{ref}' (expected e.g. HR 1234 or 117/s/567)")
+        bill = (match.group(3), int(match.group(1) or congress), bill_type)
+        if bill not in refs:
+            refs.append(bill)
+    if len(refs) > MAX_BILLS:
+        raise ValueError(f"Compare at most {MAX_BILLS} bills at a time ({len(refs)} given)")
+    return refs
+
+def bill_label(bill_id, congress, bill_type):
+    return f"{bill_type.upper()}.{bill_id} ({congress}th)"
+
+def fetch_bills(refs):
+    """
+    fetch_comprehensive_bill_data for every (bill_id, congress, bill_type) at once,
+    in input order. A failed lookup gives None or the exception it raised.
+    """
+    if not refs:
+        return []
+    if importlib.util.find_spec('aiohttp') is not None:
+        import async_fetch
+        return async_fetch.run(async_fetch.fetch_many(refs))
+
+    def fetch(ref):
+        try:
+            return data_fetch.fetch_comprehensive_bill_data(*ref)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(len(refs), MAX_THREADS)) as executor:
+        # A context copy per bill, so each thread's spans land in the caller's trace
+        futures = [executor.submit(contextvars.copy_context().run, fetch, ref) for ref in refs]
+        return [future.result() for future in futures]
+
+def _days_active(actions, now):
+    """
+    Days since the first action, 1 before there are any (as in the single-bill view)
+    """
+    dates = pd.to_datetime(pd.Series([a.date for a in actions], dtype=object), errors='coerce').dropna()
+    if dates.empty:
+        return 1
+    return (now - dates.min().tz_localize(None)).days
+
+def _status(bill, actions):
+    """
+    How far the bill has got, from its latest action and action history
+    """
+    texts = ' '.join([str(bill.status)] + [a.text or '' for a in actions]).lower()
+    if 'became law' in texts or 'became public law' in texts or 'public law' in str(bill.status).lower():
+        return 'Became law'
+    passed_house = 'passed house' in texts
+    passed_senate = 'passed senate' in texts
+    if passed_house and passed_senate:
+        return 'Passed both chambers'
+    if passed_house:
+        return 'Passed House'
+    if passed_senate:
+        return 'Passed Senate'
+    return 'In progress'
+
+def compare_bills(refs, model_package, now=None):
+    """
+    Fetch and score a list of (bill_id, congress, bill_type). Returns
+    (DataFrame with one row per bill that could be fetched, {label: error}).
+    """
+    now = now or datetime.now()
+    with span('compare_fetch', bills=len(refs)):
+        results = fetch_bills(refs)
+
+    rows, raws, errors = [], [], {}
+    for (bill_id, congress, bill_type), data in zip(refs, results):
+        label = bill_label(bill_id, congress, bill_type)
+        if isinstance(data, Exception):
+            errors[label] = str(data)
+            continue
+        if not data:
+            errors[label] = 'Bill not found'
+            continue
+        bill = data['bill_info']
+        raws.append(raw_features_from_bill(bill, data['metrics'], data['subjects'],
+                                           _days_active(data['actions'], now), congress))
+        rows.append({
+            'bill': label,
+            'title': bill.short_title or bill.title,
+            'sponsor': bill.sponsors,
+            'status': _status(bill, data['actions']),
+            'latest_action': bill.status,
+            'latest_action_date': bill.action_date
+        })
+    if not rows:
+        return pd.DataFrame(), errors
+
+    with span('compare_score', bills=len(rows)):
+        features_df = build_feature_frame(raws, model_package.get('label_encoders'), now=now)
+        scores = score_bills(features_df, model_package)
+
+    comparison = pd.DataFrame(rows)
+    for col in ['sponsor_party', 'policy_area', 'days_active', 'cosponsor_count', 'action_count',
+                'committee_count', 'bipartisan_score']:
+        comparison[col] = [raw[col] for raw in raws]
+    for col in scores.columns:
+        comparison[col] = scores[col].values
+    return comparison, errors
+
+def comparison_figure(comparison):
+    """
+    Grouped bar chart of viability (with the ensemble range), passage and overall chance per bill
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=comparison['bill'], y=comparison['viability'] * 100, name='Viability',
+        error_y=dict(type='data', symmetric=False,
+                     array=(comparison['viability_high'] - comparison['viability']) * 100,
+                     arrayminus=(comparison['viability'] - comparison['viability_low']) * 100)
+    ))
+    fig.add_trace(go.Bar(x=comparison['bill'], y=comparison['passage'] * 100, name='Passage (if viable)'))
+    fig.add_trace(go.Bar(x=comparison['bill'], y=comparison['overall_chance'] * 100, name='Overall chance'))
+    fig.update_layout(barmode='group', yaxis_title='Probability (%)', yaxis_range=[0, 100],
+                      height=400, margin=dict(l=20, r=20, t=30, b=20))
+    return fig
+
+if __name__ == "__main__":
+    from scoring import load_model_package, MODEL_DIR, DATA_DIR
+
+    parser = argparse.ArgumentParser(description='Fetch and score several bills side by side')
+    parser.add_argument('bills', nargs='+', help="Bill references, e.g. 'HR 1234' s567 117/hr/3076")
+    parser.add_argument('--congress', type=int, default=118, help='Congress for references without one')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--api-base', help='Override the Congress.gov API base URL (e.g. a local stand-in)')
+    args = parser.parse_args()
+
+    if args.api_base:
+        data_fetch.CONGRESS_API_BASE = args.api_base.rstrip('/')
+
+    refs = parse_bill_refs(','.join(args.bills), args.congress)
+    package = load_model_package(args.model_dir, args.data_dir)
+
+    start = time.perf_counter()
+    comparison, errors = compare_bills(refs, package)
+    elapsed = time.perf_counter() - start
+
+    for label, error in errors.items():
+        print(f"{label}: {error}")
+    if len(comparison):
+        with pd.option_context('display.width', 160, 'display.max_colwidth', 50):
+            print(comparison[['bill', 'title', 'status', 'stage', 'viability', 'passage', 'overall_chance']]
+                  .to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+    print(f"\n{len(refs)} bills fetched and scored in {elapsed * 1000:.0f} ms")
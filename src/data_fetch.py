@@ -2,372 +2,449 @@ import requests
 import pandas as pd
 from dotenv import load_dotenv
 import os
+import time
 import sqlite3
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import ratelimit
+from telemetry import span, timed
+from coalesce import fetch_once
+from records import Bill, Action, Cosponsor, Subjects
+from normalize import as_list, count_of, loads, name_of, normalize
 
 load_dotenv()
 CONGRESS_API_KEY = os.getenv('CONGRESS_API_KEY')
 LEGISCAN_API_KEY = os.getenv('LEGISCAN_API_KEY')  # If using
+# Point at a local stand-in (see local_api.py) for offline testing
+CONGRESS_API_BASE = os.getenv('CONGRESS_API_BASE', 'https://api.congress.gov/v3').rstrip('/')
+PAGE_LIMIT = 250  # Maximum allowed by the API
+PAGE_WORKERS = 8
+PAGE_RETRIES = 3  # further attempts for a page that fails after the first
+PAGE_RETRY_DELAY = 1  # seconds, doubled after each attempt
+
+def api_get(url, headers=None):
+    """
+    GET a Congress.gov URL after taking a token from the shared rate limiter
+    (a no-op unless API_RATE_LIMIT_DB is set); a 429 is reported to every
+    process sharing the limiter
+    """
+    ratelimit.acquire()
+    response = requests.get(url, headers=headers)
+    if response.status_code == 429:
+        ratelimit.throttled(response.headers.get('Retry-After'))
+    return response
+
+def fetch_all_pages(path, extract, limit=PAGE_LIMIT, max_workers=PAGE_WORKERS):
+    """
+    Fetch every page of a list endpoint in about two round-trips.
+
+    The first page gives pagination.count; the remaining offsets are then
+    requested concurrently and merged back in offset order. `extract` pulls
+    the list items out of one page. A later page that fails is retried with
+    backoff. Returns (first_page_json, items), or (None, status_code) if the
+    first page fails or a later one still fails after PAGE_RETRIES, so a
+    truncated list is never returned as complete.
+    """
+    url = f'{CONGRESS_API_BASE}/{path}'
+    
+    def get_page(offset):
+        return api_get(f'{url}?api_key={CONGRESS_API_KEY}&limit={limit}&offset={offset}')
+    
+    with span('fetch_first_page', path=path):
+        response = get_page(0)
+    if response.status_code != 200:
+        return None, response.status_code
+    
+    first = loads(response.content)
+    items = list(extract(first))
+    count = first.get('pagination', {}).get('count', len(items))
+    offsets = list(range(limit, count, limit))
+    
+    if offsets:
+        with span('fetch_remaining_pages', path=path, pages=len(offsets)), \
+                ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as executor:
+            # Each worker runs in a copy of this context, so its spans (e.g. rate_limit_wait) join the trace
+            futures = [executor.submit(contextvars.copy_context().run, get_page, offset) for offset in offsets]
+            pages = {offset: future.result() for offset, future in zip(offsets, futures)}
+        
+        for offset in offsets:
+            delay = PAGE_RETRY_DELAY
+            for attempt in range(PAGE_RETRIES):
+                if pages[offset].status_code == 200:
+                    break
+                print(f"Error for {path} (offset {offset}): {pages[offset].status_code}, retrying in {delay}s")
+                time.sleep(delay)
+                delay *= 2
+                with span('fetch_page_retry', path=path, offset=offset, attempt=attempt + 1):
+                    pages[offset] = get_page(offset)
+            if pages[offset].status_code != 200:
+                print(f"Error for {path} (offset {offset}): {pages[offset].status_code}, giving up")
+                return None, pages[offset].status_code
+            items.extend(extract(loads(pages[offset].content)))
+    
+    return first, items
+
+def fetch_pages_until(path, extract, done=None, offset=0, limit=PAGE_LIMIT):
+    """
+    Fetch a list endpoint one page at a time from `offset`, stopping early once
+    done(page_items) is true. For delta fetches, where the new items usually
+    all sit on the first page read. Returns (pagination count, items), or
+    (None, status_code) if a page fails.
+    """
+    url = f'{CONGRESS_API_BASE}/{path}'
+    items = []
+    while True:
+        with span('fetch_page', path=path, offset=offset):
+            response = api_get(f'{url}?api_key={CONGRESS_API_KEY}&limit={limit}&offset={offset}')
+        if response.status_code != 200:
+            return None, response.status_code
+        data = loads(response.content)
+        page = list(extract(data))
+        items.extend(page)
+        count = data.get('pagination', {}).get('count', offset + len(page))
+        offset += limit
+        if not page or offset >= count or (done is not None and done(page)):
+            return count, items
 
+@timed()
 def fetch_bill_titles(bill_id, congress=118, bill_type='hr'):
     """
     Fetch all titles for a bill
     """
-    url = f'https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_id}/titles?api_key={CONGRESS_API_KEY}'
-    response = requests.get(url)
+    url = f'{CONGRESS_API_BASE}/bill/{congress}/{bill_type}/{bill_id}/titles?api_key={CONGRESS_API_KEY}'
+    response = api_get(url)
     
     if response.status_code == 200:
-        data = response.json()
-        titles_data = data.get('titles', [])
-        
-        # Find the short title
-        short_title = ''
-        official_title = ''
-        display_title = ''
-        
-        for title_item in titles_data:
-            if isinstance(title_item, dict):
-                title_type = title_item.get('titleType', '').lower()
-                title_text = title_item.get('title', '')
-                
-                if 'short' in title_type and title_text and not short_title:
-                    short_title = title_text
-                elif 'official' in title_type and title_text:
-                    official_title = title_text
-                elif 'display' in title_type and title_text:
-                    display_title = title_text
-        
-        return {
-            'short_title': short_title,
-            'official_title': official_title,
-            'display_title': display_title
-        }
+        return parse_bill_titles(loads(response.content))
     else:
         return {'short_title': '', 'official_title': '', 'display_title': ''}
 
+def parse_bill_titles(data):
+    """
+    Short, official and display titles from a /titles response
+    """
+    # Find the short title
+    short_title = ''
+    official_title = ''
+    display_title = ''
+    
+    for title_item in normalize('titles', data.get('titles', [])):
+        title_type = title_item['title_type'].lower()
+        title_text = title_item['title']
+        
+        if 'short' in title_type and title_text and not short_title:
+            short_title = title_text
+        elif 'official' in title_type and title_text:
+            official_title = title_text
+        elif 'display' in title_type and title_text:
+            display_title = title_text
+    
+    return {
+        'short_title': short_title,
+        'official_title': official_title,
+        'display_title': display_title
+    }
+
+@timed()
 def fetch_bill(bill_id, congress=118, bill_type='hr'):
     """
-    Fetch comprehensive bill information including sponsors, committees, and subjects
+    Fetch comprehensive bill information including sponsors, committees, and subjects.
+    Returns a records.Bill, or None if the bill can't be fetched.
     """
-    url = f'https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_id}?api_key={CONGRESS_API_KEY}'
-    response = requests.get(url)
+    url = f'{CONGRESS_API_BASE}/bill/{congress}/{bill_type}/{bill_id}?api_key={CONGRESS_API_KEY}'
+    response = api_get(url)
     
     if response.status_code == 200:
-        data = response.json()
-        bill_data = data.get('bill', {})
-        
-        # Extract sponsor information - handle list or single sponsor
-        sponsors_data = bill_data.get('sponsors', [])
-        if isinstance(sponsors_data, dict):
-            sponsors_data = [sponsors_data]
-        elif not isinstance(sponsors_data, list):
-            sponsors_data = []
-            
-        sponsor_names = [s.get('fullName', '') for s in sponsors_data if isinstance(s, dict)]
-        sponsor_parties = [s.get('party', 'Unknown') for s in sponsors_data if isinstance(s, dict)]
-        sponsor_states = [s.get('state', 'Unknown') for s in sponsors_data if isinstance(s, dict)]
+        bill = parse_bill(loads(response.content), bill_id, congress, bill_type)
         
-        # Count Democrats and Republicans
-        dem_sponsors = sum(1 for p in sponsor_parties if p == 'D')
-        rep_sponsors = sum(1 for p in sponsor_parties if p == 'R')
-        
-        # Extract committee information - handle various structures
-        committees = bill_data.get('committees', {})
-        committee_names = []
-        
-        if isinstance(committees, dict):
-            items = committees.get('item', [])
-            if isinstance(items, list):
-                committee_names = [c.get('name', '') for c in items if isinstance(c, dict) and c.get('name')]
-            elif isinstance(items, dict) and items.get('name'):
-                committee_names = [items.get('name')]
-        elif isinstance(committees, list):
-            committee_names = [c.get('name', '') for c in committees if isinstance(c, dict) and c.get('name')]
-        
-        # Extract policy area - handle different structures
-        policy_area_data = bill_data.get('policyArea', {})
-        if isinstance(policy_area_data, dict):
-            policy_area = policy_area_data.get('name', 'Unknown')
-        elif isinstance(policy_area_data, str):
-            policy_area = policy_area_data
-        else:
-            policy_area = 'Unknown'
-        
-        # Extract cosponsors count
-        cosponsors = bill_data.get('cosponsors', {})
-        if isinstance(cosponsors, dict):
-            cosponsor_count = cosponsors.get('count', 0)
-        elif isinstance(cosponsors, int):
-            cosponsor_count = cosponsors
-        else:
-            cosponsor_count = 0
+        # Fetch titles separately
+        return apply_short_title(bill, fetch_bill_titles(bill_id, congress, bill_type))
+    else:
+        print(f"Error for bill {bill_id}: {response.status_code}")
+        return None
+
+def parse_bill(data, bill_id, congress=118, bill_type='hr'):
+    """
+    Bill record from a /bill response; short_title is left blank for apply_short_title()
+    """
+    bill_data = data.get('bill', {})
+    
+    # Extract sponsor information - handle list or single sponsor
+    sponsors_data = normalize('sponsors', bill_data.get('sponsors', []))
+    sponsor_names = [s['name'] for s in sponsors_data]
+    sponsor_parties = [s['party'] for s in sponsors_data]
+    sponsor_states = [s['state'] for s in sponsors_data]
+    
+    # Count Democrats and Republicans
+    dem_sponsors = sum(1 for p in sponsor_parties if p == 'D')
+    rep_sponsors = sum(1 for p in sponsor_parties if p == 'R')
+    
+    # Extract committee information - handle various structures
+    committee_names = [c['name'] for c in normalize('committees', bill_data.get('committees', {})) if c['name']]
+    
+    # Extract policy area - handle different structures
+    policy_area = name_of(bill_data.get('policyArea', {}))
+    
+    # Extract cosponsors count
+    cosponsor_count = count_of(bill_data.get('cosponsors', {}))
+    
+    # Extract latest action
+    latest_action = bill_data.get('latestAction', {})
+    if not isinstance(latest_action, dict):
+        latest_action = {}
+    
+    # Extract title information
+    title = bill_data.get('title', '')
+    
+    return Bill(
+        bill_id=f"{congress}-{bill_type.upper()}-{bill_id}",
+        title=title,
+        short_title='',  # Will be filled by separate API call
+        status=latest_action.get('text', ''),
+        action_date=latest_action.get('actionDate', ''),
+        sponsors=', '.join(sponsor_names),
+        sponsor_parties=', '.join(sponsor_parties) if sponsor_parties else 'Unknown',
+        sponsor_states=', '.join(sponsor_states),
+        dem_sponsors=dem_sponsors,
+        rep_sponsors=rep_sponsors,
+        cosponsor_count=cosponsor_count,
+        committees=', '.join(committee_names),
+        policy_area=policy_area,
+        introduced_date=bill_data.get('introducedDate', ''),
+        congress=bill_data.get('congress', congress),
+        type=bill_data.get('type', bill_type.upper()),
+        is_bipartisan=dem_sponsors > 0 and rep_sponsors > 0,
+        update_date=bill_data.get('updateDate', '')
+    )
+
+def apply_short_title(bill, titles_info):
+    """
+    Fill short_title from parse_bill_titles() output, falling back to the display title
+    """
+    if titles_info['short_title']:
+        bill.short_title = titles_info['short_title']
+    elif titles_info['display_title']:
+        bill.short_title = titles_info['display_title']
+    
+    return bill
+
+@timed()
+def fetch_bill_status(bill_id, congress=118, bill_type='hr', etag=None, last_modified=None):
+    """
+    Cheap change probe for a bill using a conditional request.
+    Returns None on error, {'not_modified': True, ...} on 304, otherwise the
+    latest action, cosponsor count, validators for the next probe and the
+    parsed records.Bill (without its short title) under 'bill'.
+    """
+    url = f'{CONGRESS_API_BASE}/bill/{congress}/{bill_type}/{bill_id}?api_key={CONGRESS_API_KEY}'
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    response = api_get(url, headers=headers)
+    
+    validators = {
+        'etag': response.headers.get('ETag', etag),
+        'last_modified': response.headers.get('Last-Modified', last_modified)
+    }
+    
+    if response.status_code == 304:
+        return {'not_modified': True, **validators}
+    elif response.status_code == 200:
+        data = loads(response.content)
+        bill_data = data.get('bill', {})
         
-        # Extract latest action
         latest_action = bill_data.get('latestAction', {})
         if not isinstance(latest_action, dict):
             latest_action = {}
         
-        # Extract title information
-        title = bill_data.get('title', '')
+        cosponsor_count = count_of(bill_data.get('cosponsors', {}))
         
-        # Create DataFrame with comprehensive information first
-        df = pd.DataFrame({
-            'bill_id': [f"{congress}-{bill_type.upper()}-{bill_id}"],
-            'title': [title],
-            'short_title': [''],  # Will be filled by separate API call
-            'status': [latest_action.get('text', '')],
-            'action_date': [latest_action.get('actionDate', '')],
-            'sponsors': [', '.join(sponsor_names)],
-            'sponsor_parties': [', '.join(sponsor_parties) if sponsor_parties else 'Unknown'],
-            'sponsor_states': [', '.join(sponsor_states)],
-            'dem_sponsors': [dem_sponsors],
-            'rep_sponsors': [rep_sponsors],
-            'cosponsor_count': [cosponsor_count],
-            'committees': [', '.join(committee_names)],
-            'policy_area': [policy_area],
-            'introduced_date': [bill_data.get('introducedDate', '')],
-            'congress': [bill_data.get('congress', congress)],
-            'type': [bill_data.get('type', bill_type.upper())],
-            'is_bipartisan': [dem_sponsors > 0 and rep_sponsors > 0]
-        })
-        
-        # Fetch titles separately
-        titles_info = fetch_bill_titles(bill_id, congress, bill_type)
-        if titles_info['short_title']:
-            df.loc[0, 'short_title'] = titles_info['short_title']
-        elif titles_info['display_title']:
-            df.loc[0, 'short_title'] = titles_info['display_title']
-        
-        return df
+        return {
+            'not_modified': False,
+            'latest_action_date': latest_action.get('actionDate', ''),
+            'latest_action_text': latest_action.get('text', ''),
+            'cosponsor_count': cosponsor_count,
+            'update_date': bill_data.get('updateDate', ''),
+            'bill': parse_bill(data, bill_id, congress, bill_type),
+            **validators
+        }
     else:
-        print(f"Error for bill {bill_id}: {response.status_code}")
-        return pd.DataFrame()
+        print(f"Error for bill status {bill_id}: {response.status_code}")
+        return None
 
+@timed()
 def fetch_bill_actions(bill_id, congress=118, bill_type='hr'):
     """
-    Fetch all bill actions with pagination support
+    Fetch all bill actions as records.Action, most recent first, requesting
+    every page after the first concurrently
     """
-    all_actions = []
-    offset = 0
-    limit = 250  # Maximum allowed by the API
+    first, actions_data = fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/actions', extract_actions)
     
-    while True:
-        # Add limit and offset parameters for pagination
-        url = f'https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_id}/actions?api_key={CONGRESS_API_KEY}&limit={limit}&offset={offset}'
-        response = requests.get(url)
+    if first is None:
+        print(f"Error for actions {bill_id}: {actions_data}")
+        return []
+    
+    return parse_bill_actions(actions_data, bill_id, congress, bill_type)
+
+@timed()
+def fetch_new_actions(bill_id, congress=118, bill_type='hr', is_known=None):
+    """
+    Actions added since the last fetch, most recent first. The API lists
+    actions newest first, so pages are read one at a time and reading stops
+    at the first page holding an action is_known(action) recognises; the
+    known actions on that page are returned too. None if a page fails.
+    """
+    def done(page):
+        return is_known is not None and any(
+            is_known(action) for action in parse_bill_actions(page, bill_id, congress, bill_type, verbose=False))
+
+    count, actions_data = fetch_pages_until(f'bill/{congress}/{bill_type}/{bill_id}/actions', extract_actions, done)
+    if count is None:
+        print(f"Error for actions {bill_id}: {actions_data}")
+        return None
+    return parse_bill_actions(actions_data, bill_id, congress, bill_type, verbose=False)
+
+def extract_actions(data):
+    return as_list(data.get('actions', []))
+
+def parse_bill_actions(actions_data, bill_id, congress=118, bill_type='hr', verbose=True):
+    """
+    De-duplicated actions, most recent first, from the merged action items
+    (verbose=False skips the per-bill log line, for bulk use)
+    """
+    key = f"{congress}-{bill_type.upper()}-{bill_id}"
+    all_actions = []
+    seen = set()
+    for a in normalize('actions', actions_data):
+        # Remove duplicates based on date and text
+        if (a['date'], a['text']) in seen:
+            continue
+        seen.add((a['date'], a['text']))
         
-        if response.status_code == 200:
-            data = response.json()
-            actions_data = data.get('actions', [])
-            
-            # If actions_data is empty, we've reached the end
-            if not actions_data:
-                break
-            
-            for a in actions_data:
-                # Handle committees field which can be a dict or list
-                committees_data = a.get('committees', {})
-                
-                # Extract committee names based on data structure
-                if isinstance(committees_data, dict):
-                    # If it's a dict, look for 'item' field
-                    items = committees_data.get('item', [])
-                    if isinstance(items, list):
-                        committee_names = [c.get('name', '') for c in items if isinstance(c, dict)]
-                    elif isinstance(items, dict):
-                        committee_names = [items.get('name', '')]
-                    else:
-                        committee_names = []
-                elif isinstance(committees_data, list):
-                    # If it's already a list of committees
-                    committee_names = [c.get('name', '') for c in committees_data if isinstance(c, dict)]
-                else:
-                    committee_names = []
-                
-                action = {
-                    'bill_id': f"{congress}-{bill_type.upper()}-{bill_id}",
-                    'date': a.get('actionDate'),
-                    'text': a.get('text', ''),
-                    'type': a.get('type', ''),
-                    'action_code': a.get('actionCode', ''),
-                    'source_system': a.get('sourceSystem', {}).get('name', '') if isinstance(a.get('sourceSystem'), dict) else '',
-                    'committees': ', '.join(committee_names),
-                    'chamber': a.get('chamber', '')  # Add chamber info
-                }
-                all_actions.append(action)
-            
-            # Check if we got less than the limit - if so, we're done
-            if len(actions_data) < limit:
-                break
-            
-            # Otherwise, increment offset for next page
-            offset += limit
-            
-            # Safety check to prevent infinite loops
-            if offset > 5000:  # Reasonable upper limit
-                print(f"Warning: Reached maximum offset limit for bill {bill_id}")
-                break
-        else:
-            print(f"Error for actions {bill_id} (offset {offset}): {response.status_code}")
-            break
-    
-    # Create DataFrame and remove any duplicates
+        a['committees'] = ', '.join(c['name'] for c in a['committees'])
+        all_actions.append(Action(bill_id=key, **a))
+    
     if all_actions:
-        df_actions = pd.DataFrame(all_actions)
-        # Remove duplicates based on date and text
-        df_actions = df_actions.drop_duplicates(subset=['date', 'text'], keep='first')
-        # Sort by date descending
-        df_actions['date_parsed'] = pd.to_datetime(df_actions['date'], errors='coerce')
-        df_actions = df_actions.sort_values('date_parsed', ascending=False)
-        df_actions = df_actions.drop('date_parsed', axis=1)
+        # Sort by date descending (ISO dates sort as strings; undated actions go last)
+        all_actions.sort(key=lambda action: action.date or '', reverse=True)
         
-        print(f"Fetched {len(df_actions)} unique actions for {bill_type.upper()}.{bill_id}")
-        return df_actions
-    else:
+        if verbose:
+            print(f"Fetched {len(all_actions)} unique actions for {bill_type.upper()}.{bill_id}")
+    elif verbose:
         print(f"No actions found for {bill_id}")
-        return pd.DataFrame()
+    return all_actions
 
+@timed()
 def fetch_cosponsors(bill_id, congress=118, bill_type='hr'):
     """
-    Fetch detailed cosponsor information
+    Fetch detailed cosponsor information: (list of records.Cosponsor, party counts)
     """
-    url = f'https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_id}/cosponsors?api_key={CONGRESS_API_KEY}'
-    response = requests.get(url)
+    first, cosponsors_data = fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/cosponsors',
+                                             extract_cosponsors)
     
-    if response.status_code == 200:
-        data = response.json()
-        cosponsors_data = data.get('cosponsors', [])
-        
-        # Handle case where cosponsors is a dict with items
-        if isinstance(cosponsors_data, dict):
-            items = cosponsors_data.get('item', [])
-            if isinstance(items, list):
-                cosponsors_data = items
-            elif isinstance(items, dict):
-                cosponsors_data = [items]
-            else:
-                cosponsors_data = []
-        elif not isinstance(cosponsors_data, list):
-            cosponsors_data = []
-        
-        cosponsors = []
-        for c in cosponsors_data:
-            if isinstance(c, dict):
-                cosponsor = {
-                    'bill_id': f"{congress}-{bill_type.upper()}-{bill_id}",
-                    'name': c.get('fullName', ''),
-                    'party': c.get('party', ''),
-                    'state': c.get('state', ''),
-                    'district': c.get('district', ''),
-                    'sponsored_date': c.get('sponsorshipDate', ''),
-                    'is_original': c.get('isOriginalCosponsor', False)
-                }
-                cosponsors.append(cosponsor)
-        
-        df_cosponsors = pd.DataFrame(cosponsors)
-        
-        # Calculate party breakdown
-        if not df_cosponsors.empty:
-            party_counts = df_cosponsors['party'].value_counts().to_dict()
-            return df_cosponsors, party_counts
-        else:
-            return df_cosponsors, {}
+    if first is not None:
+        return parse_cosponsors(cosponsors_data, bill_id, congress, bill_type)
     else:
-        print(f"Error for cosponsors {bill_id}: {response.status_code}")
-        return pd.DataFrame(), {}
+        print(f"Error for cosponsors {bill_id}: {cosponsors_data}")
+        return [], {}
 
-def fetch_subjects(bill_id, congress=118, bill_type='hr'):
+@timed()
+def fetch_cosponsors_from(bill_id, congress=118, bill_type='hr', offset=0):
     """
-    Fetch bill subjects
+    (cosponsor records from position `offset` on, total listed). The API
+    lists cosponsors in the order they signed on and keeps withdrawn ones
+    listed, so new cosponsors normally come at the end. (None, None) if a page fails.
     """
-    url = f'https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_id}/subjects?api_key={CONGRESS_API_KEY}'
-    response = requests.get(url)
+    count, cosponsors_data = fetch_pages_until(f'bill/{congress}/{bill_type}/{bill_id}/cosponsors',
+                                               extract_cosponsors, offset=offset)
+    if count is None:
+        print(f"Error for cosponsors {bill_id}: {cosponsors_data}")
+        return None, None
+    cosponsors, _ = parse_cosponsors(cosponsors_data, bill_id, congress, bill_type)
+    return cosponsors, count
+
+def extract_cosponsors(data):
+    return as_list(data.get('cosponsors', []))
+
+def parse_cosponsors(cosponsors_data, bill_id, congress=118, bill_type='hr'):
+    """
+    (cosponsor records, party counts) from the merged cosponsor items
+    """
+    key = f"{congress}-{bill_type.upper()}-{bill_id}"
+    cosponsors = [Cosponsor(bill_id=key, **c) for c in normalize('cosponsors', cosponsors_data)]
     
-    if response.status_code == 200:
-        data = response.json()
-        subjects = data.get('subjects', {})
-        
-        # Extract legislative subjects - handle different structures
-        legislative_subjects = subjects.get('legislativeSubjects', [])
-        
-        # Handle case where legislativeSubjects is a list directly
-        if isinstance(legislative_subjects, list):
-            subject_names = [s.get('name', '') for s in legislative_subjects if isinstance(s, dict) and s.get('name')]
-        # Handle case where it's a dict with 'item' field
-        elif isinstance(legislative_subjects, dict):
-            items = legislative_subjects.get('item', [])
-            if isinstance(items, list):
-                subject_names = [s.get('name', '') for s in items if isinstance(s, dict) and s.get('name')]
-            elif isinstance(items, dict) and items.get('name'):
-                subject_names = [items.get('name', '')]
-            else:
-                subject_names = []
-        else:
-            subject_names = []
-        
-        # Extract policy area - handle different structures
-        policy_area = subjects.get('policyArea', {})
-        if isinstance(policy_area, dict):
-            policy_area_name = policy_area.get('name', 'Unknown')
-        elif isinstance(policy_area, str):
-            policy_area_name = policy_area
-        else:
-            policy_area_name = 'Unknown'
-        
-        return {
-            'subjects': subject_names,
-            'policy_area': policy_area_name,
-            'subject_count': len(subject_names)
-        }
+    # Calculate party breakdown
+    party_counts = {}
+    for cosponsor in cosponsors:
+        party_counts[cosponsor.party] = party_counts.get(cosponsor.party, 0) + 1
+    
+    return cosponsors, dict(sorted(party_counts.items(), key=lambda item: -item[1]))
+
+@timed()
+def fetch_subjects(bill_id, congress=118, bill_type='hr', strict=False):
+    """
+    Fetch bill subjects as a records.Subjects (empty on error, or None with strict=True)
+    """
+    first, legislative_subjects = fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/subjects',
+                                                  extract_subjects)
+    
+    if first is not None:
+        return parse_subjects(first, legislative_subjects)
     else:
-        print(f"Error for subjects {bill_id}: {response.status_code}")
-        return {'subjects': [], 'policy_area': 'Unknown', 'subject_count': 0}
+        print(f"Error for subjects {bill_id}: {legislative_subjects}")
+        return None if strict else Subjects()
 
+def extract_subjects(data):
+    return as_list(data.get('subjects', {}).get('legislativeSubjects', []))
+
+def parse_subjects(first, legislative_subjects):
+    """
+    Subject names and policy area; the policy area only appears on the first page
+    """
+    subject_names = [s['name'] for s in normalize('subjects', legislative_subjects) if s['name']]
+    
+    # Extract policy area - handle different structures
+    policy_area_name = name_of(first.get('subjects', {}).get('policyArea', {}))
+    
+    return Subjects(subjects=subject_names, policy_area=policy_area_name, subject_count=len(subject_names))
+
+@timed()
 def fetch_text_versions(bill_id, congress=118, bill_type='hr'):
     """
     Fetch available text versions of the bill
     """
-    url = f'https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_id}/text?api_key={CONGRESS_API_KEY}'
-    response = requests.get(url)
+    first, text_versions_data = fetch_all_pages(f'bill/{congress}/{bill_type}/{bill_id}/text',
+                                                extract_text_versions)
     
-    if response.status_code == 200:
-        data = response.json()
-        text_versions_data = data.get('textVersions', [])
-        
-        # Handle case where textVersions is a dict with items
-        if isinstance(text_versions_data, dict):
-            items = text_versions_data.get('item', [])
-            if isinstance(items, list):
-                text_versions_data = items
-            elif isinstance(items, dict):
-                text_versions_data = [items]
-            else:
-                text_versions_data = []
-        elif not isinstance(text_versions_data, list):
-            text_versions_data = []
-        
-        versions = []
-        for v in text_versions_data:
-            if isinstance(v, dict):
-                formats_data = v.get('formats', [])
-                format_types = []
-                
-                if isinstance(formats_data, list):
-                    format_types = [f.get('type', '') for f in formats_data if isinstance(f, dict)]
-                elif isinstance(formats_data, dict):
-                    format_types = [formats_data.get('type', '')]
-                
-                version = {
-                    'type': v.get('type', ''),
-                    'date': v.get('date', ''),
-                    'formats': format_types
-                }
-                versions.append(version)
-        
-        return pd.DataFrame(versions)
+    if first is not None:
+        return parse_text_versions(text_versions_data)
     else:
-        print(f"Error for text versions {bill_id}: {response.status_code}")
+        print(f"Error for text versions {bill_id}: {text_versions_data}")
         return pd.DataFrame()
 
+def extract_text_versions(data):
+    return as_list(data.get('textVersions', []))
+
+def parse_text_versions(text_versions_data):
+    """
+    One row per text version with its formats and their URLs
+    """
+    versions = []
+    for v in normalize('text_versions', text_versions_data):
+        version = {
+            'type': v['type'],
+            'date': v['date'],
+            'formats': [f['type'] for f in v['formats']],
+            'urls': {f['type']: f['url'] for f in v['formats']}
+        }
+        versions.append(version)
+    
+    return pd.DataFrame(versions)
+
+@timed()
 def fetch_public_comments(docket_id='CMS-2024-0001'):
     """
     Fetch public comments (unchanged from original)
@@ -384,65 +461,82 @@ def fetch_public_comments(docket_id='CMS-2024-0001'):
         print(f"Error for docket {docket_id}: {response.status_code}")
         return pd.DataFrame()
 
+@timed()
 def fetch_comprehensive_bill_data(bill_id, congress=118, bill_type='hr'):
     """
-    Fetch all available data for a bill
+    Fetch all available data for a bill. Concurrent calls for the same bill
+    share one fetch (see coalesce.py); each caller gets its own copy.
     """
+    key = f"{congress}-{bill_type.upper()}-{str(bill_id).strip().upper()}"
+    return fetch_once(key, lambda: _fetch_comprehensive_bill_data(bill_id, congress, bill_type))
+
+def _fetch_comprehensive_bill_data(bill_id, congress=118, bill_type='hr'):
     # Get basic bill info
-    bill_df = fetch_bill(bill_id, congress, bill_type)
+    bill = fetch_bill(bill_id, congress, bill_type)
     
-    if bill_df.empty:
+    if bill is None:
         return None
     
     # Get additional data
-    actions_df = fetch_bill_actions(bill_id, congress, bill_type)
-    cosponsors_df, party_breakdown = fetch_cosponsors(bill_id, congress, bill_type)
+    actions = fetch_bill_actions(bill_id, congress, bill_type)
+    cosponsors, party_breakdown = fetch_cosponsors(bill_id, congress, bill_type)
     subjects_data = fetch_subjects(bill_id, congress, bill_type)
     text_versions_df = fetch_text_versions(bill_id, congress, bill_type)
     
+    return compile_bill_data(bill, actions, cosponsors, party_breakdown, subjects_data, text_versions_df)
+
+def committee_names(bill):
+    """
+    Committees on the bill record; committee_count is the length of this list
+    wherever it is computed (fetch path and feature store)
+    """
+    return bill.committees.split(', ') if bill.committees else []
+
+def compile_bill_data(bill, actions, cosponsors, party_breakdown, subjects_data, text_versions_df):
+    """
+    Combine the per-endpoint results into the comprehensive bill dict with derived metrics
+    """
     # Calculate original cosponsor count
-    original_cosponsor_count = 0
-    if not cosponsors_df.empty and 'is_original' in cosponsors_df.columns:
-        original_cosponsor_count = cosponsors_df['is_original'].sum()
+    original_cosponsor_count = sum(1 for c in cosponsors if c.is_original)
+    
+    dem_total = bill.dem_sponsors + party_breakdown.get('D', 0)
+    rep_total = bill.rep_sponsors + party_breakdown.get('R', 0)
     
     # Compile comprehensive data
     comprehensive_data = {
-        'bill_info': bill_df,
-        'actions': actions_df,
-        'cosponsors': cosponsors_df,
+        'bill_info': bill,
+        'actions': actions,
+        'cosponsors': cosponsors,
         'cosponsor_party_breakdown': party_breakdown,
         'subjects': subjects_data,
         'text_versions': text_versions_df,
         'metrics': {
-            'total_actions': len(actions_df),
-            'total_cosponsors': len(cosponsors_df),
+            'total_actions': len(actions),
+            'total_cosponsors': len(cosponsors),
             'original_cosponsor_count': original_cosponsor_count,
             'dem_cosponsors': party_breakdown.get('D', 0),
             'rep_cosponsors': party_breakdown.get('R', 0),
             'ind_cosponsors': party_breakdown.get('I', 0),
-            'bipartisan_score': calculate_bipartisan_score(bill_df, party_breakdown),
-            'days_since_introduction': calculate_days_active(bill_df),
-            'committee_count': len(bill_df['committees'].values[0].split(',')) if bill_df['committees'].values[0] else 0,
-            'dem_sponsors': bill_df['dem_sponsors'].values[0] if not bill_df.empty else 0,
-            'rep_sponsors': bill_df['rep_sponsors'].values[0] if not bill_df.empty else 0,
-            'total_sponsors': (bill_df['dem_sponsors'].values[0] + bill_df['rep_sponsors'].values[0]) if not bill_df.empty else 1,
-            'dem_total': bill_df['dem_sponsors'].values[0] + party_breakdown.get('D', 0) if not bill_df.empty else 0,
-            'rep_total': bill_df['rep_sponsors'].values[0] + party_breakdown.get('R', 0) if not bill_df.empty else 0,
-            'party_dominance': abs((bill_df['dem_sponsors'].values[0] + party_breakdown.get('D', 0)) - 
-                                 (bill_df['rep_sponsors'].values[0] + party_breakdown.get('R', 0))) / 
-                              max((bill_df['dem_sponsors'].values[0] + bill_df['rep_sponsors'].values[0] + 
-                                   len(cosponsors_df)), 1) if not bill_df.empty else 0
+            'bipartisan_score': calculate_bipartisan_score(bill, party_breakdown),
+            'days_since_introduction': calculate_days_active(bill),
+            'committee_count': len(committee_names(bill)),
+            'dem_sponsors': bill.dem_sponsors,
+            'rep_sponsors': bill.rep_sponsors,
+            'total_sponsors': bill.dem_sponsors + bill.rep_sponsors,
+            'dem_total': dem_total,
+            'rep_total': rep_total,
+            'party_dominance': abs(dem_total - rep_total) / max(bill.dem_sponsors + bill.rep_sponsors + len(cosponsors), 1)
         }
     }
     
     return comprehensive_data
 
-def calculate_bipartisan_score(bill_df, party_breakdown):
+def calculate_bipartisan_score(bill, party_breakdown):
     """
     Calculate a bipartisan score based on sponsor and cosponsor party distribution
     """
-    total_d = bill_df['dem_sponsors'].values[0] + party_breakdown.get('D', 0)
-    total_r = bill_df['rep_sponsors'].values[0] + party_breakdown.get('R', 0)
+    total_d = bill.dem_sponsors + party_breakdown.get('D', 0)
+    total_r = bill.rep_sponsors + party_breakdown.get('R', 0)
     total = total_d + total_r
     
     if total == 0:
@@ -454,13 +548,13 @@ def calculate_bipartisan_score(bill_df, party_breakdown):
     
     return bipartisan_score
 
-def calculate_days_active(bill_df):
+def calculate_days_active(bill):
     """
     Calculate days since bill introduction
     """
     from datetime import datetime
     
-    introduced_date = bill_df['introduced_date'].values[0]
+    introduced_date = bill.introduced_date
     if introduced_date:
         try:
             intro_date = pd.to_datetime(introduced_date)
@@ -474,18 +568,16 @@ def calculate_days_active(bill_df):
 if __name__ == "__main__":
     # Fetch multiple bills
     bill_ids = list(range(1, 51)) + [f'S{i}' for i in range(1, 21)]  # H.R.1-50, S.1-20
-    bill_dfs = []
-    actions_dfs = []
+    bills = []
+    actions = []
     for bid in bill_ids:
-        bill_df = fetch_bill(bid)
-        if not bill_df.empty:
-            bill_dfs.append(bill_df)
-        actions_df = fetch_bill_actions(bid)
-        if not actions_df.empty:
-            actions_dfs.append(actions_df)
-
-    all_bills = pd.concat(bill_dfs, ignore_index=True)
-    all_actions = pd.concat(actions_dfs, ignore_index=True)
+        bill = fetch_bill(bid)
+        if bill is not None:
+            bills.append(bill)
+        actions.extend(fetch_bill_actions(bid))
+
+    all_bills = Bill.to_frame(bills)
+    all_actions = Action.to_frame(actions)
     comments_data = fetch_public_comments()
 
     # Save with UTF-8
@@ -0,0 +1,235 @@
+"""
+Title/summary embeddings with a persistent vector cache.
+
+Texts are encoded in CPU-sized batches by a small sentence-transformer
+(mean-pooled, L2-normalized) and stored as float16 rows in a flat file that
+is memory-mapped for reads. An SQLite index maps (bill_id, kind) to a row and
+the hash of the text that was encoded, so a bill is only re-encoded when its
+title or summary changes. Appends take SQLite's write lock (and a thread
+lock, since the app shares one cache across sessions), so concurrent writers
+in any process never get the same rows. torch/transformers are imported the
+first time something actually needs encoding, never at import time.
+
+Usage:
+    python src/embeddings.py --csv data/bills_6congress_training.csv --column title
+    python src/embeddings.py --csv data/bills_summaries.csv --column summary --kind summary
+"""
+import os
+import hashlib
+import sqlite3
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+EMBEDDING_DIR = 'data/embeddings'
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+BATCH_SIZE = 64
+MAX_TOKENS = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS embeddings (
+    bill_id TEXT,
+    kind TEXT,
+    text_hash TEXT,
+    row INTEGER,
+    PRIMARY KEY (bill_id, kind)
+);
+"""
+
+def text_hash(text):
+    """
+    Hash of the normalized text, used to tell whether a cached vector is stale
+    """
+    return hashlib.sha1(' '.join(str(text).split()).encode('utf-8')).hexdigest()
+
+class Encoder:
+    """
+    Lazily loaded sentence encoder
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, batch_size=BATCH_SIZE, max_tokens=MAX_TOKENS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self._tokenizer = None
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            import torch
+            from transformers import AutoTokenizer, AutoModel
+
+            torch.set_grad_enabled(False)
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModel.from_pretrained(self.model_name).eval()
+        return self._tokenizer, self._model
+
+    def encode(self, texts):
+        """
+        Encode texts to L2-normalized float32 vectors, batching similar lengths together
+        """
+        import torch
+
+        tokenizer, model = self._load()
+        texts = [str(t) for t in texts]
+        vectors = np.zeros((len(texts), model.config.hidden_size), dtype=np.float32)
+        # Sorting by length keeps padding (and wasted CPU) per batch small
+        order = np.argsort([len(t) for t in texts])
+        for start in range(0, len(texts), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch = tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                              max_length=self.max_tokens, return_tensors='pt')
+            with torch.inference_mode():
+                hidden = model(**batch).last_hidden_state
+            mask = batch['attention_mask'].unsqueeze(-1).float()
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=1)
+            vectors[idx] = pooled.numpy()
+        return vectors
+
+class EmbeddingCache:
+    """
+    float16 vector file plus (bill_id, kind) -> row index
+    """
+
+    def __init__(self, root=EMBEDDING_DIR, encoder=None):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.vectors_path = os.path.join(root, 'vectors.f16')
+        self.conn = sqlite3.connect(os.path.join(root, 'index.db'), timeout=30, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.encoder = encoder or Encoder()
+        self._vectors = None
+        self._lock = threading.Lock()
+        self._dim = self._meta('dim')
+        if self._dim is not None:
+            self._dim = int(self._dim)
+            model_name = self._meta('model')
+            if model_name != self.encoder.model_name:
+                raise ValueError(f"Cache in {root} was built with {model_name}, not {self.encoder.model_name}")
+
+    def _meta(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        if self._dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (2 * self._dim)
+
+    @property
+    def vectors(self):
+        """
+        Memory-mapped (rows x dim) float16 array of every stored vector
+        """
+        if self._vectors is None or len(self._vectors) != len(self):
+            n = len(self)
+            if n == 0:
+                return np.zeros((0, self._dim or 0), dtype=np.float16)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode='r', shape=(n, self._dim))
+        return self._vectors
+
+    def _store(self, vectors, bill_ids, hashes, kind):
+        """
+        Append vectors to the file and point their bills at the new rows; returns
+        {bill_id: (row, text_hash)}. Row numbers come from the file size, so the
+        append and the index update are one critical section: the thread lock
+        covers sessions sharing this cache, BEGIN IMMEDIATE (SQLite's write lock)
+        other processes. A crash in between only leaves unreferenced rows.
+        """
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self._dim is None:
+                    self._dim = int(self._meta('dim') or vectors.shape[1])
+                    self.conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                                          [('dim', str(self._dim)), ('model', self.encoder.model_name)])
+                first_row = len(self)
+                with open(self.vectors_path, 'ab') as f:
+                    f.write(np.ascontiguousarray(vectors, dtype=np.float16).tobytes())
+                updates = [(bill_id, kind, hashed, first_row + n)
+                           for n, (bill_id, hashed) in enumerate(zip(bill_ids, hashes))]
+                self.conn.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)', updates)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return {bill_id: (row, hashed) for bill_id, _, hashed, row in updates}
+
+    def rows(self, bill_ids, kind='title'):
+        """
+        {bill_id: (row, text_hash)} for cached entries
+        """
+        bill_ids = [str(b) for b in bill_ids]
+        found = {}
+        with self._lock:
+            for start in range(0, len(bill_ids), 900):
+                chunk = bill_ids[start:start + 900]
+                query = (f"SELECT bill_id, row, text_hash FROM embeddings "
+                         f"WHERE kind = ? AND bill_id IN ({','.join('?' * len(chunk))})")
+                for bill_id, row, hashed in self.conn.execute(query, (kind, *chunk)):
+                    found[bill_id] = (row, hashed)
+        return found
+
+    def get(self, bill_ids, texts, kind='title'):
+        """
+        Vectors (float32) for these bills, encoding only missing or changed texts
+        """
+        bill_ids = [str(b) for b in bill_ids]
+        hashes = [text_hash(t) for t in texts]
+        cached = self.rows(bill_ids, kind)
+
+        stale = [i for i, (b, h) in enumerate(zip(bill_ids, hashes)) if cached.get(b, (None, None))[1] != h]
+        if stale:
+            encoded = self.encoder.encode([texts[i] for i in stale])
+            cached.update(self._store(encoded, [bill_ids[i] for i in stale], [hashes[i] for i in stale], kind))
+
+        row_numbers = np.array([cached[b][0] for b in bill_ids], dtype=np.int64)
+        return np.asarray(self.vectors[row_numbers], dtype=np.float32)
+
+    def embed(self, texts):
+        """
+        Vectors (float32) for texts without storing them, e.g. a live bill's
+        title, which mustn't turn up as a historical match for later lookups
+        """
+        return self.encoder.encode(texts)
+
+    def embed_frame(self, df, text_column='title', id_column='bill_id', kind=None):
+        """
+        Embed a DataFrame column for training; returns a (len(df) x dim) float32 array
+        """
+        texts = df[text_column].fillna('').astype(str).tolist()
+        return self.get(df[id_column].astype(str).tolist(), texts, kind or text_column)
+
+    def nearest(self, vector, k=10, kind='title', exclude=None):
+        """
+        Top-k cached bills by cosine similarity to a vector: DataFrame of bill_id, similarity
+        """
+        with self._lock:
+            index = pd.read_sql_query('SELECT bill_id, row FROM embeddings WHERE kind = ?', self.conn, params=(kind,))
+        if exclude is not None:
+            index = index[index['bill_id'] != str(exclude)]
+        if index.empty:
+            return pd.DataFrame(columns=['bill_id', 'similarity'])
+        scores = self.vectors[index['row'].to_numpy()].astype(np.float32) @ np.asarray(vector, dtype=np.float32)
+        top = np.argsort(-scores)[:k]
+        return pd.DataFrame({'bill_id': index['bill_id'].to_numpy()[top], 'similarity': scores[top]})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Embed bill titles/summaries into the vector cache')
+    parser.add_argument('--csv', required=True, help='CSV with a bill_id column and a text column')
+    parser.add_argument('--column', default='title')
+    parser.add_argument('--kind', help='Cache key for this text (defaults to the column name)')
+    parser.add_argument('--cache-dir', default=EMBEDDING_DIR)
+    parser.add_argument('--model', default=EMBEDDING_MODEL)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.cache_dir, Encoder(args.model, args.batch_size))
+    df = pd.read_csv(args.csv, usecols=['bill_id', args.column])
+    vectors = cache.embed_frame(df, args.column, kind=args.kind)
+    print(f"{len(vectors)} {args.kind or args.column} embeddings ({vectors.shape[1]} dims), "
+          f"{len(cache)} rows in {args.cache_dir}")
@@ -0,0 +1,226 @@
+"""
+Per-bill explanations for the stage ensembles.
+
+Each ensemble member is decomposed exactly into a base value plus one
+contribution per selected feature:
+- RF: tree-path contributions. Every split a sample passes through moves the
+  class-1 probability from the parent's value to the child's; that change is
+  credited to the split feature. All trees' node deltas are stacked into one
+  sparse (nodes x features) matrix once per model, so a batch is explained
+  with one decision_path call and one sparse product.
+- GB: the same on the regression trees, in log-odds (scaled by learning rate).
+- LR: coefficient x scaled value, in log-odds.
+
+Log-odds contributions are rescaled onto the probability change of their
+model, and the three are combined with the soft-voting weights, so base +
+sum(contributions) equals the ensemble's predicted probability. Results are
+kept in a per-model LRU keyed on the feature-vector hash; the explainers are
+shared by every app session, so the LRU is behind a lock.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from scoring import prepare_stage_input
+
+CACHE_SIZE = 4096
+
+def _node_deltas(tree, n_features, value_fn):
+    """
+    Sparse (nodes x features) matrix of value changes credited to each parent's split feature,
+    plus the root value
+    """
+    t = tree.tree_
+    values = value_fn(t.value)
+    parent = np.full(t.node_count, -1)
+    internal = np.flatnonzero(t.children_left >= 0)
+    parent[t.children_left[internal]] = internal
+    parent[t.children_right[internal]] = internal
+    children = np.flatnonzero(parent >= 0)
+    deltas = sparse.csr_matrix(
+        (values[children] - values[parent[children]], (children, t.feature[parent[children]])),
+        shape=(t.node_count, n_features)
+    )
+    return deltas, values[0]
+
+def _class_one_probability(classes):
+    position = list(classes).index(1) if 1 in list(classes) else len(classes) - 1
+
+    def value_fn(value):
+        counts = value[:, 0, :]
+        return counts[:, position] / counts.sum(axis=1)
+    return value_fn
+
+class TreePathExplainer:
+    """
+    Exact path contributions for a RandomForestClassifier, GradientBoostingClassifier
+    or compact_models.CompactForest
+    """
+
+    def __init__(self, model):
+        self.model = model
+        n_features = model.n_features_in_
+        if hasattr(model, 'path_contributions'):
+            # compact_models.CompactForest walks its own paths
+            self.link = 'identity'
+            return
+        if hasattr(model, 'learning_rate'):
+            # Gradient boosting: raw (log-odds) values, one regression tree per stage
+            self.trees = [est[0] for est in model.estimators_]
+            scale = model.learning_rate
+            value_fn = lambda value: value[:, 0, 0] * scale
+            self.link = 'logit'
+        else:
+            self.trees = list(model.estimators_)
+            scale = 1.0 / len(self.trees)
+            prob_fn = _class_one_probability(model.classes_)
+            value_fn = lambda value: prob_fn(value) * scale
+            self.link = 'identity'
+
+        blocks, roots = zip(*(_node_deltas(tree, n_features, value_fn) for tree in self.trees))
+        self.deltas = sparse.vstack(blocks).tocsr()
+        self.tree_bias = float(np.sum(roots))
+
+    def _paths(self, X):
+        if self.link == 'identity':
+            return self.model.decision_path(X)[0]
+        return sparse.hstack([tree.decision_path(X) for tree in self.trees]).tocsr()
+
+    def raw_contributions(self, X):
+        """
+        (bias, n x features contributions) in the model's raw output space
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if hasattr(self.model, 'path_contributions'):
+            return self.model.path_contributions(X)
+        contributions = np.asarray((self._paths(X) @ self.deltas).todense())
+        bias = self.tree_bias
+        if self.link == 'logit':
+            bias += float(np.ravel(self.model._raw_predict_init(X[:1]))[0])
+        return bias, contributions
+
+class LinearExplainer:
+    """
+    Coefficient x value contributions for a logistic regression
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.link = 'logit'
+
+    def raw_contributions(self, X):
+        X = np.asarray(X, dtype=float)
+        return float(self.model.intercept_[0]), X * self.model.coef_[0]
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def probability_contributions(explainer, X):
+    """
+    (base probability, n x features contributions summing to each row's probability)
+    """
+    bias, raw = explainer.raw_contributions(X)
+    if explainer.link == 'identity':
+        return np.full(len(raw), bias), raw
+    # Spread each row's probability change over features in proportion to their log-odds share
+    total = raw.sum(axis=1)
+    base = _expit(bias)
+    change = _expit(bias + total) - base
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(np.abs(total) > 1e-12, change / total, base * (1 - base))
+    return np.full(len(raw), base), raw * ratio[:, None]
+
+class EnsembleExplainer:
+    """
+    Weighted combination of the member explainers for one stage model
+    """
+
+    def __init__(self, stage_model):
+        self.stage_model = stage_model
+        self.features = stage_model['selected_features']
+        weights = np.asarray(stage_model.get('ensemble_weights') or [1, 1, 1], dtype=float)
+        self.weights = weights / weights.sum()
+        self.members = [
+            TreePathExplainer(stage_model['rf_model']),
+            TreePathExplainer(stage_model['gb_model']),
+            LinearExplainer(stage_model['lr_model'])
+        ]
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compute(self, X):
+        base = np.zeros(len(X))
+        contributions = np.zeros((len(X), len(self.features)))
+        for weight, explainer in zip(self.weights, self.members):
+            member_base, member_contrib = probability_contributions(explainer, X)
+            base += weight * member_base
+            contributions += weight * member_contrib
+        return base, contributions
+
+    def explain_selected(self, X_selected):
+        """
+        Explain already scaled/selected rows. Returns DataFrame of contributions plus 'base'.
+        """
+        X = np.asarray(X_selected, dtype=float)
+        keys = [hashlib.sha1(row.tobytes()).hexdigest() for row in X]
+        rows = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    rows[key] = self._cache[key]
+        missing = [i for i, key in enumerate(keys) if key not in rows]
+        if missing:
+            # The result is built from this batch's own values; the LRU may
+            # evict them straight away if the batch is larger than CACHE_SIZE
+            base, contributions = self._compute(X[missing])
+            computed = {keys[i]: (base[n], contributions[n]) for n, i in enumerate(missing)}
+            rows.update(computed)
+            with self._lock:
+                self._cache.update(computed)
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        result = pd.DataFrame([rows[key][1] for key in keys], columns=self.features)
+        result['base'] = [rows[key][0] for key in keys]
+        return result
+
+    def explain(self, features_df):
+        """
+        Explain rows of a feature frame (from features.build_feature_frame)
+        """
+        X_selected = prepare_stage_input(self.stage_model, features_df)
+        result = self.explain_selected(X_selected.to_numpy())
+        result.index = features_df.index
+        return result
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+def get_explainer(stage_model):
+    """
+    Explainer for a stage model, built once per loaded model
+    """
+    key = id(stage_model['model'])
+    with _explainers_lock:
+        if key not in _explainers:
+            _explainers[key] = EnsembleExplainer(stage_model)
+        return _explainers[key]
+
+def top_factors(contributions, feature_values, n=5):
+    """
+    Largest positive and negative contributions for one explained row
+    """
+    row = contributions.drop(columns='base').iloc[0]
+    factors = pd.DataFrame({
+        'feature': row.index,
+        'value': [feature_values.get(f) for f in row.index],
+        'contribution': row.values
+    })
+    up = factors[factors['contribution'] > 0].nlargest(n, 'contribution')
+    down = factors[factors['contribution'] < 0].nsmallest(n, 'contribution')
+    return up, down
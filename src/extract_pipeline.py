@@ -0,0 +1,578 @@
+"""
+Checkpointed, parallel extraction of the 6-Congress training dataset.
+
+Module version of the loop in data/extract_data.ipynb. Bills are fetched by a
+pool of worker threads that share one rate limiter, so the pool keeps the API
+budget saturated instead of sleeping between sequential calls. With
+API_RATE_LIMIT_DB set the limiter is the key's shared one (ratelimit.py), at
+bulk priority so the app's lookups go first. Every bill gets
+its own checkpoint row in SQLite (status, attempts, extracted features and the
+compressed raw payload), so an interrupted run resumes exactly where it
+stopped and failed bills can be retried without redoing the rest.
+
+Usage:
+    python src/extract_pipeline.py --congresses 113-118 --workers 8
+    python src/extract_pipeline.py --retry-failed
+    python src/extract_pipeline.py --export-only
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+
+from data_fetch import CONGRESS_API_KEY
+from normalize import loads, name_of, normalize
+from ratelimit import SharedRateLimiter
+import data_fetch
+
+# Configuration
+CACHE_DIR = 'data/api_cache'
+CHECKPOINT_DB = 'data/extraction_checkpoint.db'
+MAX_RETRIES = 3
+RETRY_DELAY = 5  # seconds
+REQUESTS_PER_HOUR = 5000  # Congress.gov per-key budget
+DEFAULT_WORKERS = 8
+DEFAULT_CONGRESSES = list(range(113, 119))
+DEFAULT_BILL_TYPES = ['hr', 's', 'hjres', 'sjres']
+
+logger = logging.getLogger('extract_pipeline')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    congress INTEGER,
+    bill_type TEXT,
+    bill_numbers TEXT,
+    fetched_at TEXT,
+    PRIMARY KEY (congress, bill_type)
+);
+CREATE TABLE IF NOT EXISTS bills (
+    bill_key TEXT PRIMARY KEY,
+    congress INTEGER,
+    bill_type TEXT,
+    bill_number TEXT,
+    status TEXT DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    features TEXT,
+    raw BLOB,
+    error TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bills_status ON bills (status);
+"""
+
+class FetchError(Exception):
+    """
+    A request still failed after every retry
+    """
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by all workers
+    """
+
+    def __init__(self, requests_per_hour=REQUESTS_PER_HOUR, burst=10):
+        self.rate = requests_per_hour / 3600.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.total = 0
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.total += 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self, seconds):
+        """
+        After a 429, hold every worker off for `seconds`
+        """
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+class CheckpointStore:
+    """
+    Per-bill checkpoint records in SQLite
+    """
+
+    def __init__(self, path=CHECKPOINT_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def get_listing(self, congress, bill_type):
+        row = self.conn.execute(
+            'SELECT bill_numbers FROM listings WHERE congress = ? AND bill_type = ?',
+            (congress, bill_type)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_listing(self, congress, bill_type, bill_numbers):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)',
+                (congress, bill_type, json.dumps(bill_numbers), datetime.now().isoformat())
+            )
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO bills (bill_key, congress, bill_type, bill_number, updated_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(f"{congress}-{bill_type}-{n}", congress, bill_type, str(n), datetime.now().isoformat())
+                 for n in bill_numbers]
+            )
+
+    def pending(self, congresses, bill_types, retry_failed=False, max_attempts=MAX_RETRIES):
+        """
+        Bills that still need fetching, in congress/type/number order
+        """
+        statuses = ('pending', 'failed') if retry_failed else ('pending',)
+        congress_marks = ','.join('?' * len(congresses))
+        type_marks = ','.join('?' * len(bill_types))
+        status_marks = ','.join('?' * len(statuses))
+        return self.conn.execute(
+            f"""SELECT congress, bill_type, bill_number FROM bills
+                WHERE congress IN ({congress_marks}) AND bill_type IN ({type_marks})
+                  AND status IN ({status_marks}) AND attempts < ?
+                ORDER BY congress, bill_type, CAST(bill_number AS INTEGER)""",
+            (*congresses, *bill_types, *statuses, max_attempts)
+        ).fetchall()
+
+    def record(self, bill_key, features=None, raw=None, error=None):
+        status = 'done' if features is not None else 'failed'
+        with self.lock, self.conn:
+            self.conn.execute(
+                """UPDATE bills SET status = ?, attempts = attempts + 1, features = ?, raw = ?,
+                       error = ?, updated_at = ?
+                   WHERE bill_key = ?""",
+                (status,
+                 json.dumps(features) if features is not None else None,
+                 zlib.compress(json.dumps(raw).encode('utf-8')) if raw is not None else None,
+                 error, datetime.now().isoformat(), bill_key)
+            )
+
+    def counts(self):
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM bills GROUP BY status').fetchall())
+
+    def iter_features(self):
+        for (features,) in self.conn.execute("SELECT features FROM bills WHERE status = 'done'"):
+            yield loads(features)
+
+    def iter_raw(self, congresses=None):
+        """
+        Yield (bill_key, raw detail payload) for every extracted bill
+        """
+        query = "SELECT bill_key, raw FROM bills WHERE status = 'done' AND raw IS NOT NULL"
+        params = ()
+        if congresses:
+            query += f" AND congress IN ({','.join('?' * len(congresses))})"
+            params = tuple(congresses)
+        for bill_key, raw in self.conn.execute(query, params):
+            yield bill_key, loads(zlib.decompress(raw))
+
+    def iter_bills(self, congresses=None):
+        """
+        Yield (bill_key, extracted features, raw detail payload) for every extracted bill
+        """
+        query = "SELECT bill_key, features, raw FROM bills WHERE status = 'done' AND raw IS NOT NULL"
+        params = ()
+        if congresses:
+            query += f" AND congress IN ({','.join('?' * len(congresses))})"
+            params = tuple(congresses)
+        for bill_key, features, raw in self.conn.execute(query, params):
+            yield bill_key, loads(features), loads(zlib.decompress(raw))
+
+def fetch_with_retry(url, limiter, max_retries=MAX_RETRIES):
+    """
+    Fetch URL with retry logic and caching. Returns None on 404 and raises
+    FetchError once the retries run out, so a bill is never stored with a
+    sub-resource silently missing.
+    """
+    cache_key = url.split('?')[0].replace('/', '_').replace(':', '')
+    query = url.split('?', 1)[1] if '?' in url else ''
+    # Drop the API key from the cache key, keep paging parameters
+    query = '&'.join(p for p in query.split('&') if not p.startswith('api_key='))
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}_{query.replace('&', '_')}.json")
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                return loads(f.read())
+        except (OSError, ValueError):
+            pass  # If cache is corrupted, fetch fresh
+
+    for attempt in range(max_retries):
+        limiter.acquire()
+        try:
+            response = requests.get(url, timeout=30)
+            if response.status_code == 200:
+                data = loads(response.content)
+                with open(cache_file, 'w') as f:
+                    json.dump(data, f)
+                return data
+            elif response.status_code == 429:  # Rate limited
+                wait_time = int(response.headers.get('Retry-After', 60))
+                logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
+                limiter.throttled(wait_time)
+            elif response.status_code == 404:
+                return None
+            else:
+                logger.warning(f"HTTP {response.status_code} for {url.split('?')[0]}")
+        except requests.exceptions.Timeout:
+            logger.warning(f"Timeout on attempt {attempt + 1} for {url.split('?')[0]}")
+        except Exception as e:
+            logger.error(f"Error on attempt {attempt + 1} for {url.split('?')[0]}: {str(e)}")
+
+        if attempt < max_retries - 1:
+            time.sleep(RETRY_DELAY * (attempt + 1))
+
+    raise FetchError(f"Gave up on {url.split('?')[0]} after {max_retries} attempts")
+
+def fetch_paginated(url, key, limiter, limit=250):
+    """
+    Fetch every page of a list endpoint (FetchError if a page keeps failing)
+    """
+    items = []
+    offset = 0
+    while True:
+        data = fetch_with_retry(f"{url}?api_key={CONGRESS_API_KEY}&limit={limit}&offset={offset}", limiter)
+        if not data:
+            break
+        page = data.get(key, [])
+        if not page:
+            break
+        items.extend(page)
+        offset += limit
+        if offset >= data.get('pagination', {}).get('count', 0):
+            break
+    return items
+
+def get_all_bills_for_congress(congress, bill_type, limiter):
+    """
+    Get the bill numbers for a specific congress and type
+    """
+    bills = fetch_paginated(f"{data_fetch.CONGRESS_API_BASE}/bill/{congress}/{bill_type}", 'bills', limiter)
+    logger.info(f"Found {len(bills)} {bill_type.upper()} bills in Congress {congress}")
+    return [str(b.get('number', '')) for b in bills if b.get('number')]
+
+def fetch_detailed_bill_info(congress, bill_type, bill_number, limiter):
+    """
+    Fetch comprehensive bill information; None if the bill doesn't exist,
+    FetchError if it or any sub-resource can't be fetched
+    """
+    base_url = f"{data_fetch.CONGRESS_API_BASE}/bill/{congress}/{bill_type}/{bill_number}"
+
+    bill_data = fetch_with_retry(f"{base_url}?api_key={CONGRESS_API_KEY}", limiter)
+    if not bill_data:
+        return None
+
+    subjects_data = fetch_with_retry(f"{base_url}/subjects?api_key={CONGRESS_API_KEY}", limiter)
+    committees_data = fetch_with_retry(f"{base_url}/committees?api_key={CONGRESS_API_KEY}", limiter)
+
+    return {
+        'bill': bill_data.get('bill', {}),
+        'cosponsors': fetch_paginated(f"{base_url}/cosponsors", 'cosponsors', limiter),
+        'subjects': subjects_data.get('subjects', {}) if subjects_data else {},
+        'actions': fetch_paginated(f"{base_url}/actions", 'actions', limiter),
+        'committees': committees_data.get('committees', {}) if committees_data else {}
+    }
+
+def extract_features_safe(bill_info):
+    """
+    Safely extract features with comprehensive error handling
+    """
+    try:
+        if not bill_info or not bill_info.get('bill'):
+            return None
+
+        bill = bill_info['bill']
+
+        # Basic info
+        features = {
+            'bill_id': f"{bill.get('congress')}-{bill.get('type')}-{bill.get('number')}",
+            'congress': bill.get('congress'),
+            'bill_type': bill.get('type'),
+            'bill_number': bill.get('number'),
+            'title': bill.get('title', ''),
+            'introduced_date': bill.get('introducedDate'),
+            'url': bill.get('url', ''),
+        }
+
+        # Policy area
+        features['policy_area'] = name_of(bill.get('policyArea'))
+
+        # Sponsor information
+        sponsors = normalize('sponsors', bill.get('sponsors', []))
+        if sponsors:
+            main_sponsor = sponsors[0]
+            features['sponsor_name'] = main_sponsor['name']
+            features['sponsor_party'] = main_sponsor['party']
+            features['sponsor_state'] = main_sponsor['state']
+            features['sponsor_bioguide_id'] = main_sponsor['bioguide_id']
+        else:
+            features['sponsor_name'] = ''
+            features['sponsor_party'] = 'Unknown'
+            features['sponsor_state'] = ''
+            features['sponsor_bioguide_id'] = ''
+
+        features['sponsor_count'] = len(sponsors)
+
+        # Count sponsors by party
+        sponsor_parties = [s['party'] for s in sponsors]
+        features['dem_sponsors'] = sponsor_parties.count('D')
+        features['rep_sponsors'] = sponsor_parties.count('R')
+        features['ind_sponsors'] = features['sponsor_count'] - features['dem_sponsors'] - features['rep_sponsors']
+
+        # Cosponsor information
+        cosponsors = normalize('cosponsors', bill_info.get('cosponsors', []), fields=('party', 'is_original'))
+        features['cosponsor_count'] = len(cosponsors)
+
+        # Count cosponsors by party
+        cosponsor_parties = [c['party'] for c in cosponsors]
+        features['dem_cosponsors'] = cosponsor_parties.count('D')
+        features['rep_cosponsors'] = cosponsor_parties.count('R')
+        features['ind_cosponsors'] = features['cosponsor_count'] - features['dem_cosponsors'] - features['rep_cosponsors']
+
+        # Original cosponsors
+        features['original_cosponsor_count'] = sum(1 for c in cosponsors if c['is_original'])
+
+        # Bipartisan features
+        total_sponsors = features['sponsor_count'] + features['cosponsor_count']
+        total_dem = features['dem_sponsors'] + features['dem_cosponsors']
+        total_rep = features['rep_sponsors'] + features['rep_cosponsors']
+
+        features['is_bipartisan'] = int(total_dem > 0 and total_rep > 0)
+        features['bipartisan_ratio'] = min(total_dem, total_rep) / total_sponsors * 2 if total_sponsors > 0 else 0
+
+        # Committees from the bill data and the committees endpoint
+        committee_items = normalize('committees', bill.get('committees', {}))
+        committee_items += normalize('committees', bill_info.get('committees', {}))
+        features['committee_count'] = len(set(c['name'] for c in committee_items))
+
+        # Latest action
+        latest_action = bill.get('latestAction', {})
+        if isinstance(latest_action, dict):
+            features['latest_action'] = latest_action.get('text', '')
+            features['latest_action_date'] = latest_action.get('actionDate', '')
+        else:
+            features['latest_action'] = ''
+            features['latest_action_date'] = ''
+
+        # Actions analysis
+        actions = normalize('actions', bill_info.get('actions', []), fields=('text',))
+        features['action_count'] = len(actions)
+
+        # Analyze action types
+        action_texts = [a['text'].lower() for a in actions]
+        features['referred_to_committee'] = sum(1 for a in action_texts if 'referred to' in a)
+        features['reported_by_committee'] = sum(1 for a in action_texts if 'reported' in a)
+        features['passed_house'] = int(any('passed house' in a or 'passed the house' in a for a in action_texts))
+        features['passed_senate'] = int(any('passed senate' in a or 'passed the senate' in a for a in action_texts))
+        features['has_amendments'] = int(any('amendment' in a for a in action_texts))
+        features['has_vote'] = int(any('vote' in a or 'yea-and-nay' in a or 'roll no' in a for a in action_texts))
+
+        # Subjects
+        subjects_data = bill_info.get('subjects', {})
+        subject_names = []
+        if isinstance(subjects_data, dict):
+            subject_names = [s['name'] for s in normalize('subjects', subjects_data.get('legislativeSubjects', []))]
+
+        features['subject_count'] = len(subject_names)
+        features['subjects'] = '; '.join(subject_names[:10])  # First 10 subjects
+
+        # Title analysis
+        features['title_length'] = len(features['title'])
+        features['title_word_count'] = len(features['title'].split())
+
+        # Determine passage status
+        latest = features['latest_action'].lower()
+        if features['passed_house'] and features['passed_senate']:
+            features['passed'] = 1
+        elif any(term in latest for term in ['became public law', 'signed by president', 'enacted']):
+            features['passed'] = 1
+        elif any(term in latest for term in ['failed', 'rejected', 'vetoed', 'motion to proceed not agreed']):
+            features['passed'] = 0
+        elif features['action_count'] < 3 and 'introduced' in latest:
+            features['passed'] = 0  # Bills with minimal action typically don't pass
+        else:
+            features['passed'] = -1  # Unknown/pending
+
+        return features
+
+    except Exception as e:
+        logger.error(f"Error extracting features: {str(e)}")
+        return None
+
+def process_bill(congress, bill_type, bill_number, limiter):
+    """
+    Fetch and extract one bill; returns (features, raw, error)
+    """
+    try:
+        detailed_info = fetch_detailed_bill_info(congress, bill_type, bill_number, limiter)
+        if not detailed_info:
+            return None, None, 'fetch failed'
+        features = extract_features_safe(detailed_info)
+        if not features:
+            return None, detailed_info, 'feature extraction failed'
+        return features, detailed_info, None
+    except Exception as e:
+        return None, None, str(e)
+
+def extract_comprehensive_dataset(congresses=DEFAULT_CONGRESSES, bill_types=DEFAULT_BILL_TYPES,
+                                  workers=DEFAULT_WORKERS, requests_per_hour=REQUESTS_PER_HOUR,
+                                  checkpoint_db=CHECKPOINT_DB, retry_failed=False, report_every=100):
+    """
+    Extract every bill with a rate-limited worker pool, checkpointing each bill
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    store = CheckpointStore(checkpoint_db)
+    if os.getenv('API_RATE_LIMIT_DB'):
+        # Share the key's budget with the app and other jobs, yielding to interactive lookups
+        limiter = SharedRateLimiter(os.getenv('API_RATE_LIMIT_DB'), priority='bulk')
+        requests_per_hour = round(limiter.rate * 3600)
+    else:
+        limiter = RateLimiter(requests_per_hour)
+
+    # Bill listings are checkpointed too, so resuming doesn't re-page them
+    for congress in congresses:
+        for bill_type in bill_types:
+            if store.get_listing(congress, bill_type) is None:
+                try:
+                    bill_numbers = get_all_bills_for_congress(congress, bill_type, limiter)
+                except FetchError as e:
+                    # Don't checkpoint a partial listing; the next run lists it again
+                    logger.error(f"Listing {congress} {bill_type.upper()} failed: {str(e)}")
+                    continue
+                store.save_listing(congress, bill_type, bill_numbers)
+
+    pending = store.pending(congresses, bill_types, retry_failed=retry_failed)
+    logger.info(f"{len(pending)} bills to fetch with {workers} workers "
+                f"({requests_per_hour} requests/hour budget); already done: {store.counts().get('done', 0)}")
+
+    start = time.monotonic()
+    completed = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_bill, congress, bill_type, number, limiter): f"{congress}-{bill_type}-{number}"
+            for congress, bill_type, number in pending
+        }
+        for future in as_completed(futures):
+            bill_key = futures[future]
+            features, raw, error = future.result()
+            store.record(bill_key, features, raw, error)
+            completed += 1
+            if error:
+                failed += 1
+                logger.warning(f"{bill_key}: {error}")
+
+            if completed % report_every == 0 or completed == len(pending):
+                report_throughput(completed, failed, len(pending), limiter, start)
+
+    return store
+
+def report_throughput(completed, failed, total, limiter, start):
+    """
+    Log bills/minute, request rate and an ETA at the current pace
+    """
+    elapsed = max(time.monotonic() - start, 1e-9)
+    bills_per_minute = completed / elapsed * 60
+    requests_per_minute = limiter.total / elapsed * 60
+    remaining = total - completed
+    eta_minutes = remaining / bills_per_minute if bills_per_minute else float('inf')
+    logger.info(
+        f"{completed}/{total} bills ({failed} failed) | {bills_per_minute:.1f} bills/min | "
+        f"{requests_per_minute:.0f} req/min of {limiter.rate * 60:.0f} budget | ETA {eta_minutes:.0f} min"
+    )
+    return bills_per_minute
+
+def export_dataset(store, output_dir='data'):
+    """
+    Build the feature CSVs from checkpointed bills, as the notebook did
+    """
+    df = pd.DataFrame(list(store.iter_features()))
+    if df.empty:
+        logger.error("No data extracted!")
+        return df
+
+    # Add calculated features
+    df['introduced_date'] = pd.to_datetime(df['introduced_date'], errors='coerce')
+    df['days_since_introduction'] = (datetime.now() - df['introduced_date']).dt.days
+    df['month_introduced'] = df['introduced_date'].dt.month
+    df['quarter_introduced'] = df['introduced_date'].dt.quarter
+    df['year_introduced'] = df['introduced_date'].dt.year
+    df['is_election_year'] = (df['year_introduced'] % 4 == 0).astype(int)
+
+    # Activity metrics
+    df['actions_per_day'] = df['action_count'] / (df['days_since_introduction'].fillna(1) + 1)
+    df['has_multiple_actions'] = (df['action_count'] > 3).astype(int)
+
+    df.to_csv(f'{output_dir}/bills_with_features_full.csv', index=False)
+    logger.info(f"Saved {len(df)} bills to bills_with_features_full.csv")
+
+    training_df = df[df['passed'] != -1].copy()
+    training_df.to_csv(f'{output_dir}/bills_training_data_full.csv', index=False)
+    logger.info(f"Saved {len(training_df)} bills with known outcomes for training")
+    return df
+
+def parse_congresses(value):
+    """
+    Parse '113-118' or '113,115' into a list of congress numbers
+    """
+    if '-' in value:
+        first, last = value.split('-')
+        return list(range(int(first), int(last) + 1))
+    return [int(c) for c in value.split(',')]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Checkpointed parallel bill extraction')
+    parser.add_argument('--congresses', default='113-118')
+    parser.add_argument('--types', default=','.join(DEFAULT_BILL_TYPES))
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--requests-per-hour', type=int, default=REQUESTS_PER_HOUR)
+    parser.add_argument('--db', default=CHECKPOINT_DB)
+    parser.add_argument('--retry-failed', action='store_true', help='Also retry bills that failed earlier')
+    parser.add_argument('--export-only', action='store_true', help='Only write CSVs from the checkpoint')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler('data/extraction_log.log'), logging.StreamHandler()]
+    )
+
+    if not CONGRESS_API_KEY and not args.export_only:
+        print("ERROR: CONGRESS_API_KEY not found!")
+        print("Please add your API key to the .env file")
+    else:
+        if args.export_only:
+            store = CheckpointStore(args.db)
+        else:
+            store = extract_comprehensive_dataset(
+                congresses=parse_congresses(args.congresses),
+                bill_types=args.types.split(','),
+                workers=args.workers,
+                requests_per_hour=args.requests_per_hour,
+                checkpoint_db=args.db,
+                retry_failed=args.retry_failed
+            )
+        print(f"Checkpoint status: {store.counts()}")
+        export_dataset(store)
@@ -0,0 +1,465 @@
+import os
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from data_fetch import (fetch_bill, fetch_bill_titles, apply_short_title, fetch_new_actions,
+                        fetch_cosponsors_from, fetch_subjects, committee_names)
+from features import title_stats
+
+FEATURE_STORE_PATH = os.getenv('FEATURE_STORE_PATH', 'data/feature_store.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bill_aggregates (
+    bill_id TEXT PRIMARY KEY,
+    congress INTEGER,
+    bill_type TEXT,
+    bill_number TEXT,
+    introduced_date TEXT,
+    latest_action_date TEXT,
+    latest_action_text TEXT,
+    reported_cosponsor_count INTEGER DEFAULT 0,
+    title_length INTEGER,
+    title_word_count INTEGER,
+    sponsor_party TEXT DEFAULT 'Unknown',
+    sponsor_count INTEGER DEFAULT 1,
+    policy_area TEXT DEFAULT 'Unknown',
+    subject_count INTEGER DEFAULT 0,
+    dem_sponsors INTEGER DEFAULT 0,
+    rep_sponsors INTEGER DEFAULT 0,
+    committees TEXT DEFAULT '[]',
+    total_actions INTEGER DEFAULT 0,
+    first_action_date TEXT,
+    last_action_date TEXT,
+    total_cosponsors INTEGER DEFAULT 0,
+    original_cosponsor_count INTEGER DEFAULT 0,
+    dem_cosponsors INTEGER DEFAULT 0,
+    rep_cosponsors INTEGER DEFAULT 0,
+    ind_cosponsors INTEGER DEFAULT 0,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS bill_action_keys (
+    bill_id TEXT,
+    action_key TEXT,
+    PRIMARY KEY (bill_id, action_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bill_cosponsor_keys (
+    bill_id TEXT,
+    cosponsor_key TEXT,
+    PRIMARY KEY (bill_id, cosponsor_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bill_subject_syncs (
+    bill_id TEXT PRIMARY KEY,
+    update_date TEXT
+) WITHOUT ROWID;
+"""
+
+def make_bill_id(bill_id, congress=118, bill_type='hr'):
+    """
+    Build the bill key used throughout data_fetch (e.g. 118-HR-1234)
+    """
+    return f"{congress}-{bill_type.upper()}-{bill_id}"
+
+def _row_key(*parts):
+    """
+    Stable short hash used to recognise actions/cosponsors we've already counted
+    """
+    raw = '\x1f'.join('' if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def _as_rows(rows):
+    """
+    Records as a list; DataFrames become namedtuple rows with the same attribute names
+    """
+    if rows is None:
+        return []
+    if isinstance(rows, pd.DataFrame):
+        return list(rows.itertuples(index=False))
+    return list(rows)
+
+def metrics_from_aggregates(agg, now=None):
+    """
+    Derive the fetch_comprehensive_bill_data metrics dict from stored aggregates.
+    Only days_since_introduction depends on the clock, so it's computed at read time.
+    """
+    dem_total = agg['dem_sponsors'] + agg['dem_cosponsors']
+    rep_total = agg['rep_sponsors'] + agg['rep_cosponsors']
+    total_sponsors = agg['dem_sponsors'] + agg['rep_sponsors']
+
+    partisan_total = dem_total + rep_total
+    bipartisan_score = (min(dem_total, rep_total) / partisan_total) * 2 if partisan_total else 0
+
+    days_since_introduction = 0
+    if agg.get('introduced_date'):
+        try:
+            intro_date = pd.to_datetime(agg['introduced_date'])
+            days_since_introduction = ((now or datetime.now()) - intro_date).days
+        except (ValueError, TypeError):
+            days_since_introduction = 0
+
+    return {
+        'total_actions': agg['total_actions'],
+        'total_cosponsors': agg['total_cosponsors'],
+        'original_cosponsor_count': agg['original_cosponsor_count'],
+        'dem_cosponsors': agg['dem_cosponsors'],
+        'rep_cosponsors': agg['rep_cosponsors'],
+        'ind_cosponsors': agg['ind_cosponsors'],
+        'bipartisan_score': bipartisan_score,
+        'days_since_introduction': days_since_introduction,
+        'committee_count': len(json.loads(agg['committees'] or '[]')),
+        'dem_sponsors': agg['dem_sponsors'],
+        'rep_sponsors': agg['rep_sponsors'],
+        'total_sponsors': total_sponsors,
+        'dem_total': dem_total,
+        'rep_total': rep_total,
+        'party_dominance': abs(dem_total - rep_total) / max(total_sponsors + agg['total_cosponsors'], 1)
+    }
+
+def raw_features_from_aggregates(agg, now=None):
+    """
+    Raw model inputs from a stored aggregate row (see FeatureStore.raw_features)
+    """
+    metrics = metrics_from_aggregates(agg, now=now)
+
+    days_active = 1
+    if agg['first_action_date']:
+        days_active = ((now or datetime.now()) - pd.to_datetime(agg['first_action_date'])).days
+
+    return {
+        'bill_id': agg['bill_id'],
+        'sponsor_party': agg['sponsor_party'] or 'Unknown',
+        'sponsor_count': agg['sponsor_count'] or 1,
+        'original_cosponsor_count': metrics['original_cosponsor_count'],
+        'cosponsor_count': agg['reported_cosponsor_count'],
+        'title_length': agg['title_length'],
+        'title_word_count': agg['title_word_count'],
+        'subject_count': agg['subject_count'],
+        'policy_area': agg['policy_area'] or 'Unknown',
+        'dem_total': metrics['dem_total'],
+        'rep_total': metrics['rep_total'],
+        'bipartisan_score': metrics['bipartisan_score'],
+        'has_bipartisan_support': int(agg['dem_sponsors'] > 0 and agg['rep_sponsors'] > 0),
+        'days_active': days_active,
+        'action_count': metrics['total_actions'],
+        'committee_count': metrics['committee_count'],
+        'congress': agg['congress']
+    }
+
+class FeatureStore:
+    """
+    SQLite-backed store of per-bill aggregates that are updated from deltas.
+
+    Each action (keyed on date + text, matching the de-duplication in
+    fetch_bill_actions) and each cosponsor is counted exactly once, so feeding
+    the store a full refetch or just the newest page gives the same result.
+    Committees are the bill record's list, counted as in the fetch path.
+    """
+
+    def __init__(self, path=FEATURE_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get_aggregates(self, bill_key):
+        """
+        Return the stored aggregate row for a bill as a dict, or None
+        """
+        row = self.conn.execute(
+            'SELECT * FROM bill_aggregates WHERE bill_id = ?', (bill_key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def tracked_bills(self):
+        """
+        List the keys of every bill in the store
+        """
+        return [r[0] for r in self.conn.execute('SELECT bill_id FROM bill_aggregates ORDER BY bill_id')]
+
+    def _ensure_row(self, bill_key):
+        self.conn.execute(
+            'INSERT OR IGNORE INTO bill_aggregates (bill_id, updated_at) VALUES (?, ?)',
+            (bill_key, datetime.now().isoformat())
+        )
+
+    def has_action(self, bill_key, action):
+        """
+        Whether this action has already been folded into the bill's aggregates
+        """
+        return self.conn.execute(
+            'SELECT 1 FROM bill_action_keys WHERE bill_id = ? AND action_key = ?',
+            (bill_key, _row_key(action.date, action.text))
+        ).fetchone() is not None
+
+    def has_cosponsor(self, bill_key, cosponsor):
+        """
+        Whether this cosponsor has already been folded into the bill's aggregates
+        """
+        return self.conn.execute(
+            'SELECT 1 FROM bill_cosponsor_keys WHERE bill_id = ? AND cosponsor_key = ?',
+            (bill_key, _row_key(cosponsor.name, cosponsor.state, cosponsor.district))
+        ).fetchone() is not None
+
+    def upsert_bill(self, bill, update_title=True):
+        """
+        Record the bill-level fields from a fetch_bill record
+        (update_title=False keeps the stored title stats)
+        """
+        if bill is None:
+            return None
+
+        bill_key = bill.bill_id
+        _, _, bill_number = bill_key.split('-', 2)
+        title_length, title_word_count = title_stats(bill.short_title, bill.title) if update_title else (None, None)
+
+        with self.conn:
+            self._ensure_row(bill_key)
+            self.conn.execute(
+                """UPDATE bill_aggregates SET
+                       congress = ?, bill_type = ?, bill_number = ?, introduced_date = ?,
+                       latest_action_date = ?, latest_action_text = ?, reported_cosponsor_count = ?,
+                       title_length = COALESCE(?, title_length), title_word_count = COALESCE(?, title_word_count),
+                       sponsor_party = ?, sponsor_count = ?,
+                       policy_area = ?, dem_sponsors = ?, rep_sponsors = ?, committees = ?, updated_at = ?
+                   WHERE bill_id = ?""",
+                (int(bill.congress), str(bill.type).upper(), bill_number, bill.introduced_date,
+                 bill.action_date, bill.status, int(bill.cosponsor_count),
+                 title_length, title_word_count, bill.sponsor_parties,
+                 len(bill.sponsors.split(',')), bill.policy_area,
+                 int(bill.dem_sponsors), int(bill.rep_sponsors), json.dumps(committee_names(bill)),
+                 datetime.now().isoformat(), bill_key)
+            )
+        return bill_key
+
+    def apply_actions(self, bill_key, actions):
+        """
+        Fold actions (records.Action, or rows of an actions frame) into the
+        aggregates, counting only ones not seen before. Returns the number of new actions.
+        """
+        actions = _as_rows(actions)
+        if not actions:
+            return 0
+
+        new_count = 0
+        new_dates = []
+        with self.conn:
+            self._ensure_row(bill_key)
+            for action in actions:
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO bill_action_keys (bill_id, action_key) VALUES (?, ?)',
+                    (bill_key, _row_key(action.date, action.text))
+                )
+                if cursor.rowcount:
+                    new_count += 1
+                    if action.date:
+                        new_dates.append(str(action.date)[:10])
+
+            if new_count:
+                agg = self.get_aggregates(bill_key)
+                first_dates = [d for d in [agg['first_action_date']] + new_dates if d]
+                last_dates = [d for d in [agg['last_action_date']] + new_dates if d]
+                self.conn.execute(
+                    """UPDATE bill_aggregates SET
+                           total_actions = total_actions + ?, first_action_date = ?,
+                           last_action_date = ?, updated_at = ?
+                       WHERE bill_id = ?""",
+                    (new_count, min(first_dates) if first_dates else None,
+                     max(last_dates) if last_dates else None, datetime.now().isoformat(), bill_key)
+                )
+
+        return new_count
+
+    def apply_cosponsors(self, bill_key, cosponsors):
+        """
+        Fold cosponsors (records.Cosponsor, or rows of a cosponsors frame) into
+        the aggregates, counting only ones not seen before. Returns the number of new cosponsors.
+        """
+        cosponsors = _as_rows(cosponsors)
+        if not cosponsors:
+            return 0
+
+        counts = {'total': 0, 'original': 0, 'D': 0, 'R': 0, 'I': 0}
+        with self.conn:
+            self._ensure_row(bill_key)
+            for cosponsor in cosponsors:
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO bill_cosponsor_keys (bill_id, cosponsor_key) VALUES (?, ?)',
+                    (bill_key, _row_key(cosponsor.name, cosponsor.state, cosponsor.district))
+                )
+                if cursor.rowcount:
+                    counts['total'] += 1
+                    counts['original'] += int(bool(cosponsor.is_original))
+                    if cosponsor.party in counts:
+                        counts[cosponsor.party] += 1
+
+            if counts['total']:
+                self.conn.execute(
+                    """UPDATE bill_aggregates SET
+                           total_cosponsors = total_cosponsors + ?,
+                           original_cosponsor_count = original_cosponsor_count + ?,
+                           dem_cosponsors = dem_cosponsors + ?,
+                           rep_cosponsors = rep_cosponsors + ?,
+                           ind_cosponsors = ind_cosponsors + ?,
+                           updated_at = ?
+                       WHERE bill_id = ?""",
+                    (counts['total'], counts['original'], counts['D'], counts['R'], counts['I'],
+                     datetime.now().isoformat(), bill_key)
+                )
+
+        return counts['total']
+
+    def set_subjects(self, bill_key, subjects_data, update_date=None):
+        """
+        Record the subject count from a fetch_subjects result, and the bill's
+        updateDate it was read at (None leaves them to be re-read on the next refresh)
+        """
+        with self.conn:
+            self._ensure_row(bill_key)
+            self.conn.execute(
+                'UPDATE bill_aggregates SET subject_count = ? WHERE bill_id = ?',
+                (len(subjects_data.subjects), bill_key)
+            )
+            if update_date is not None:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO bill_subject_syncs (bill_id, update_date) VALUES (?, ?)',
+                    (bill_key, update_date)
+                )
+
+    def subjects_update_date(self, bill_key):
+        """
+        The bill updateDate subjects were last read at, or None if never
+        """
+        row = self.conn.execute(
+            'SELECT update_date FROM bill_subject_syncs WHERE bill_id = ?', (bill_key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, comprehensive_data):
+        """
+        Seed or update the store from a fetch_comprehensive_bill_data result
+        """
+        if not comprehensive_data:
+            return None
+        bill_key = self.upsert_bill(comprehensive_data['bill_info'])
+        if bill_key:
+            self.apply_actions(bill_key, comprehensive_data['actions'])
+            self.apply_cosponsors(bill_key, comprehensive_data['cosponsors'])
+            # fetch_subjects returns an empty record on error, so only a non-empty list counts as read
+            subjects = comprehensive_data['subjects']
+            self.set_subjects(bill_key, subjects,
+                              comprehensive_data['bill_info'].update_date if subjects.subjects else None)
+        return bill_key
+
+    def get_metrics(self, bill_key, now=None):
+        """
+        Return the metrics dict for a stored bill without touching the API
+        """
+        agg = self.get_aggregates(bill_key)
+        if agg is None:
+            return None
+        return metrics_from_aggregates(agg, now=now)
+
+    def raw_features(self, bill_key, now=None):
+        """
+        Raw model inputs for features.build_feature_frame, built from the store.
+        days_active counts from the first recorded action, as in the app.
+        """
+        agg = self.get_aggregates(bill_key)
+        if agg is None:
+            return None
+        return raw_features_from_aggregates(agg, now=now)
+
+    def raw_features_many(self, congress=None, now=None):
+        """
+        raw_features for every bill in the store (or of one congress) from a single query
+        """
+        query = 'SELECT * FROM bill_aggregates WHERE congress IS NOT NULL'
+        params = ()
+        if congress is not None:
+            query += ' AND congress = ?'
+            params = (congress,)
+        return [raw_features_from_aggregates(dict(row), now=now) for row in self.conn.execute(query, params)]
+
+    def refresh_bill(self, bill_id, congress=118, bill_type='hr', bill=None):
+        """
+        Re-check a tracked bill and pull only what changed.
+
+        The bill record is fetched unless `bill` passes one in (e.g. the
+        records.Bill from a fetch_bill_status probe; its titles are then only
+        fetched for a bill the store hasn't seen). Actions are only
+        fetched when the latest action moved, and then only the newest pages
+        up to the first action already stored; cosponsors only when the
+        reported count moved, and then only from the last stored one on
+        (the whole list if it didn't simply grow at the end); subjects when
+        the latest action or the bill's updateDate moved (CRS adds subjects
+        after introduction).
+        Returns (metrics, changes) where changes lists which parts were
+        refreshed and how many new rows were folded in, plus failed=True if a
+        delta fetch failed (the bill then stays changed and is retried).
+        """
+        bill_key = make_bill_id(bill_id, congress, bill_type)
+        previous = self.get_aggregates(bill_key)
+
+        update_title = True
+        if bill is None:
+            bill = fetch_bill(bill_id, congress, bill_type)
+        elif previous is None or previous['title_length'] is None:
+            bill = apply_short_title(bill, fetch_bill_titles(bill_id, congress, bill_type))
+        else:
+            update_title = False
+        if bill is None:
+            return self.get_metrics(bill_key), {}
+
+        changes = {}
+        actions_changed = (
+            previous is None
+            or previous['latest_action_date'] != bill.action_date
+            or previous['latest_action_text'] != bill.status
+        )
+        cosponsors_changed = (
+            previous is None
+            or previous['reported_cosponsor_count'] != int(bill.cosponsor_count)
+        )
+
+        failed = False
+        if actions_changed:
+            actions = fetch_new_actions(bill_id, congress, bill_type,
+                                        is_known=lambda action: self.has_action(bill_key, action))
+            if actions is None:
+                failed = True
+            else:
+                changes['new_actions'] = self.apply_actions(bill_key, actions)
+        if cosponsors_changed:
+            known = previous['total_cosponsors'] if previous else 0
+            cosponsors, listed = fetch_cosponsors_from(bill_id, congress, bill_type, offset=known)
+            new = sum(not self.has_cosponsor(bill_key, c) for c in cosponsors or [])
+            if cosponsors is not None and known + new != listed:
+                # The list didn't just grow at the end (reordered or shrunk): read all of it
+                cosponsors, _ = fetch_cosponsors_from(bill_id, congress, bill_type)
+            if cosponsors is None:
+                failed = True
+            else:
+                changes['new_cosponsors'] = self.apply_cosponsors(bill_key, cosponsors)
+        if actions_changed or self.subjects_update_date(bill_key) != bill.update_date:
+            subjects = fetch_subjects(bill_id, congress, bill_type, strict=True)
+            if subjects is None:
+                failed = True
+            else:
+                self.set_subjects(bill_key, subjects, bill.update_date)
+                changes['subjects'] = len(subjects.subjects)
+
+        # Record the new latest action last, and only if every delta arrived, so a failure is retried next time
+        if failed:
+            changes['failed'] = True
+        else:
+            self.upsert_bill(bill, update_title=update_title)
+        return self.get_metrics(bill_key), changes
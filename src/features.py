@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from collections import Counter
+
+# Inputs the derived features are built from, with the defaults the app falls back to
+RAW_FEATURE_DEFAULTS = {
+    'sponsor_party': 'Unknown',
+    'sponsor_count': 1,
+    'original_cosponsor_count': 0,
+    'cosponsor_count': 0,
+    'title_length': 100,
+    'title_word_count': 20,
+    'subject_count': 0,
+    'policy_area': 'Unknown',
+    'dem_total': 0,
+    'rep_total': 0,
+    'bipartisan_score': 0,
+    'has_bipartisan_support': 0,
+    'days_active': 1,
+    'action_count': 0,
+    'committee_count': 0,
+    'congress': 118
+}
+
+def title_stats(short_title, title):
+    """
+    Title length and word count, preferring the short title like the app does
+    """
+    text = short_title or title
+    if not text:
+        return RAW_FEATURE_DEFAULTS['title_length'], RAW_FEATURE_DEFAULTS['title_word_count']
+    return len(text), len(text.split())
+
+def raw_features_from_bill(bill, metrics, subjects_data, days_active, congress):
+    """
+    Collect the raw inputs for one bill from fetch_comprehensive_bill_data output
+    (a records.Bill, the metrics dict and a records.Subjects)
+    """
+    if bill is None:
+        raw = dict(RAW_FEATURE_DEFAULTS)
+    else:
+        title_length, title_word_count = title_stats(bill.short_title, bill.title)
+        raw = {
+            'sponsor_party': bill.sponsor_parties,
+            'sponsor_count': len(bill.sponsors.split(',')),
+            'cosponsor_count': bill.cosponsor_count,
+            'title_length': title_length,
+            'title_word_count': title_word_count,
+            'policy_area': bill.policy_area,
+            'has_bipartisan_support': int(bill.is_bipartisan)
+        }
+
+    raw.update({
+        'original_cosponsor_count': metrics.get('original_cosponsor_count', 0),
+        'subject_count': len(subjects_data.subjects),
+        'dem_total': metrics.get('dem_total', 0),
+        'rep_total': metrics.get('rep_total', 0),
+        'bipartisan_score': metrics.get('bipartisan_score', 0),
+        'days_active': days_active,
+        'action_count': metrics.get('total_actions', 0),
+        'committee_count': metrics.get('committee_count', 0),
+        'congress': congress
+    })
+    return raw
+
+class CategoryEncoder:
+    """
+    A fitted LabelEncoder compiled into lookup tables: a dict for single values
+    and a pandas categorical dtype that encodes a whole column in one pass.
+
+    Values the encoder never saw map to its 'Unknown' class (code 0 if it has
+    none) instead of raising, and are counted so drift in the incoming
+    categories shows up in drift().
+    """
+
+    def __init__(self, classes, unknown='Unknown'):
+        self.classes_ = np.asarray(classes)
+        self.codes = {cls: code for code, cls in enumerate(self.classes_.tolist())}
+        self.dtype = pd.CategoricalDtype(self.classes_.tolist())
+        self.unknown = unknown
+        self.unknown_code = self.codes.get(unknown, 0)
+        self.encoded = 0
+        self.unseen = Counter()
+
+    @classmethod
+    def from_label_encoder(cls, encoder):
+        return encoder if isinstance(encoder, cls) else cls(encoder.classes_)
+
+    def encode(self, value):
+        """
+        Code for one value
+        """
+        self.encoded += 1
+        code = self.codes.get(value)
+        if code is None:
+            self.unseen[value] += 1
+            return self.unknown_code
+        return code
+
+    def encode_column(self, values):
+        """
+        Codes for a column (Series, array or list) as an int array
+        """
+        values = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values
+        codes = pd.Categorical(values, dtype=self.dtype).codes.astype(np.int64)
+        unseen = codes < 0
+        self.encoded += len(codes)
+        if unseen.any():
+            self.unseen.update(values[unseen].tolist())
+            codes[unseen] = self.unknown_code
+        return codes
+
+    def drift(self, top=10):
+        """
+        How many values were encoded, how many were unseen, and the most common unseen ones
+        """
+        unseen = sum(self.unseen.values())
+        return {
+            'encoded': self.encoded,
+            'unseen': unseen,
+            'unseen_rate': unseen / self.encoded if self.encoded else 0.0,
+            'top_unseen': self.unseen.most_common(top)
+        }
+
+def compile_encoders(label_encoders):
+    """
+    {name: LabelEncoder} -> {name: CategoryEncoder}; already compiled encoders are kept
+    """
+    return {name: CategoryEncoder.from_label_encoder(encoder) for name, encoder in (label_encoders or {}).items()}
+
+def _encode_column(values, encoder):
+    """
+    Encode a categorical column; unseen values get the encoder's 'Unknown' class
+    """
+    if encoder is None:
+        return pd.Series(0, index=values.index)
+    return pd.Series(CategoryEncoder.from_label_encoder(encoder).encode_column(values), index=values.index)
+
+def build_feature_frame(raw, label_encoders=None, now=None):
+    """
+    Build the full model feature frame from raw per-bill inputs.
+
+    Accepts a DataFrame (one row per bill) or a list of dicts and computes every
+    derived feature column-wise, so scoring one bill or a whole Congress goes
+    through the same code. Formulas match the single-bill path in app.py.
+    """
+    df = pd.DataFrame(raw).copy() if not isinstance(raw, pd.DataFrame) else raw.copy()
+    for col, default in RAW_FEATURE_DEFAULTS.items():
+        if col not in df.columns:
+            df[col] = default
+        else:
+            df[col] = df[col].fillna(default)
+
+    now = now or datetime.now()
+    if 'month_introduced' not in df.columns:
+        df['month_introduced'] = now.month
+    if 'quarter_introduced' not in df.columns:
+        df['quarter_introduced'] = (now.month - 1) // 3 + 1
+    if 'is_election_year' not in df.columns:
+        df['is_election_year'] = int(now.year % 4 == 0)
+
+    label_encoders = label_encoders or {}
+    df['sponsor_party_encoded'] = _encode_column(df['sponsor_party'], label_encoders.get('party'))
+    df['policy_area_encoded'] = _encode_column(df['policy_area'], label_encoders.get('policy'))
+
+    days = df['days_active'].astype(float)
+    actions = df['action_count'].astype(float)
+    committees = df['committee_count'].astype(float)
+    months_active = (days / 30).clip(lower=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['total_sponsors'] = df['sponsor_count'] + df['cosponsor_count']
+        df['title_complexity'] = df['title_length'] / (df['title_word_count'] + 1)
+        df['party_balance'] = (df['dem_total'] - df['rep_total']) / (df['total_sponsors'] + 1)
+        df['party_dominance'] = df['party_balance'].abs()
+
+        df['is_fresh'] = (days <= 30).astype(int)
+        df['support_velocity'] = df['total_sponsors'] / np.sqrt(days)
+        df['cosponsor_growth'] = (df['cosponsor_count'] - df['original_cosponsor_count']) / months_active
+
+        df['log_days_active'] = np.log1p(days)
+        df['sqrt_days_active'] = np.sqrt(days)
+        df['activity_rate'] = actions / days.clip(lower=1)
+        df['normalized_activity'] = actions / np.log1p(days)
+        df['early_activity'] = actions / (days.clip(upper=30) + 1)
+        df['sustained_activity'] = actions / (days.clip(upper=180) + 1)
+        df['is_active'] = (days <= 90).astype(int)
+        df['is_stale'] = (days > 180).astype(int)
+        df['has_committee'] = (committees > 0).astype(int)
+        df['multi_committee'] = (committees >= 2).astype(int)
+        df['committee_density'] = committees / months_active
+        df['bipartisan_momentum'] = df['bipartisan_score'] * df['normalized_activity']
+        df['committee_activity'] = committees * df['activity_rate']
+
+    df['congress_numeric'] = df['congress'].astype(int)
+    df['is_recent_congress'] = (df['congress_numeric'] >= 117).astype(int)
+
+    return df
@@ -0,0 +1,351 @@
+"""
+Materialized leaderboard of every bill in a Congress, scored in batch.
+
+A refresh lists the Congress's bills (a few paged requests per bill type),
+compares each bill's updateDate with the one it was last synced at, pulls
+only the changed bills into the feature store (FeatureStore.refresh_bill,
+which itself only refetches the parts that moved), then re-scores the whole
+Congress from the store with scoring.score_bills in one batch. Re-scoring
+needs no API calls, so days_active and the stage model stay current for
+bills that didn't change.
+
+The table lives in SQLite with indexes on the sort/filter columns, so the
+leaderboard page (src/pages/1_Leaderboard.py) sorts, filters and paginates
+with a single LIMIT/OFFSET query however many bills there are.
+
+Usage:
+    python src/leaderboard.py --congress 118 --once
+    python src/leaderboard.py --congress 118 --every 360 --max-bills 1000
+    python src/leaderboard.py --congress 118 --top 25
+"""
+import os
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import schedule
+
+import data_fetch
+import ratelimit
+from data_fetch import fetch_all_pages
+from feature_store import FeatureStore, make_bill_id
+from features import build_feature_frame
+from normalize import as_list
+from scoring import load_model_package, score_bills
+
+LEADERBOARD_DB = os.getenv('LEADERBOARD_DB', 'data/leaderboard.db')
+DEFAULT_BILL_TYPES = ['hr', 's', 'hjres', 'sjres']
+DEFAULT_REFRESH_MINUTES = 360
+PAGE_SIZE = 50
+
+# Sortable columns (label shown on the page -> column)
+SORT_COLUMNS = {
+    'Viability': 'viability',
+    'Overall chance': 'overall_chance',
+    'Passage (if viable)': 'passage',
+    'Cosponsors': 'cosponsor_count',
+    'Actions': 'action_count',
+    'Latest action': 'latest_action_date',
+    'Last updated': 'listed_update_date'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leaderboard (
+    bill_id TEXT PRIMARY KEY,
+    congress INTEGER,
+    bill_type TEXT,
+    bill_number TEXT,
+    title TEXT,
+    listed_update_date TEXT,
+    synced_update_date TEXT,
+    latest_action_date TEXT,
+    latest_action_text TEXT,
+    sponsor_party TEXT,
+    policy_area TEXT,
+    cosponsor_count INTEGER,
+    action_count INTEGER,
+    committee_count INTEGER,
+    days_active INTEGER,
+    stage TEXT,
+    viability REAL,
+    viability_low REAL,
+    viability_high REAL,
+    passage REAL,
+    overall_chance REAL,
+    historical_pass_rate REAL,
+    scored_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_viability ON leaderboard (congress, viability);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_overall ON leaderboard (congress, overall_chance);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_policy ON leaderboard (congress, policy_area, viability);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_party ON leaderboard (congress, sponsor_party, viability);
+CREATE TABLE IF NOT EXISTS refresh_log (
+    congress INTEGER,
+    started_at TEXT,
+    finished_at TEXT,
+    listed INTEGER,
+    synced INTEGER,
+    failed INTEGER,
+    scored INTEGER
+);
+"""
+
+class Leaderboard:
+    """
+    The materialized leaderboard table plus the refresh that keeps it current
+    """
+
+    def __init__(self, db_path=LEADERBOARD_DB, store=None, model_package=None):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._store = store
+        self._model_package = model_package
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = FeatureStore()
+        return self._store
+
+    @property
+    def model_package(self):
+        if self._model_package is None:
+            self._model_package = load_model_package()
+        return self._model_package
+
+    def record_listing(self, congress, bill_type, items):
+        """
+        Upsert the listing fields (title, updateDate, latest action) for one bill type
+        """
+        rows = []
+        for item in items:
+            number = str(item.get('number', '')).strip()
+            if not number:
+                continue
+            latest = item.get('latestAction') if isinstance(item.get('latestAction'), dict) else {}
+            rows.append((make_bill_id(number, congress, bill_type), congress, bill_type.upper(), number,
+                         item.get('title', ''), item.get('updateDate', ''),
+                         latest.get('actionDate', ''), latest.get('text', '')))
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO leaderboard (bill_id, congress, bill_type, bill_number, title,
+                                            listed_update_date, latest_action_date, latest_action_text)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (bill_id) DO UPDATE SET
+                       title = excluded.title,
+                       listed_update_date = excluded.listed_update_date,
+                       latest_action_date = excluded.latest_action_date,
+                       latest_action_text = excluded.latest_action_text""",
+                rows
+            )
+        return len(rows)
+
+    def stale_bills(self, congress, limit=None):
+        """
+        Bills whose listed updateDate differs from the one they were last synced at,
+        most recently updated first
+        """
+        query = """SELECT bill_id, bill_type, bill_number, listed_update_date FROM leaderboard
+                   WHERE congress = ? AND synced_update_date IS NOT listed_update_date
+                   ORDER BY listed_update_date DESC"""
+        params = (congress,)
+        if limit:
+            query += ' LIMIT ?'
+            params += (limit,)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def sync(self, congress, bills):
+        """
+        Pull changed bills into the feature store. Returns (synced, failed) counts;
+        failed bills stay stale and are retried on the next refresh.
+        """
+        synced = failed = 0
+        for bill in bills:
+            before = self.store.get_aggregates(bill['bill_id'])
+            changes = {'failed': True}
+            try:
+                _, changes = self.store.refresh_bill(bill['bill_number'], congress, bill['bill_type'].lower())
+            except Exception as e:
+                print(f"Error syncing {bill['bill_id']}: {str(e)}")
+            after = self.store.get_aggregates(bill['bill_id'])
+            # refresh_bill stamps updated_at only once the bill record itself was fetched
+            if (changes.get('failed') or after is None
+                    or (before is not None and after['updated_at'] == before['updated_at'])):
+                failed += 1
+                continue
+            with self.conn:
+                self.conn.execute('UPDATE leaderboard SET synced_update_date = ? WHERE bill_id = ?',
+                                  (bill['listed_update_date'], bill['bill_id']))
+            synced += 1
+        return synced, failed
+
+    def rescore(self, congress, now=None):
+        """
+        Batch-score every stored bill of the Congress and write the scores back
+        """
+        raws = self.store.raw_features_many(congress=congress, now=now)
+        if not raws:
+            return 0
+        package = self.model_package
+        features_df = build_feature_frame(raws, package['label_encoders'], now=now)
+        scores = score_bills(features_df, package)
+        for name, encoder in package['label_encoders'].items():
+            drift = encoder.drift()
+            if drift['unseen']:
+                print(f"Encoder '{name}': {drift['unseen']} of {drift['encoded']} values unseen in training "
+                      f"(scored as Unknown), most common {drift['top_unseen'][:5]}")
+        if 'historical_pass_rate' not in scores.columns:
+            scores['historical_pass_rate'] = None
+        scored_at = (now or datetime.now()).isoformat()
+
+        rows = [
+            (raw['sponsor_party'], raw['policy_area'], int(raw['cosponsor_count'] or 0), int(raw['action_count'] or 0),
+             int(raw['committee_count'] or 0), int(raw['days_active']), score.stage, float(score.viability),
+             float(score.viability_low), float(score.viability_high), float(score.passage),
+             float(score.overall_chance),
+             None if pd.isna(score.historical_pass_rate) else float(score.historical_pass_rate),
+             scored_at, raw['bill_id'])
+            for raw, score in zip(raws, scores.itertuples(index=False))
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """UPDATE leaderboard SET sponsor_party = ?, policy_area = ?, cosponsor_count = ?,
+                       action_count = ?, committee_count = ?, days_active = ?, stage = ?, viability = ?,
+                       viability_low = ?, viability_high = ?, passage = ?, overall_chance = ?,
+                       historical_pass_rate = ?, scored_at = ?
+                   WHERE bill_id = ?""",
+                rows
+            )
+        return len(rows)
+
+    def refresh(self, congress, bill_types=DEFAULT_BILL_TYPES, max_bills=None):
+        """
+        List, sync the bills whose updateDate changed (at most max_bills, newest
+        first) and re-score the Congress. Returns the refresh_log row as a dict.
+        """
+        started = datetime.now()
+        listed = 0
+        for bill_type in bill_types:
+            first, items = fetch_all_pages(f'bill/{congress}/{bill_type}', lambda page: as_list(page.get('bills', [])))
+            if first is None:
+                print(f"Error listing {congress} {bill_type.upper()} bills: {items}")
+                continue
+            listed += self.record_listing(congress, bill_type, items)
+
+        stale = self.stale_bills(congress, limit=max_bills)
+        synced, failed = self.sync(congress, stale)
+        scored = self.rescore(congress)
+
+        log = {'congress': congress, 'started_at': started.isoformat(), 'finished_at': datetime.now().isoformat(),
+               'listed': listed, 'synced': synced, 'failed': failed, 'scored': scored}
+        with self.conn:
+            self.conn.execute('INSERT INTO refresh_log VALUES (?, ?, ?, ?, ?, ?, ?)', tuple(log.values()))
+        remaining = len(self.stale_bills(congress))
+        print(f"[{datetime.now():%H:%M:%S}] Congress {congress}: listed {listed}, synced {synced} changed bills "
+              f"({failed} failed, {remaining} still stale), scored {scored} in "
+              f"{(datetime.now() - started).total_seconds():.1f}s")
+        return log
+
+    def _where(self, congress, policy_areas=None, parties=None, search=None):
+        clauses = ['congress = ?', 'viability IS NOT NULL']
+        params = [congress]
+        if policy_areas:
+            clauses.append(f"policy_area IN ({','.join('?' * len(policy_areas))})")
+            params.extend(policy_areas)
+        if parties:
+            clauses.append(f"sponsor_party IN ({','.join('?' * len(parties))})")
+            params.extend(parties)
+        if search:
+            clauses.append('(title LIKE ? OR bill_number = ?)')
+            params.extend([f'%{search}%', search.strip()])
+        return ' AND '.join(clauses), params
+
+    def count(self, congress, policy_areas=None, parties=None, search=None):
+        where, params = self._where(congress, policy_areas, parties, search)
+        return self.conn.execute(f'SELECT COUNT(*) FROM leaderboard WHERE {where}', params).fetchone()[0]
+
+    def query(self, congress, sort='viability', descending=True, policy_areas=None, parties=None, search=None,
+              page=1, page_size=PAGE_SIZE):
+        """
+        One page of scored bills, sorted and filtered in SQLite.
+        Returns (DataFrame, total matching bills).
+        """
+        if sort not in SORT_COLUMNS.values():
+            raise ValueError(f"Can't sort by {sort}; choose one of {', '.join(SORT_COLUMNS.values())}")
+        total = self.count(congress, policy_areas, parties, search)
+        where, params = self._where(congress, policy_areas, parties, search)
+        order = 'DESC' if descending else 'ASC'
+        page_df = pd.read_sql_query(
+            f"""SELECT * FROM leaderboard WHERE {where}
+                ORDER BY {sort} {order}, bill_id LIMIT ? OFFSET ?""",
+            self.conn, params=params + [page_size, (max(page, 1) - 1) * page_size]
+        )
+        return page_df, total
+
+    def facets(self, congress, column):
+        """
+        Distinct values of a filter column ('policy_area' or 'sponsor_party') with bill counts
+        """
+        if column not in ('policy_area', 'sponsor_party'):
+            raise ValueError(f"No facet for {column}")
+        return [tuple(row) for row in self.conn.execute(
+            f"""SELECT {column}, COUNT(*) FROM leaderboard
+                WHERE congress = ? AND viability IS NOT NULL AND {column} IS NOT NULL
+                GROUP BY {column} ORDER BY COUNT(*) DESC""",
+            (congress,)
+        )]
+
+    def congresses(self):
+        return [r[0] for r in self.conn.execute(
+            'SELECT DISTINCT congress FROM leaderboard WHERE viability IS NOT NULL ORDER BY congress DESC')]
+
+    def last_refresh(self, congress):
+        row = self.conn.execute(
+            'SELECT * FROM refresh_log WHERE congress = ? ORDER BY finished_at DESC LIMIT 1', (congress,)
+        ).fetchone()
+        return dict(row) if row else None
+
+def run(congress, board=None, bill_types=DEFAULT_BILL_TYPES, max_bills=None, every=None):
+    """
+    Refresh now, then every `every` minutes if given
+    """
+    board = board or Leaderboard()
+    board.refresh(congress, bill_types, max_bills)
+    if not every:
+        return board
+
+    schedule.every(every).minutes.do(board.refresh, congress, bill_types, max_bills)
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build and refresh the scored bill leaderboard for a Congress')
+    parser.add_argument('--congress', type=int, default=118)
+    parser.add_argument('--types', default=','.join(DEFAULT_BILL_TYPES))
+    parser.add_argument('--max-bills', type=int, help='Sync at most this many changed bills per refresh')
+    parser.add_argument('--once', action='store_true', help='Refresh once and exit')
+    parser.add_argument('--every', type=int, default=DEFAULT_REFRESH_MINUTES, help='Refresh interval in minutes')
+    parser.add_argument('--top', type=int, help='Print the top N bills by viability instead of refreshing')
+    parser.add_argument('--db', default=LEADERBOARD_DB, help='Leaderboard database')
+    parser.add_argument('--api-base', help='Override the Congress.gov API base URL (e.g. a local stand-in)')
+    args = parser.parse_args()
+
+    if args.api_base:
+        data_fetch.CONGRESS_API_BASE = args.api_base.rstrip('/')
+    ratelimit.set_default_priority('bulk')
+
+    board = Leaderboard(args.db)
+    if args.top:
+        top, total = board.query(args.congress, page_size=args.top)
+        print(f"{total} scored bills in the {args.congress}th Congress")
+        print(top[['bill_id', 'title', 'sponsor_party', 'policy_area', 'stage', 'viability', 'overall_chance']]
+              .to_string(index=False, max_colwidth=60))
+    else:
+        run(args.congress, board, args.types.split(','), args.max_bills, every=None if args.once else args.every)
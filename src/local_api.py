@@ -0,0 +1,203 @@
+"""
+Local stand-in for the Congress.gov API, served from recorded JSON fixtures.
+
+Fixture layout (relative to the fixtures root):
+    bill/118/hr/1234.json               -> /v3/bill/118/hr/1234
+    bill/118/hr/1234/actions.json       -> /v3/bill/118/hr/1234/actions
+    bill/118/hr/1234/cosponsors.json    -> /v3/bill/118/hr/1234/cosponsors
+
+List endpoints honour limit/offset and report pagination.count, responses
+carry an ETag/Last-Modified and answer conditional requests with 304.
+Editing a fixture file is enough to make the bill look "changed".
+
+Usage:
+    python src/local_api.py --fixtures benchmarks/fixtures --port 8765
+    CONGRESS_API_BASE=http://127.0.0.1:8765/v3 streamlit run src/app.py
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+# Top-level list key for each paginated sub-resource
+LIST_KEYS = {
+    'actions': 'actions',
+    'cosponsors': 'cosponsors',
+    'titles': 'titles',
+    'text': 'textVersions',
+    'committees': 'committees',
+    'amendments': 'amendments',
+    'relatedbills': 'relatedBills',
+    'subjects': 'subjects.legislativeSubjects'
+}
+
+def _get_list(payload, key):
+    """
+    Follow a dotted key ('subjects.legislativeSubjects') to a list, or None
+    """
+    for part in key.split('.'):
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(part)
+    return payload if isinstance(payload, list) else None
+
+def _with_list(payload, key, items):
+    """
+    Copy of payload with the list at a dotted key replaced
+    """
+    head, _, rest = key.partition('.')
+    page = dict(payload)
+    page[head] = _with_list(payload[head], rest, items) if rest else items
+    return page
+
+def fixture_path(root, path):
+    """
+    Map an API path (without /v3 and query string) to a fixture file
+    """
+    return os.path.join(root, *path.strip('/').split('/')) + '.json'
+
+def paginate(payload, resource, limit, offset):
+    """
+    Slice a list response the way the real API does
+    """
+    key = LIST_KEYS.get(resource)
+    if key is None and isinstance(payload.get('bills'), list):
+        key = 'bills'  # /bill/{congress}/{type} listing
+    items = _get_list(payload, key) if key else None
+    if items is None:
+        return payload
+    page = _with_list(payload, key, items[offset:offset + limit])
+    page['pagination'] = {'count': len(items)}
+    if offset + limit < len(items):
+        page['pagination']['next'] = f'?offset={offset + limit}&limit={limit}'
+    return page
+
+def make_handler(root, delay=0.0):
+    """
+    Build a request handler class bound to a fixtures directory
+    """
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+
+            parsed = urlparse(self.path)
+            path = parsed.path
+            if path.startswith('/v3'):
+                path = path[3:]
+            query = parse_qs(parsed.query)
+
+            file_path = fixture_path(root, path)
+            if not os.path.exists(file_path):
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            etag = '"' + hashlib.sha1(raw).hexdigest() + '"'
+            last_modified = formatdate(os.path.getmtime(file_path), usegmt=True)
+
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                return
+
+            limit = int(query.get('limit', ['20'])[0])
+            offset = int(query.get('offset', ['0'])[0])
+            resource = path.strip('/').split('/')[-1]
+            body = json.dumps(paginate(json.loads(raw), resource, limit, offset)).encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FixtureHandler
+
+class FixtureServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections (1s SYN retry) when a
+    # concurrent client opens dozens at once, which skews latency measurements
+    request_queue_size = 128
+
+def serve(root, host='127.0.0.1', port=8765, delay=0.0, background=False):
+    """
+    Serve fixtures; with background=True run in a daemon thread and return the server
+    """
+    server = FixtureServer((host, port), make_handler(root, delay))
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"Serving Congress.gov fixtures from {root} on http://{host}:{server.server_port}/v3")
+    server.serve_forever()
+
+def record_bill(bill_id, congress=118, bill_type='hr', root='benchmarks/fixtures',
+                resources=('titles', 'actions', 'cosponsors', 'subjects', 'text')):
+    """
+    Record live API responses for one bill into the fixture layout.
+    List endpoints are fetched in full so the stand-in can paginate them.
+    """
+    from data_fetch import CONGRESS_API_KEY, CONGRESS_API_BASE
+
+    base = f'bill/{congress}/{bill_type}/{bill_id}'
+    targets = [base] + [f'{base}/{r}' for r in resources]
+    for target in targets:
+        resource = target.split('/')[-1]
+        key = LIST_KEYS.get(resource)
+        payload = None
+        offset = 0
+        while True:
+            url = f'{CONGRESS_API_BASE}/{target}?api_key={CONGRESS_API_KEY}&limit=250&offset={offset}'
+            response = requests.get(url)
+            if response.status_code != 200:
+                print(f"Error recording {target}: {response.status_code}")
+                break
+            data = response.json()
+            data.pop('request', None)
+            if payload is None or key is None:
+                payload = data
+            else:
+                _get_list(payload, key).extend(_get_list(data, key) or [])
+            count = data.get('pagination', {}).get('count', 0)
+            offset += 250
+            if key is None or offset >= count:
+                break
+
+        if payload is not None:
+            payload.pop('pagination', None)
+            file_path = fixture_path(root, target)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local Congress.gov API stand-in')
+    parser.add_argument('--fixtures', default='benchmarks/fixtures')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='Simulated latency per request (seconds)')
+    parser.add_argument('--record', nargs='*', metavar='CONGRESS/TYPE/NUMBER',
+                        help='Record these bills from the live API instead of serving')
+    args = parser.parse_args()
+
+    if args.record:
+        for ref in args.record:
+            congress, bill_type, number = ref.split('/')
+            record_bill(number, int(congress), bill_type.lower(), root=args.fixtures)
+    else:
+        serve(args.fixtures, args.host, args.port, args.delay)
@@ -0,0 +1,344 @@
+"""
+Interned member table and sparse bill x member incidence matrix.
+
+Every sponsor/cosponsor is interned once (keyed by bioguide ID) and each bill
+becomes a row of a scipy CSR matrix whose entries are the member's role on the
+bill (ROLE_SPONSOR / ROLE_COSPONSOR). Shared-cosponsor lookups, per-member
+outcome rates and co-sponsorship networks are then sparse products instead of
+rescans of the harvested data.
+
+The index is built incrementally from the extraction checkpoint
+(src/extract_pipeline.py) or from fetch_cosponsors() results, and saved as a
+single .npz file.
+
+Usage:
+    python src/member_index.py --build --congresses 113-118
+    python src/member_index.py --similar 118-hr-1234
+    python src/member_index.py --member S001234
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from normalize import normalize
+
+MEMBER_INDEX_PATH = 'data/member_index.npz'
+
+ROLE_COSPONSOR = 1
+ROLE_SPONSOR = 2
+
+MEMBER_FIELDS = ['bioguide_id', 'name', 'party', 'state']
+
+def normalize_bill_key(bill_key):
+    """
+    '118-hr-1' and '118-HR-1' refer to the same bill
+    """
+    return str(bill_key).upper()
+
+def member_key(bioguide_id='', name='', state='', district=''):
+    """
+    Stable member key: the bioguide ID when we have one, else name|state|district
+    """
+    if bioguide_id:
+        return bioguide_id
+    return f"{name}|{state}|{district}"
+
+def _members(cosponsors, sponsors):
+    """
+    (member_key, name, party, state, role) for normalized cosponsor dicts and a
+    raw sponsors field (any shape normalize() accepts)
+    """
+    people = [(c, ROLE_COSPONSOR) for c in cosponsors]
+    people += [(s, ROLE_SPONSOR) for s in normalize('sponsors', sponsors)]
+    return [(member_key(p['bioguide_id'], p['name'], p['state'], p['district']), p['name'], p['party'], p['state'], role)
+            for p, role in people]
+
+class MemberIndex:
+    """
+    Interned members and bills plus their CSR incidence matrix
+    """
+
+    def __init__(self):
+        self.member_ids = {}
+        self.members = {field: [] for field in MEMBER_FIELDS}
+        self.bill_ids = {}
+        self.bills = []
+        # Per-bill member columns and roles; the CSR matrix is rebuilt lazily
+        self._entries = {}
+        self._matrix = None
+        self._binary = None
+        self._by_member = None
+
+    def __len__(self):
+        return len(self.bills)
+
+    @property
+    def n_members(self):
+        return len(self.members['bioguide_id'])
+
+    def intern_member(self, key, name='', party='', state=''):
+        """
+        Column for a member, adding it on first sight
+        """
+        col = self.member_ids.get(key)
+        if col is None:
+            col = self.n_members
+            self.member_ids[key] = col
+            for field, value in zip(MEMBER_FIELDS, (key, name, party, state)):
+                self.members[field].append(value or '')
+        return col
+
+    def intern_bill(self, bill_key):
+        """
+        Row for a bill, adding it on first sight
+        """
+        bill_key = normalize_bill_key(bill_key)
+        row = self.bill_ids.get(bill_key)
+        if row is None:
+            row = len(self.bills)
+            self.bill_ids[bill_key] = row
+            self.bills.append(bill_key)
+        return row
+
+    def set_bill_members(self, bill_key, members):
+        """
+        Replace a bill's members with an iterable of (member_key, name, party, state, role)
+        """
+        row = self.intern_bill(bill_key)
+        roles = {}
+        for key, name, party, state, role in members:
+            col = self.intern_member(key, name, party, state)
+            roles[col] = max(role, roles.get(col, 0))
+        cols = np.fromiter(roles.keys(), dtype=np.int32, count=len(roles))
+        self._entries[row] = (cols, np.fromiter(roles.values(), dtype=np.int8, count=len(roles)))
+        self._matrix = self._binary = self._by_member = None
+        return row
+
+    def add_raw(self, bill_key, raw):
+        """
+        Index one extraction payload ({'bill': ..., 'cosponsors': [...]})
+        """
+        bill = raw.get('bill') or {}
+        cosponsors = normalize('cosponsors', raw.get('cosponsors'))
+        return self.set_bill_members(bill_key, _members(cosponsors, bill.get('sponsors')))
+
+    def add_cosponsors(self, bill_key, cosponsors, sponsor=None):
+        """
+        Index fetch_cosponsors() records (or a cosponsors DataFrame), optionally
+        with the sponsor(s) from the /bill payload fetch_bill reads (bill['sponsors'])
+        """
+        if isinstance(cosponsors, pd.DataFrame):
+            if 'bioguide_id' not in cosponsors.columns:
+                cosponsors = cosponsors.assign(bioguide_id='')
+            cosponsors = cosponsors.fillna({'bioguide_id': ''}).itertuples(index=False)
+        cosponsors = [{'bioguide_id': c.bioguide_id, 'name': c.name, 'party': c.party, 'state': c.state,
+                       'district': c.district} for c in cosponsors or []]
+        return self.set_bill_members(bill_key, _members(cosponsors, sponsor))
+
+    def build_from_checkpoint(self, store, congresses=None):
+        """
+        Fold every extracted bill in a CheckpointStore into the index
+        """
+        for bill_key, raw in store.iter_raw(congresses):
+            self.add_raw(bill_key, raw)
+        return self
+
+    @property
+    def matrix(self):
+        """
+        bills x members CSR matrix of roles
+        """
+        if self._matrix is None:
+            n_rows = len(self.bills)
+            counts = np.zeros(n_rows + 1, dtype=np.int64)
+            for row, (cols, _) in self._entries.items():
+                counts[row + 1] = len(cols)
+            indptr = np.cumsum(counts)
+            indices = np.empty(indptr[-1], dtype=np.int32)
+            data = np.empty(indptr[-1], dtype=np.int8)
+            for row, (cols, roles) in self._entries.items():
+                indices[indptr[row]:indptr[row + 1]] = cols
+                data[indptr[row]:indptr[row + 1]] = roles
+            self._matrix = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, self.n_members))
+            self._matrix.sort_indices()
+        return self._matrix
+
+    @property
+    def binary(self):
+        """
+        0/1 version of the matrix for counting shared members
+        """
+        if self._binary is None:
+            self._binary = self.matrix.astype(bool).astype(np.int32)
+        return self._binary
+
+    @property
+    def by_member(self):
+        """
+        CSC copy for column (member) lookups
+        """
+        if self._by_member is None:
+            self._by_member = self.matrix.tocsc()
+        return self._by_member
+
+    def member_frame(self):
+        """
+        Interned members as a DataFrame (row position = matrix column)
+        """
+        return pd.DataFrame(self.members)
+
+    def bill_members(self, bill_key):
+        """
+        Members on one bill with their roles
+        """
+        row = self.bill_ids.get(normalize_bill_key(bill_key))
+        if row is None:
+            return pd.DataFrame(columns=MEMBER_FIELDS + ['role'])
+        cols, roles = self._entries.get(row, (np.empty(0, np.int32), np.empty(0, np.int8)))
+        members = self.member_frame().iloc[cols].reset_index(drop=True)
+        members['role'] = np.where(roles == ROLE_SPONSOR, 'sponsor', 'cosponsor')
+        return members
+
+    def bills_sharing(self, bill_key, min_shared=1, top=20):
+        """
+        Bills sharing sponsors/cosponsors with a bill, most shared first
+        """
+        row = self.bill_ids.get(normalize_bill_key(bill_key))
+        if row is None:
+            return pd.DataFrame(columns=['bill_id', 'shared_members', 'jaccard'])
+
+        # Walk the member columns of this bill instead of multiplying the whole matrix
+        cols = self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]
+        by_member = self.by_member
+        rows = np.concatenate([by_member.indices[by_member.indptr[c]:by_member.indptr[c + 1]] for c in cols] or
+                              [np.empty(0, np.int32)])
+        shared = np.bincount(rows, minlength=len(self.bills))
+        shared[row] = 0
+
+        candidates = np.flatnonzero(shared >= min_shared)
+        sizes = np.diff(self.matrix.indptr)
+        union = sizes[candidates] + len(cols) - shared[candidates]
+        jaccard = shared[candidates] / np.maximum(union, 1)
+        top_rows = candidates[np.lexsort((-jaccard, -shared[candidates]))[:top]]
+        return pd.DataFrame({
+            'bill_id': [self.bills[r] for r in top_rows],
+            'shared_members': shared[top_rows],
+            'jaccard': shared[top_rows] / np.maximum(sizes[top_rows] + len(cols) - shared[top_rows], 1)
+        })
+
+    def member_bills(self, key, role=None):
+        """
+        Bill keys a member sponsored or cosponsored (role=ROLE_SPONSOR/ROLE_COSPONSOR to filter)
+        """
+        col = self.member_ids.get(key)
+        if col is None:
+            return []
+        column = self.by_member[:, col]
+        rows = column.indices if role is None else column.indices[column.data == role]
+        return [self.bills[r] for r in np.sort(rows)]
+
+    def member_stats(self, outcomes):
+        """
+        Per-member bill counts and pass rates.
+        outcomes maps bill keys to passed (1), failed (0) or pending (-1).
+        """
+        outcomes = pd.Series(outcomes)
+        outcomes.index = outcomes.index.map(normalize_bill_key)
+        passed = outcomes.reindex(self.bills).fillna(-1).to_numpy()
+
+        binary = self.binary.T.tocsr()
+        known = (passed >= 0).astype(np.int32)
+        stats = self.member_frame()
+        stats['bills'] = np.diff(binary.indptr)
+        stats['sponsored'] = np.asarray((self.matrix == ROLE_SPONSOR).sum(axis=0)).ravel()
+        stats['decided'] = binary @ known
+        stats['passed'] = binary @ (passed == 1).astype(np.int32)
+        stats['pass_rate'] = stats['passed'] / stats['decided'].where(stats['decided'] > 0)
+        return stats
+
+    def co_sponsorship(self):
+        """
+        members x members matrix of bills shared (diagonal = bills per member)
+        """
+        return (self.binary.T @ self.binary).tocsr()
+
+    def to_networkx(self, min_shared=1):
+        """
+        Weighted co-sponsorship graph for network features
+        """
+        import networkx as nx
+
+        co = sparse.triu(self.co_sponsorship(), k=1).tocoo()
+        keep = co.data >= min_shared
+        graph = nx.Graph()
+        frame = self.member_frame()
+        graph.add_nodes_from((i, row) for i, row in enumerate(frame.to_dict('records')))
+        graph.add_weighted_edges_from(zip(co.row[keep].tolist(), co.col[keep].tolist(), co.data[keep].tolist()))
+        return graph
+
+    def save(self, path=MEMBER_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        matrix = self.matrix
+        np.savez_compressed(
+            path,
+            indptr=matrix.indptr, indices=matrix.indices, data=matrix.data,
+            bills=np.asarray(self.bills, dtype=str),
+            **{f'member_{field}': np.asarray(values, dtype=str) for field, values in self.members.items()}
+        )
+
+    @classmethod
+    def load(cls, path=MEMBER_INDEX_PATH):
+        """
+        Load a saved index; returns an empty index if the file doesn't exist
+        """
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with np.load(path, allow_pickle=False) as f:
+            index.bills = f['bills'].tolist()
+            index.bill_ids = {b: i for i, b in enumerate(index.bills)}
+            index.members = {field: f[f'member_{field}'].tolist() for field in MEMBER_FIELDS}
+            index.member_ids = {k: i for i, k in enumerate(index.members['bioguide_id'])}
+            indptr, indices, data = f['indptr'], f['indices'], f['data']
+        for row in range(len(index.bills)):
+            start, end = indptr[row], indptr[row + 1]
+            if end > start:
+                index._entries[row] = (indices[start:end], data[start:end])
+        index._matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(index.bills), index.n_members))
+        return index
+
+if __name__ == "__main__":
+    from extract_pipeline import CHECKPOINT_DB, CheckpointStore, parse_congresses
+
+    parser = argparse.ArgumentParser(description='Sparse bill x member index')
+    parser.add_argument('--build', action='store_true', help='Add extracted bills from the checkpoint')
+    parser.add_argument('--congresses', help="Limit --build to these congresses ('113-118' or '117,118')")
+    parser.add_argument('--db', default=CHECKPOINT_DB, help='Extraction checkpoint database')
+    parser.add_argument('--index', default=MEMBER_INDEX_PATH)
+    parser.add_argument('--similar', metavar='BILL', help="Bills sharing members with BILL (e.g. '118-hr-1')")
+    parser.add_argument('--member', metavar='BIOGUIDE_ID', help="A member's bills and pass rate")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    index = MemberIndex.load(args.index)
+    if args.build:
+        store = CheckpointStore(args.db)
+        index.build_from_checkpoint(store, parse_congresses(args.congresses) if args.congresses else None)
+        index.save(args.index)
+        print(f"Indexed {len(index)} bills, {index.n_members} members, {index.matrix.nnz} links")
+
+    if args.similar:
+        print(index.bills_sharing(args.similar, top=args.top).to_string(index=False))
+
+    if args.member:
+        outcomes = {}
+        if os.path.exists(args.db):
+            outcomes = {f['bill_id']: f.get('passed', -1) for f in CheckpointStore(args.db).iter_features()}
+        stats = index.member_stats(outcomes)
+        print(stats[stats['bioguide_id'] == args.member].to_string(index=False))
+        print(', '.join(index.member_bills(args.member)[:args.top]))
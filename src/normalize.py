@@ -0,0 +1,168 @@
+"""
+Declarative normalizer for Congress.gov payloads.
+
+List-valued fields come back in several shapes depending on the endpoint and
+API version: a list, {'item': [...]}, {'item': {...}}, a single bare dict, or
+a {'count': n, 'url': ...} reference with no items at all. as_list() is the
+one place that decides what each shape means, and SCHEMA lists the fields
+pulled out of each entity type, so data_fetch, async_fetch and the extraction
+pipeline read payloads the same way.
+
+normalize(entity, value) walks the value once and returns flat dicts keyed by
+the SCHEMA field names. loads() decodes JSON with orjson when it's installed
+and falls back to the standard library.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class Nested:
+    """
+    Field default marking a nested list of another entity type
+    """
+
+    def __init__(self, entity):
+        self.entity = entity
+
+# entity -> (fields, bare_dict_is_item)
+# fields: output key -> (source key, default); a Nested default normalizes the value as that
+# entity. A source key 'a.b' reads b from the dict at a.
+# bare_dict_is_item says whether a dict without 'item' is a single entity (sponsors, text
+# formats) or a reference to another endpoint, which yields nothing (committees on /bill).
+SCHEMA = {
+    'sponsors': ({
+        'bioguide_id': ('bioguideId', ''),
+        'name': ('fullName', ''),
+        'party': ('party', 'Unknown'),
+        'state': ('state', 'Unknown'),
+        'district': ('district', '')
+    }, True),
+    'cosponsors': ({
+        'bioguide_id': ('bioguideId', ''),
+        'name': ('fullName', ''),
+        'party': ('party', ''),
+        'state': ('state', ''),
+        'district': ('district', ''),
+        'sponsored_date': ('sponsorshipDate', ''),
+        'is_original': ('isOriginalCosponsor', False)
+    }, False),
+    'committees': ({
+        'name': ('name', '')
+    }, False),
+    'subjects': ({
+        'name': ('name', '')
+    }, False),
+    'titles': ({
+        'title_type': ('titleType', ''),
+        'title': ('title', '')
+    }, False),
+    'actions': ({
+        'date': ('actionDate', None),
+        'text': ('text', ''),
+        'type': ('type', ''),
+        'action_code': ('actionCode', ''),
+        'source_system': ('sourceSystem.name', ''),
+        'committees': ('committees', Nested('committees')),
+        'chamber': ('chamber', '')
+    }, False),
+    'formats': ({
+        'type': ('type', ''),
+        'url': ('url', '')
+    }, True),
+    'text_versions': ({
+        'type': ('type', ''),
+        'date': ('date', ''),
+        'formats': ('formats', Nested('formats'))
+    }, False)
+}
+
+def loads(data):
+    """
+    Decode a JSON document (str or bytes), with orjson when available
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def as_list(value, bare_dict_is_item=False):
+    """
+    The items of a list-valued API field, whatever shape it came back in
+    """
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        if 'item' in value:
+            items = value['item']
+            if isinstance(items, list):
+                return items
+            return [items] if isinstance(items, dict) else []
+        return [value] if bare_dict_is_item else []
+    return []
+
+def name_of(value, default='Unknown'):
+    """
+    Name of a {'name': ...} field that is sometimes sent as a plain string (policyArea)
+    """
+    if isinstance(value, dict):
+        return value.get('name', default)
+    elif isinstance(value, str):
+        return value
+    return default
+
+def count_of(value):
+    """
+    Count from a {'count': n, 'url': ...} reference that is sometimes sent as a bare int
+    """
+    if isinstance(value, dict):
+        return value.get('count', 0)
+    elif isinstance(value, int):
+        return value
+    return 0
+
+def _compile(entity, only):
+    fields, bare_dict_is_item = SCHEMA[entity]
+    flat, nested, dotted = [], [], []
+    for key, (source, default) in fields.items():
+        if only is not None and key not in only:
+            continue
+        if isinstance(default, Nested):
+            nested.append((key, source, default.entity))
+        elif '.' in source:
+            dotted.append((key, source.split('.', 1), default))
+        else:
+            flat.append((key, source, default))
+    return tuple(flat), tuple(nested), tuple(dotted), bare_dict_is_item
+
+_COMPILED = {}
+
+def normalize(entity, value, fields=None):
+    """
+    Flat dicts for every entity in value (any of the shapes as_list() accepts).
+    Non-dict items are skipped; missing fields get the SCHEMA default.
+    fields (a tuple of SCHEMA field names) limits the output to those fields.
+    """
+    spec = _COMPILED.get((entity, fields))
+    if spec is None:
+        spec = _COMPILED[(entity, fields)] = _compile(entity, fields)
+    flat, nested, dotted, bare_dict_is_item = spec
+
+    items = as_list(value, bare_dict_is_item)
+    if not nested and not dotted:
+        return [{key: item.get(source, default) for key, source, default in flat}
+                for item in items if isinstance(item, dict)]
+
+    records = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        record = {key: item.get(source, default) for key, source, default in flat}
+        for key, (outer, inner), default in dotted:
+            parent = item.get(outer)
+            record[key] = parent.get(inner, default) if isinstance(parent, dict) else default
+        for key, source, child in nested:
+            record[key] = normalize(child, item.get(source))
+        records.append(record)
+    return records
@@ -0,0 +1,99 @@
+"""
+Leaderboard page: every scored bill of a Congress from the materialized table
+built by src/leaderboard.py. Sorting, filtering and paging all run in SQLite,
+so the page never calls the API or the models.
+"""
+import math
+
+import streamlit as st
+
+from leaderboard import Leaderboard, SORT_COLUMNS, PAGE_SIZE
+
+st.set_page_config(
+    page_title="Congressional Bill Tracker - Leaderboard",
+    page_icon="🏆",
+    layout="wide"
+)
+
+st.title('🏆 Bill Leaderboard')
+
+@st.cache_resource
+def open_leaderboard():
+    return Leaderboard()
+
+board = open_leaderboard()
+congresses = board.congresses()
+if not congresses:
+    st.info("The leaderboard hasn't been built yet. Run `python src/leaderboard.py --congress 118 --once` "
+            "(or without `--once` to keep it refreshing).")
+    st.stop()
+
+col1, col2, col3, col4 = st.columns([1, 2, 2, 2])
+with col1:
+    congress = st.selectbox("Congress", congresses)
+with col2:
+    policy_counts = dict(board.facets(congress, 'policy_area'))
+    policy_areas = st.multiselect("Policy area", list(policy_counts),
+                                  format_func=lambda p: f"{p} ({policy_counts[p]})")
+with col3:
+    party_counts = dict(board.facets(congress, 'sponsor_party'))
+    parties = st.multiselect("Sponsor party", list(party_counts),
+                             format_func=lambda p: f"{p} ({party_counts[p]})")
+with col4:
+    search = st.text_input("Title or bill number", "")
+
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    sort_label = st.selectbox("Sort by", list(SORT_COLUMNS))
+with col2:
+    descending = st.radio("Order", ["Highest first", "Lowest first"], horizontal=True) == "Highest first"
+with col3:
+    page_size = st.selectbox("Rows per page", [25, PAGE_SIZE, 100, 250], index=1)
+
+# Count first so the page number can be clamped to the filtered result
+total = board.count(congress, policy_areas, parties, search)
+pages = max(math.ceil(total / page_size), 1)
+page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+
+page_df, total = board.query(congress, sort=SORT_COLUMNS[sort_label], descending=descending,
+                             policy_areas=policy_areas, parties=parties, search=search,
+                             page=page, page_size=page_size)
+
+first_row = (page - 1) * page_size
+st.markdown(f"**{total:,}** scored bills · showing {first_row + 1:,}–{first_row + len(page_df):,}")
+
+if len(page_df):
+    table = page_df.assign(
+        bill=page_df['bill_type'] + ' ' + page_df['bill_number'],
+        viability=page_df['viability'] * 100,
+        passage=page_df['passage'] * 100,
+        overall_chance=page_df['overall_chance'] * 100
+    )[['bill', 'title', 'sponsor_party', 'policy_area', 'stage', 'viability', 'passage', 'overall_chance',
+       'cosponsor_count', 'action_count', 'latest_action_date', 'latest_action_text']]
+    st.dataframe(
+        table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'bill': 'Bill',
+            'title': st.column_config.TextColumn('Title', width='large'),
+            'sponsor_party': 'Party',
+            'policy_area': 'Policy Area',
+            'stage': 'Model',
+            'viability': st.column_config.ProgressColumn('Viability', format='%.1f%%', min_value=0, max_value=100),
+            'passage': st.column_config.NumberColumn('Passage (if viable)', format='%.1f%%'),
+            'overall_chance': st.column_config.NumberColumn('Overall', format='%.2f%%'),
+            'cosponsor_count': 'Cosponsors',
+            'action_count': 'Actions',
+            'latest_action_date': 'Latest Action',
+            'latest_action_text': st.column_config.TextColumn('Status', width='large')
+        }
+    )
+    st.caption("Enter a bill's number on the main page for the full analysis.")
+else:
+    st.info("No bills match these filters.")
+
+last = board.last_refresh(congress)
+if last:
+    st.caption(f"Last refreshed {last['finished_at'][:16].replace('T', ' ')}: {last['synced']} changed bills synced, "
+               f"{last['scored']} scored. Refreshed by `python src/leaderboard.py --congress {congress}`.")
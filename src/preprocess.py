@@ -0,0 +1,272 @@
+"""
+Preprocessing for the 6-Congress dataset (113th-118th).
+
+Importable version of data/preprocess_6_congress.ipynb. Every step works on
+whole columns (map/groupby/np.select) instead of looping over congresses or
+re-filtering the full frame, and the CSV is read with explicit dtypes so
+counts and flags don't come back as float64/object.
+
+Usage:
+    python src/preprocess.py --input data/bills_with_features_full.csv --output-dir data
+"""
+import os
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Congress end dates
+CONGRESS_END_DATES = {
+    113: datetime(2015, 1, 3),
+    114: datetime(2017, 1, 3),
+    115: datetime(2019, 1, 3),
+    116: datetime(2021, 1, 3),
+    117: datetime(2023, 1, 3),
+    118: datetime(2025, 1, 3)
+}
+
+# Explicit dtypes for the extracted feature CSV (columns not listed are inferred).
+# congress is nullable so a row missing it loads and is reported by validate_data_quality
+CSV_DTYPES = {
+    'congress': 'Int16',
+    'bill_type': 'category',
+    'policy_area': 'category',
+    'sponsor_party': 'category',
+    'sponsor_state': 'category',
+    'sponsor_count': 'float32',
+    'dem_sponsors': 'float32',
+    'rep_sponsors': 'float32',
+    'ind_sponsors': 'float32',
+    'cosponsor_count': 'float32',
+    'dem_cosponsors': 'float32',
+    'rep_cosponsors': 'float32',
+    'ind_cosponsors': 'float32',
+    'original_cosponsor_count': 'float32',
+    'is_bipartisan': 'float32',
+    'bipartisan_ratio': 'float32',
+    'committee_count': 'float32',
+    'action_count': 'float32',
+    'referred_to_committee': 'float32',
+    'reported_by_committee': 'float32',
+    'passed_house': 'float32',
+    'passed_senate': 'float32',
+    'has_amendments': 'float32',
+    'has_vote': 'float32',
+    'subject_count': 'float32',
+    'title_length': 'float32',
+    'title_word_count': 'float32',
+    'passed': 'int8'
+}
+DATE_COLUMNS = ['introduced_date', 'latest_action_date']
+
+NUMERIC_FIELDS = ['action_count', 'cosponsor_count', 'committee_count',
+                  'days_active', 'legislative_velocity']
+BOOLEAN_FIELDS = ['is_bipartisan', 'is_election_year', 'is_first_session']
+CRITICAL_FIELDS = ['bill_id', 'congress', 'bill_type', 'introduced_date', 'passed']
+
+def load_dataset(path='data/bills_with_features_full.csv'):
+    """
+    Load the full extracted dataset with explicit dtypes
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col in header}
+    dates = [col for col in DATE_COLUMNS if col in header]
+    df = pd.read_csv(path, dtype=dtypes)
+    for col in dates:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    print(f"Loaded {len(df)} bills from {df['congress'].nunique()} congresses")
+    return df
+
+def calculate_smart_days_active(df):
+    """
+    Calculate days active using the latest action date instead of current date
+    """
+    df['introduced_date'] = pd.to_datetime(df['introduced_date'], errors='coerce')
+    df['latest_action_date'] = pd.to_datetime(df['latest_action_date'], errors='coerce')
+
+    days_to_latest = (df['latest_action_date'] - df['introduced_date']).dt.days
+    df['days_to_latest_action'] = days_to_latest.fillna(30)
+
+    # Clip to reasonable range (1 day to 2 years)
+    df['days_active'] = df['days_to_latest_action'].clip(1, 730)
+    df['legislative_velocity'] = df['action_count'] / (df['days_active'] + 1)
+
+    if 'days_since_introduction' in df.columns:
+        df = df.drop(columns='days_since_introduction')
+    return df
+
+def identify_outcomes_by_congress(df, current_date=None):
+    """
+    Mark pending bills in ended congresses as failed and categorize failure reasons
+    """
+    current_date = current_date or datetime.now()
+
+    end_dates = df['congress'].map(CONGRESS_END_DATES)
+    congress_ended = (end_dates < current_date).to_numpy()
+    pending = (df['passed'] == -1).to_numpy()
+    newly_failed = congress_ended & pending
+    df['passed'] = np.where(newly_failed, 0, df['passed']).astype('int8')
+
+    marked = pd.Series(newly_failed, index=df.index).groupby(df['congress']).sum()
+    for congress, n_updated in marked[marked > 0].items():
+        print(f"Congress {congress}: Marked {n_updated} pending bills as failed (congress ended)")
+
+    failed = df['passed'] == 0
+    action_count = df['action_count']
+    latest_action = df['latest_action'].fillna('').astype(str).str.lower()
+
+    never_left_committee = failed & ((action_count <= 2) | latest_action.str.contains('referred to', regex=False))
+    some_progress = failed & (action_count > 2) & (action_count <= 10) & ~never_left_committee
+    significant_progress = failed & (
+        (action_count > 10) | latest_action.str.contains('passed|reported')
+    ) & ~some_progress & ~never_left_committee
+
+    df['failure_reason'] = pd.Categorical(
+        np.select(
+            [never_left_committee, some_progress, significant_progress, failed],
+            ['died_in_committee', 'stalled_in_process', 'failed_to_complete', 'congress_ended'],
+            default=None
+        ),
+        categories=['died_in_committee', 'stalled_in_process', 'failed_to_complete', 'congress_ended']
+    )
+
+    outcome_counts = df['passed'].value_counts()
+    print(f"Passed: {outcome_counts.get(1, 0)} ({outcome_counts.get(1, 0) / len(df) * 100:.1f}%)")
+    print(f"Failed: {outcome_counts.get(0, 0)} ({outcome_counts.get(0, 0) / len(df) * 100:.1f}%)")
+    print(f"Pending: {outcome_counts.get(-1, 0)}")
+    return df
+
+def viability_target(df):
+    """
+    The 'viable' training target as defined in models/model.ipynb: passed, or
+    enough activity/support, or a milestone in the latest action
+    """
+    viable = (
+        (df['passed'] == 1) |
+        ((df.get('action_count', 0) >= 6) & (df.get('committee_count', 0) >= 1)) |
+        ((df.get('cosponsor_count', 0) >= 30) & (df.get('action_count', 0) >= 4)) |
+        (df.get('action_count', 0) >= 10) |
+        (df.get('failure_reason', '') == 'failed_to_complete')
+    )
+    if 'latest_action' in df.columns:
+        pattern = '|'.join(['passed', 'reported', 'ordered reported', 'markup', 'hearing held'])
+        viable = viable | df['latest_action'].fillna('').str.lower().str.contains(pattern)
+    return viable.astype(int)
+
+def add_temporal_features(df):
+    """
+    Add temporal features that don't rely on the current date. year_introduced
+    is only an intermediate in the notebook, so an extracted one is dropped too.
+    """
+    introduced = pd.to_datetime(df['introduced_date'], errors='coerce')
+    year_introduced = introduced.dt.year
+
+    df['month_introduced'] = introduced.dt.month
+    df['quarter_introduced'] = introduced.dt.quarter
+    df['is_election_year'] = year_introduced % 2 == 0
+    df['is_first_session'] = year_introduced % 2 == 1
+
+    days_active = df['days_active']
+    df['early_activity'] = df['action_count'] / (days_active.clip(upper=30) + 1)
+    df['sustained_activity'] = df['action_count'] / (days_active.clip(upper=180) + 1)
+    df['committee_engagement_speed'] = df['committee_count'] / (days_active / 30).clip(lower=1)
+    if 'year_introduced' in df.columns:
+        df = df.drop(columns='year_introduced')
+    return df
+
+def validate_data_quality(df):
+    """
+    Remove duplicates, report missing critical fields and coerce column types
+    """
+    duplicates = df.duplicated(subset=['bill_id'])
+    if duplicates.any():
+        print(f"⚠️ Found {duplicates.sum()} duplicate bills - removing...")
+        df = df[~duplicates].copy()
+
+    critical = [f for f in CRITICAL_FIELDS if f in df.columns]
+    missing = df[critical].isna().sum()
+    for field, count in missing[missing > 0].items():
+        print(f"⚠️ Missing {field}: {count} rows")
+
+    numeric = [f for f in NUMERIC_FIELDS if f in df.columns]
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce').fillna(0)
+
+    boolean = [f for f in BOOLEAN_FIELDS if f in df.columns]
+    df[boolean] = df[boolean].astype(bool).astype('int8')
+
+    print("✅ Data validation complete")
+    return df
+
+def analyze_dataset_characteristics(df):
+    """
+    Summarize pass rates by congress, feature completeness and bipartisan effect.
+    Returns the per-congress summary frame.
+    """
+    is_passed = df['passed'].eq(1)
+    by_congress = is_passed.groupby(df['congress']).agg(['mean', 'size'])
+    by_congress.columns = ['pass_rate', 'total_bills']
+    by_congress['pass_rate'] *= 100
+
+    print("\nPass rates by congress:")
+    for congress, row in by_congress.iterrows():
+        print(f"- {congress}th Congress: {row['pass_rate']:.1f}% ({int(row['total_bills'])} bills)")
+
+    print(f"\nOverall statistics:")
+    print(f"- Total bills: {len(df)}")
+    print(f"- Overall pass rate: {is_passed.mean() * 100:.1f}%")
+    print(f"- Bills with known outcomes: {(df['passed'] != -1).sum()}")
+
+    completeness_cols = [c for c in ['action_count', 'cosponsor_count', 'committee_count', 'is_bipartisan']
+                         if c in df.columns]
+    completeness = df[completeness_cols].notna().mean() * 100
+    print("\nFeature completeness:")
+    for col, pct in completeness.items():
+        print(f"- {col}: {pct:.1f}% complete")
+
+    if 'is_bipartisan' in df.columns:
+        rates = df['passed'].groupby(df['is_bipartisan']).mean() * 100
+        print(f"\nBipartisan bill analysis:")
+        print(f"- Bipartisan bills pass rate: {rates.get(1, np.nan):.1f}%")
+        print(f"- Partisan bills pass rate: {rates.get(0, np.nan):.1f}%")
+
+    return by_congress
+
+def create_training_datasets(df, output_dir='data'):
+    """
+    Write the full enhanced dataset and the known-outcome training subset
+    """
+    df.to_csv(os.path.join(output_dir, 'bills_6congress_full_enhanced.csv'), index=False)
+    print(f"Saved full enhanced dataset: {len(df)} bills")
+
+    training_df = df[df['passed'] != -1].copy()
+    training_df.to_csv(os.path.join(output_dir, 'bills_6congress_training.csv'), index=False)
+    print(f"Saved training dataset: {len(training_df)} bills with known outcomes")
+    return training_df
+
+def preprocess(df, current_date=None):
+    """
+    Run every in-memory preprocessing step on a loaded dataset
+    """
+    df = calculate_smart_days_active(df)
+    df = identify_outcomes_by_congress(df, current_date=current_date)
+    df = add_temporal_features(df)
+    df = validate_data_quality(df)
+    return df
+
+def main(input_path='data/bills_with_features_full.csv', output_dir='data'):
+    """
+    Main preprocessing function
+    """
+    df = preprocess(load_dataset(input_path))
+    training_df = create_training_datasets(df, output_dir)
+    analyze_dataset_characteristics(training_df)
+    print("\n✅ PREPROCESSING COMPLETE!")
+    return training_df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Preprocess the 6-congress dataset')
+    parser.add_argument('--input', default='data/bills_with_features_full.csv')
+    parser.add_argument('--output-dir', default='data')
+    args = parser.parse_args()
+    main(args.input, args.output_dir)
@@ -0,0 +1,382 @@
+"""
+Priority-aware token bucket for the Congress.gov API key, shared across processes.
+
+The app, the extraction pipeline, the leaderboard/watchlist refreshes and the
+notebooks all spend the same key budget (5,000 requests/hour). Set
+API_RATE_LIMIT_DB to a SQLite file every process can reach and they draw from
+one bucket stored there:
+- each request takes a token; tokens refill at API_REQUESTS_PER_HOUR and the
+  bucket holds at most API_RATE_BURST of them
+- 'bulk' requests leave the last API_INTERACTIVE_RESERVE tokens alone and
+  stand aside while any 'interactive' request is waiting, so a page load
+  never queues behind a sweep
+- a 429 empties the bucket and blocks everyone for the Retry-After period
+
+Requests are 'interactive' unless the process says otherwise
+(set_default_priority('bulk') in batch jobs, or API_PRIORITY=bulk), or a block
+runs under `with priority('bulk'):`. Grants, waits and 429s are counted per
+minute and priority; quota_usage() and `python src/ratelimit.py` report
+them. Without API_RATE_LIMIT_DB nothing is limited or counted.
+
+Usage:
+    API_RATE_LIMIT_DB=data/api_rate_limit.db streamlit run src/app.py
+    python src/ratelimit.py --window 60
+"""
+import os
+import time
+import asyncio
+import sqlite3
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from telemetry import span
+
+REQUESTS_PER_HOUR = 5000  # Congress.gov per-key budget (API_REQUESTS_PER_HOUR)
+BURST = 50  # bucket capacity (API_RATE_BURST)
+INTERACTIVE_RESERVE = 20  # tokens bulk requests leave for interactive ones (API_INTERACTIVE_RESERVE)
+PRIORITIES = {'interactive': 0, 'bulk': 1}  # lower goes first
+WAITER_TIMEOUT = 5  # seconds before a waiter that stopped polling is ignored
+MIN_POLL = 0.02  # seconds between attempts while waiting
+MAX_POLL = 1.0
+USAGE_RETENTION = 7 * 24 * 60  # minutes of usage rows kept
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    tokens REAL,
+    updated REAL,
+    rate REAL,
+    capacity REAL,
+    blocked_until REAL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    owner TEXT PRIMARY KEY,
+    priority INTEGER,
+    seen REAL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    minute INTEGER,
+    priority TEXT,
+    requests INTEGER DEFAULT 0,
+    wait_seconds REAL DEFAULT 0,
+    max_wait REAL DEFAULT 0,
+    throttled INTEGER DEFAULT 0,
+    PRIMARY KEY (minute, priority)
+);
+"""
+
+_priority = contextvars.ContextVar('api_priority', default=None)
+_default_priority = None
+
+def set_default_priority(name):
+    """
+    Priority for requests from this process that don't set one (threads included)
+    """
+    global _default_priority
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name}; choose one of {', '.join(PRIORITIES)}")
+    _default_priority = name
+
+@contextmanager
+def priority(name):
+    """
+    Run a block's requests at the given priority (follows asyncio tasks, not new threads)
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name}; choose one of {', '.join(PRIORITIES)}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority():
+    return _priority.get() or _default_priority or os.getenv('API_PRIORITY', 'interactive')
+
+class SharedRateLimiter:
+    """
+    Token bucket in a SQLite file. The refill rate and capacity live in the
+    file, so every process sharing it enforces the same budget.
+    """
+
+    def __init__(self, path, requests_per_hour=None, burst=None, reserve=None, priority=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.priority = priority
+        self.reserve = reserve if reserve is not None else float(os.getenv('API_INTERACTIVE_RESERVE', INTERACTIVE_RESERVE))
+        self.total = 0  # tokens granted to this process
+        self._local = threading.local()
+
+        rate = (requests_per_hour or float(os.getenv('API_REQUESTS_PER_HOUR', REQUESTS_PER_HOUR))) / 3600.0
+        capacity = burst or float(os.getenv('API_RATE_BURST', BURST))
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._transaction(conn, lambda: conn.execute(
+            'INSERT OR IGNORE INTO bucket (id, tokens, updated, rate, capacity) VALUES (1, ?, ?, ?, ?)',
+            (capacity, time.time(), rate, capacity)
+        ))
+        if requests_per_hour or burst:
+            # Explicit settings change the budget for everyone sharing the file
+            self._transaction(conn, lambda: conn.execute('UPDATE bucket SET rate = ?, capacity = ? WHERE id = 1',
+                                                         (rate, capacity)))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _transaction(conn, fn):
+        # BEGIN IMMEDIATE takes the write lock up front, so refill-and-take is atomic across processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn()
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    @property
+    def rate(self):
+        """
+        Shared refill rate in requests/second
+        """
+        return self._connect().execute('SELECT rate FROM bucket WHERE id = 1').fetchone()[0]
+
+    def try_acquire(self, priority=None, owner=None, waited=0.0):
+        """
+        Take a token if this priority may have one now. Returns (granted, seconds to
+        wait before trying again). A refused caller is registered as waiting under
+        `owner`, which lower priorities yield to until it is granted.
+        """
+        name = priority or self.priority or current_priority()
+        level = PRIORITIES[name]
+        conn = self._connect()
+
+        def attempt():
+            now = time.time()
+            tokens, updated, rate, capacity, blocked_until = conn.execute(
+                'SELECT tokens, updated, rate, capacity, blocked_until FROM bucket WHERE id = 1').fetchone()
+            tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            # The reserve can't exceed the bucket, or bulk requests would never get a token
+            reserve = min(self.reserve, capacity - 1) if level > 0 else 0
+            ahead = level > 0 and conn.execute('SELECT 1 FROM waiters WHERE priority < ? AND seen > ? LIMIT 1',
+                                               (level, now - WAITER_TIMEOUT)).fetchone()
+            granted = now >= blocked_until and not ahead and tokens >= 1 + reserve
+            if granted:
+                tokens -= 1
+            conn.execute('UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1', (tokens, now))
+
+            if granted:
+                if owner:
+                    conn.execute('DELETE FROM waiters WHERE owner = ?', (owner,))
+                conn.execute(
+                    """INSERT INTO usage (minute, priority, requests, wait_seconds, max_wait) VALUES (?, ?, 1, ?, ?)
+                       ON CONFLICT (minute, priority) DO UPDATE SET requests = requests + 1,
+                           wait_seconds = wait_seconds + excluded.wait_seconds,
+                           max_wait = MAX(max_wait, excluded.max_wait)""",
+                    (int(now // 60), name, waited, waited)
+                )
+                return True, 0.0
+            if owner:
+                conn.execute('INSERT OR REPLACE INTO waiters VALUES (?, ?, ?)', (owner, level, now))
+            if now < blocked_until:
+                return False, blocked_until - now
+            if ahead:
+                return False, MIN_POLL * 5
+            return False, (1 + reserve - tokens) / rate
+
+        granted, wait = self._transaction(conn, attempt)
+        if granted:
+            self.total += 1
+            if self.total % 1000 == 0:
+                self._transaction(conn, lambda: (
+                    conn.execute('DELETE FROM usage WHERE minute < ?', (int(time.time() // 60) - USAGE_RETENTION,)),
+                    conn.execute('DELETE FROM waiters WHERE seen < ?', (time.time() - 60,))
+                ))
+        return granted, min(max(wait, MIN_POLL), MAX_POLL)
+
+    def _owner(self):
+        return f'{os.getpid()}-{threading.get_ident()}-{id(asyncio.current_task()) if _in_loop() else 0}'
+
+    def _withdraw(self, owner):
+        conn = self._connect()
+        self._transaction(conn, lambda: conn.execute('DELETE FROM waiters WHERE owner = ?', (owner,)))
+
+    def acquire(self, priority=None):
+        """
+        Block until a token is granted; returns the seconds spent waiting
+        """
+        granted, wait = self.try_acquire(priority)
+        if granted:
+            return 0.0
+        owner = self._owner()
+        start = time.monotonic()
+        with span('rate_limit_wait', priority=priority or self.priority or current_priority()):
+            try:
+                while not granted:
+                    time.sleep(wait)
+                    granted, wait = self.try_acquire(priority, owner, time.monotonic() - start)
+            finally:
+                if not granted:
+                    self._withdraw(owner)
+        return time.monotonic() - start
+
+    async def acquire_async(self, priority=None):
+        """
+        acquire() for coroutines: waits with asyncio.sleep instead of blocking the loop.
+        Each attempt runs in a worker thread, since BEGIN IMMEDIATE can wait up
+        to the connection timeout while another process holds the file's lock.
+        """
+        granted, wait = await asyncio.to_thread(self.try_acquire, priority)
+        if granted:
+            return 0.0
+        owner = self._owner()
+        start = time.monotonic()
+        with span('rate_limit_wait', priority=priority or self.priority or current_priority()):
+            try:
+                while not granted:
+                    await asyncio.sleep(wait)
+                    granted, wait = await asyncio.to_thread(self.try_acquire, priority, owner,
+                                                            time.monotonic() - start)
+            finally:
+                if not granted:
+                    await asyncio.to_thread(self._withdraw, owner)
+        return time.monotonic() - start
+
+    def throttled(self, retry_after=None, priority=None):
+        """
+        Record a 429: empty the bucket and hold every process off for Retry-After seconds
+        """
+        try:
+            seconds = float(retry_after)
+        except (TypeError, ValueError):
+            seconds = 60.0
+        name = priority or self.priority or current_priority()
+        conn = self._connect()
+
+        def record():
+            now = time.time()
+            conn.execute('UPDATE bucket SET tokens = 0, updated = ?, blocked_until = MAX(blocked_until, ?) WHERE id = 1',
+                         (now, now + seconds))
+            conn.execute(
+                """INSERT INTO usage (minute, priority, throttled) VALUES (?, ?, 1)
+                   ON CONFLICT (minute, priority) DO UPDATE SET throttled = throttled + 1""",
+                (int(now // 60), name)
+            )
+        self._transaction(conn, record)
+
+    def quota_usage(self, window_minutes=60):
+        """
+        Budget and usage over the last window: tokens available now, requests
+        per priority (with average/max wait and 429s), share of the window's budget used
+        """
+        conn = self._connect()
+        now = time.time()
+        tokens, updated, rate, capacity, blocked_until = conn.execute(
+            'SELECT tokens, updated, rate, capacity, blocked_until FROM bucket WHERE id = 1').fetchone()
+        rows = conn.execute(
+            """SELECT priority, SUM(requests), SUM(wait_seconds), MAX(max_wait), SUM(throttled)
+               FROM usage WHERE minute > ? GROUP BY priority""",
+            (int(now // 60) - window_minutes,)
+        ).fetchall()
+        waiting = dict(conn.execute('SELECT priority, COUNT(*) FROM waiters WHERE seen > ? GROUP BY priority',
+                                    (now - WAITER_TIMEOUT,)).fetchall())
+        levels = {level: name for name, level in PRIORITIES.items()}
+
+        by_priority = {
+            name: {'requests': requests, 'avg_wait': wait_seconds / requests if requests else 0.0,
+                   'max_wait': max_wait, 'throttled': throttled, 'waiting': waiting.get(PRIORITIES.get(name), 0)}
+            for name, requests, wait_seconds, max_wait, throttled in rows
+        }
+        for level, count in waiting.items():
+            by_priority.setdefault(levels.get(level, str(level)), {'requests': 0, 'avg_wait': 0.0, 'max_wait': 0.0,
+                                                                   'throttled': 0, 'waiting': count})
+        requests = sum(p['requests'] for p in by_priority.values())
+        budget = rate * 60 * window_minutes
+        return {
+            'requests_per_hour': rate * 3600,
+            'capacity': capacity,
+            'tokens': min(capacity, tokens + max(now - updated, 0) * rate),
+            'blocked_for': max(blocked_until - now, 0.0),
+            'window_minutes': window_minutes,
+            'requests': requests,
+            'budget_used': requests / budget if budget else 0.0,
+            'by_priority': by_priority
+        }
+
+def _in_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_limiter():
+    """
+    The process's shared limiter, or None when API_RATE_LIMIT_DB isn't set
+    """
+    # Read the settings on first use so values from .env (loaded by data_fetch) apply
+    global _shared
+    if _shared is None and os.getenv('API_RATE_LIMIT_DB'):
+        with _shared_lock:
+            if _shared is None:
+                _shared = SharedRateLimiter(os.getenv('API_RATE_LIMIT_DB'))
+    return _shared
+
+def acquire(priority=None):
+    """
+    Wait for a token before one API request; returns immediately when limiting is off
+    """
+    limiter = get_limiter()
+    return limiter.acquire(priority) if limiter is not None else 0.0
+
+async def acquire_async(priority=None):
+    limiter = get_limiter()
+    return await limiter.acquire_async(priority) if limiter is not None else 0.0
+
+async def throttled_async(retry_after=None, priority=None):
+    """
+    throttled() for coroutines, run off the event loop
+    """
+    limiter = get_limiter()
+    if limiter is not None:
+        await asyncio.to_thread(limiter.throttled, retry_after, priority)
+
+def throttled(retry_after=None, priority=None):
+    """
+    Report a 429 from the API to every process sharing the limiter
+    """
+    limiter = get_limiter()
+    if limiter is not None:
+        limiter.throttled(retry_after, priority)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Show or configure the shared Congress.gov API budget')
+    parser.add_argument('--db', default=os.getenv('API_RATE_LIMIT_DB', 'data/api_rate_limit.db'))
+    parser.add_argument('--window', type=int, default=60, help='Usage window in minutes')
+    parser.add_argument('--requests-per-hour', type=int, help='Change the shared budget')
+    parser.add_argument('--burst', type=int, help='Change the bucket capacity')
+    args = parser.parse_args()
+
+    limiter = SharedRateLimiter(args.db, args.requests_per_hour, args.burst)
+    usage = limiter.quota_usage(args.window)
+    print(f"Budget {usage['requests_per_hour']:.0f} requests/hour, {usage['tokens']:.1f} of "
+          f"{usage['capacity']:.0f} tokens available"
+          + (f", blocked for {usage['blocked_for']:.0f}s after a 429" if usage['blocked_for'] else ''))
+    print(f"Last {args.window} min: {usage['requests']} requests ({usage['budget_used']:.0%} of budget)")
+    for name, stats in sorted(usage['by_priority'].items(), key=lambda item: PRIORITIES.get(item[0], 99)):
+        print(f"  {name:<12} {stats['requests']:>6} requests | wait avg {stats['avg_wait']:.2f}s "
+              f"max {stats['max_wait']:.2f}s | {stats['throttled']} x 429 | {stats['waiting']} waiting")
@@ -0,0 +1,75 @@
+"""
+Compact records returned by the fetch layer.
+
+fetch_bill, fetch_bill_actions, fetch_cosponsors and fetch_subjects return
+these slotted dataclasses rather than small DataFrames, so the single-bill
+path reads fields as attributes and a harvested bill costs a few hundred
+bytes. Field names match the columns the DataFrames used to have; call
+to_frame() where a table is actually wanted (display, bulk analysis).
+"""
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+class _Record:
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def to_frame(cls, records):
+        """
+        DataFrame with one row per record and one column per field
+        """
+        columns = list(cls.__slots__)
+        return pd.DataFrame([[getattr(r, name) for name in columns] for r in records], columns=columns)
+
+@dataclass(slots=True)
+class Bill(_Record):
+    bill_id: str
+    title: str = ''
+    short_title: str = ''
+    status: str = ''
+    action_date: str = ''
+    sponsors: str = ''
+    sponsor_parties: str = 'Unknown'
+    sponsor_states: str = ''
+    dem_sponsors: int = 0
+    rep_sponsors: int = 0
+    cosponsor_count: int = 0
+    committees: str = ''
+    policy_area: str = 'Unknown'
+    introduced_date: str = ''
+    congress: int = 118
+    type: str = ''
+    is_bipartisan: bool = False
+    update_date: str = ''
+
+@dataclass(slots=True)
+class Action(_Record):
+    bill_id: str
+    date: str = None
+    text: str = ''
+    type: str = ''
+    action_code: str = ''
+    source_system: str = ''
+    committees: str = ''
+    chamber: str = ''
+
+@dataclass(slots=True)
+class Cosponsor(_Record):
+    bill_id: str
+    bioguide_id: str = ''
+    name: str = ''
+    party: str = ''
+    state: str = ''
+    district: str = ''
+    sponsored_date: str = ''
+    is_original: bool = False
+
+@dataclass(slots=True)
+class Subjects(_Record):
+    subjects: list = field(default_factory=list)
+    policy_area: str = 'Unknown'
+    subject_count: int = 0
@@ -0,0 +1,425 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from features import compile_encoders
+
+MODEL_DIR = 'models'
+DATA_DIR = 'data'
+MODEL_BUNDLE = 'model_bundle.pkl'  # consolidated package, written by --bundle
+MODEL_BUNDLE_MANIFEST = 'model_bundle.json'  # size, mtime and hash of the files it was built from
+STAGES = ['new_bill', 'early_stage', 'progressive']
+OVERALL_PASS_RATE = 2.7  # % of all bills in the training set that passed
+MIN_FINE_BILL_COUNT = 10  # fine bins with fewer bills are too noisy to quote
+PASS_RATE_SOURCES = ['overall', 'bin', 'fine']  # codes returned by PassRateLookup.estimate
+
+def reconstruct_ensemble(rf_model, gb_model, lr_model, ensemble_config):
+    """
+    Reconstruct VotingClassifier from individual models and config
+    """
+    from sklearn.ensemble import VotingClassifier
+
+    # Create a custom ensemble that uses pre-fitted models
+    ensemble = VotingClassifier(
+        estimators=[
+            ('rf', rf_model),
+            ('gb', gb_model),
+            ('lr', lr_model)
+        ],
+        voting=ensemble_config['voting'],
+        weights=ensemble_config['weights']
+    )
+    # Set the fitted flag manually since our estimators are already fitted
+    ensemble.estimators_ = [rf_model, gb_model, lr_model]
+    ensemble.named_estimators_ = {
+        'rf': rf_model,
+        'gb': gb_model,
+        'lr': lr_model
+    }
+    ensemble.classes_ = rf_model.classes_
+    ensemble.le_ = None  # Not used for pre-fitted estimators
+    return ensemble
+
+def load_model_stage(model_type, stage, model_dir=MODEL_DIR):
+    """
+    Load all components for a single model stage from optimized structure
+    """
+    import joblib
+
+    stage_dir = f'{model_dir}/{model_type}_{stage}'
+
+    if not os.path.exists(stage_dir):
+        raise FileNotFoundError(f"Model directory {stage_dir} not found!")
+
+    # Load RF model (separate file), preferring the compacted forest from compact_models.py
+    rf_path = f'{stage_dir}/rf_compact.pkl'
+    if not os.path.exists(rf_path):
+        rf_path = f'{stage_dir}/rf_model.pkl'
+    rf_model = joblib.load(rf_path)
+
+    # Load combined components
+    components = joblib.load(f'{stage_dir}/components.pkl')
+    gb_model = components['gb_model']
+    lr_model = components['lr_model']
+    metadata = components['metadata']
+
+    # Load ensemble config
+    ensemble_config = joblib.load(f'{stage_dir}/ensemble_config.pkl')
+    ensemble = reconstruct_ensemble(rf_model, gb_model, lr_model, ensemble_config)
+
+    # Calibration data is saved alongside but the calibrators aren't reconstructed yet,
+    # so the ensemble is used as the final model
+    final_model = ensemble
+
+    return {
+        'model': final_model,
+        'ensemble': ensemble,
+        'ensemble_weights': ensemble_config['weights'],
+        'rf_model': rf_model,
+        'gb_model': gb_model,
+        'lr_model': lr_model,
+        'scaler': components['scaler'],
+        'selector': components['selector'],
+        'features': metadata['features'],
+        'selected_features': metadata['selected_features'],
+        'threshold': metadata['threshold'],
+        'performance': metadata['performance']
+    }
+
+class PassRateLookup:
+    """
+    Historical pass rate for viability scores, from the viability_pass_rates
+    tables compiled into sorted arrays once so each lookup is a searchsorted.
+
+    Matches the app's original rules: use the closest fine-grained bin when it
+    has at least MIN_FINE_BILL_COUNT bills, else the coarse bin containing the
+    score (min <= score < max), else the overall average.
+    """
+
+    def __init__(self, coarse=None, fine=None, min_bill_count=MIN_FINE_BILL_COUNT):
+        self.coarse = None
+        self.fine = None
+        if coarse is not None and not coarse.empty:
+            coarse = coarse.sort_values('min_viability').reset_index(drop=True)
+            self.coarse = coarse
+            self.bin_min = coarse['min_viability'].to_numpy(dtype=float)
+            self.bin_max = coarse['max_viability'].to_numpy(dtype=float)
+            self.bin_rate = coarse['pass_rate'].to_numpy(dtype=float)
+        if fine is not None and not fine.empty:
+            fine = fine.sort_values('viability_score', kind='stable').reset_index(drop=True)
+            self.fine = fine
+            self.fine_score = fine['viability_score'].to_numpy(dtype=float)
+            self.fine_rate = fine['pass_rate'].to_numpy(dtype=float)
+            self.fine_ok = fine['bill_count'].to_numpy() >= min_bill_count
+
+    def __bool__(self):
+        return self.coarse is not None or self.fine is not None
+
+    def bin_index(self, viability):
+        """
+        Coarse bin per score, -1 where no bin contains it
+        """
+        viability = np.asarray(viability, dtype=float)
+        if self.coarse is None:
+            return np.full(viability.shape, -1)
+        idx = np.searchsorted(self.bin_min, viability, side='right') - 1
+        inside = (idx >= 0) & (viability < self.bin_max[idx.clip(0)])
+        return np.where(inside, idx, -1)
+
+    def fine_index(self, viability):
+        """
+        Closest fine bin per score (ties go to the lower score, like idxmin)
+        """
+        viability = np.asarray(viability, dtype=float)
+        right = np.searchsorted(self.fine_score, viability).clip(1, len(self.fine_score) - 1)
+        left = right - 1
+        pick_right = np.abs(self.fine_score[right] - viability) < np.abs(self.fine_score[left] - viability)
+        return np.where(pick_right, right, left)
+
+    def estimate(self, viability, interpolate=False):
+        """
+        Vectorized pass rate (%) per viability score.
+        Returns (rates, source) where source indexes PASS_RATE_SOURCES.
+        interpolate=True blends linearly between neighbouring fine bins.
+        """
+        viability = np.asarray(viability, dtype=float)
+        rates = np.full(viability.shape, OVERALL_PASS_RATE)
+        source = np.zeros(viability.shape, dtype=np.int8)
+
+        if self.coarse is not None:
+            bins = self.bin_index(viability)
+            has_bin = bins >= 0
+            rates[has_bin] = self.bin_rate[bins[has_bin]]
+            source[has_bin] = 1
+
+        if self.fine is not None and len(self.fine_score) > 1:
+            nearest = self.fine_index(viability)
+            use_fine = self.fine_ok[nearest]
+            if interpolate:
+                fine_rates = np.interp(viability, self.fine_score[self.fine_ok], self.fine_rate[self.fine_ok])
+            else:
+                fine_rates = self.fine_rate[nearest]
+            rates[use_fine] = fine_rates[use_fine]
+            source[use_fine] = 2
+        return rates, source
+
+    def lookup(self, viability, interpolate=False):
+        """
+        Single-score lookup with the matching coarse bin row (or None) for display
+        """
+        rates, source = self.estimate([viability], interpolate)
+        bin_idx = self.bin_index([viability])[0]
+        bin_row = self.coarse.iloc[bin_idx] if bin_idx >= 0 else None
+        return float(rates[0]), PASS_RATE_SOURCES[source[0]], bin_row
+
+def bundle_sources(model_dir=MODEL_DIR, data_dir=DATA_DIR):
+    """
+    Files the consolidated bundle is built from
+    """
+    sources = [f'{model_dir}/metadata.pkl',
+               f'{data_dir}/viability_pass_rates.csv',
+               f'{data_dir}/viability_pass_rates_fine.csv']
+    for model_type in ['viability', 'passage']:
+        for stage in STAGES:
+            stage_dir = f'{model_dir}/{model_type}_{stage}'
+            sources += [f'{stage_dir}/{name}' for name in ['rf_compact.pkl', 'rf_model.pkl', 'components.pkl', 'ensemble_config.pkl']]
+    return [path for path in sources if os.path.exists(path)]
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _manifest_key(path, model_dir, data_dir):
+    # Keyed relative to model_dir/data_dir so the same files match however the dirs are spelled
+    base, prefix = (data_dir, 'data') if path.endswith('.csv') else (model_dir, 'models')
+    return f'{prefix}/{os.path.relpath(path, base)}'
+
+def bundle_manifest(model_dir=MODEL_DIR, data_dir=DATA_DIR):
+    """
+    Size, mtime and content hash of every source file. Size and mtime are the
+    cheap check; the hash covers a fresh checkout, where mtimes mean nothing
+    """
+    manifest = {}
+    for path in bundle_sources(model_dir, data_dir):
+        stat = os.stat(path)
+        manifest[_manifest_key(path, model_dir, data_dir)] = {
+            'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha1': _file_sha1(path)}
+    return manifest
+
+def bundle_is_current(model_dir=MODEL_DIR, data_dir=DATA_DIR, verify=False):
+    """
+    True if the bundle exists and was built from the current component files.
+    Files whose size and mtime match the manifest are trusted without reading
+    them; only files with a new mtime (or every file, with verify=True) are hashed.
+    """
+    bundle_path = f'{model_dir}/{MODEL_BUNDLE}'
+    manifest_path = f'{model_dir}/{MODEL_BUNDLE_MANIFEST}'
+    if not (os.path.exists(bundle_path) and os.path.exists(manifest_path)):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    sources = {_manifest_key(path, model_dir, data_dir): path for path in bundle_sources(model_dir, data_dir)}
+    if set(sources) != set(manifest) or not all(isinstance(entry, dict) for entry in manifest.values()):
+        return False
+
+    touched = False
+    for key, path in sources.items():
+        entry = manifest[key]
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime'] and not verify:
+            continue
+        if _file_sha1(path) != entry['sha1']:
+            return False
+        if stat.st_mtime_ns != entry['mtime']:
+            entry['mtime'] = stat.st_mtime_ns
+            touched = True
+
+    if touched:
+        # Same content under new mtimes (e.g. a fresh checkout): record them so the next start skips the hashing
+        try:
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+        except OSError:
+            pass
+    return True
+
+def build_model_bundle(model_dir=MODEL_DIR, data_dir=DATA_DIR):
+    """
+    Load the package from its component files and save it as one file
+    """
+    import joblib
+
+    package = load_model_package(model_dir, data_dir, use_bundle=False)
+    # Uncompressed: a single sequential read is faster to load than a compressed file
+    joblib.dump(package, f'{model_dir}/{MODEL_BUNDLE}')
+    with open(f'{model_dir}/{MODEL_BUNDLE_MANIFEST}', 'w') as f:
+        json.dump(bundle_manifest(model_dir, data_dir), f, indent=2)
+    return package
+
+def load_model_package(model_dir=MODEL_DIR, data_dir=DATA_DIR, use_bundle=True):
+    """
+    Load every viability/passage stage plus encoders (compiled to lookup
+    tables, see features.CategoryEncoder) and pass-rate tables.
+    Reads the consolidated bundle in one go when it is up to date.
+    """
+    if not os.path.exists(model_dir):
+        raise FileNotFoundError("Models directory not found. Please train the models first.")
+
+    import joblib
+
+    if use_bundle and bundle_is_current(model_dir, data_dir):
+        package = joblib.load(f'{model_dir}/{MODEL_BUNDLE}')
+        # Bundles written before the encoders were compiled still hold the LabelEncoders
+        package['label_encoders'] = compile_encoders(package['label_encoders'])
+        return package
+
+    # Load metadata and encoders
+    metadata_package = joblib.load(f'{model_dir}/metadata.pkl')
+
+    # Load viability pass rate data if available
+    viability_pass_rates = None
+    viability_pass_rates_fine = None
+    if os.path.exists(f'{data_dir}/viability_pass_rates.csv'):
+        viability_pass_rates = pd.read_csv(f'{data_dir}/viability_pass_rates.csv')
+    if os.path.exists(f'{data_dir}/viability_pass_rates_fine.csv'):
+        viability_pass_rates_fine = pd.read_csv(f'{data_dir}/viability_pass_rates_fine.csv')
+
+    viability_models = {}
+    passage_models = {}
+    for stage in STAGES:
+        viability_models[stage] = load_model_stage('viability', stage, model_dir)
+        passage_models[stage] = load_model_stage('passage', stage, model_dir)
+
+    return {
+        'viability_models': viability_models,
+        'passage_models': passage_models,
+        'label_encoders': compile_encoders(metadata_package['label_encoders']),
+        'feature_sets': metadata_package['metadata'].get('feature_sets', {}),
+        'metadata': metadata_package['metadata'],
+        'viability_pass_rates': viability_pass_rates,
+        'viability_pass_rates_fine': viability_pass_rates_fine,
+        'pass_rate_lookup': PassRateLookup(viability_pass_rates, viability_pass_rates_fine)
+    }
+
+def stage_for_days(days_active):
+    """
+    Pick the model stage for each bill the same way the app does
+    """
+    days = np.asarray(days_active, dtype=float)
+    return np.select([days <= 1, days <= 30], ['new_bill', 'early_stage'], default='progressive')
+
+def prepare_stage_input(model, features_df):
+    """
+    Scale and select features for one stage model, keeping selected column names
+    """
+    X = features_df[model['features']].fillna(0)
+    X = X.replace([np.inf, -np.inf], 0)
+    X_scaled = model['scaler'].transform(X)
+    X_selected = X_scaled[:, model['selector'].get_support()]
+    return pd.DataFrame(X_selected, columns=model['selected_features'], index=features_df.index)
+
+def predict_stage(model, features_df):
+    """
+    Run every member of a stage ensemble on a batch of bills in one call each
+    """
+    X_selected_df = prepare_stage_input(model, features_df)
+    rf = model['rf_model'].predict_proba(X_selected_df)[:, 1]
+    gb = model['gb_model'].predict_proba(X_selected_df)[:, 1]
+    lr = model['lr_model'].predict_proba(X_selected_df)[:, 1]
+    ensemble = model['model'].predict_proba(X_selected_df)[:, 1]
+    members = np.vstack([rf, gb, lr])
+    return {
+        'rf': rf,
+        'gb': gb,
+        'lr': lr,
+        'ensemble': ensemble,
+        'low': members.min(axis=0),
+        'high': members.max(axis=0)
+    }
+
+def score_bills(features_df, model_package, stages=None):
+    """
+    Score a feature frame (from features.build_feature_frame) in batch.
+
+    Bills are grouped by stage and each group goes through the viability and
+    passage ensembles once. Passage is only meaningful for viable bills, so
+    overall_chance follows the app: viability * passage when viability >= 0.5,
+    otherwise viability * 0.05.
+    """
+    if stages is None:
+        stages = stage_for_days(features_df['days_active'].values)
+    stages = np.asarray(stages)
+
+    result = pd.DataFrame(index=features_df.index)
+    result['stage'] = stages
+    for col in ['viability', 'viability_low', 'viability_high', 'passage', 'passage_low', 'passage_high']:
+        result[col] = np.nan
+
+    for stage in np.unique(stages):
+        mask = stages == stage
+        if not mask.any():
+            continue
+        group = features_df.loc[mask]
+
+        viability = predict_stage(model_package['viability_models'][stage], group)
+        result.loc[mask, 'viability'] = viability['ensemble']
+        result.loc[mask, 'viability_low'] = viability['low']
+        result.loc[mask, 'viability_high'] = viability['high']
+
+        passage = predict_stage(model_package['passage_models'][stage], group)
+        result.loc[mask, 'passage'] = passage['ensemble']
+        result.loc[mask, 'passage_low'] = passage['low']
+        result.loc[mask, 'passage_high'] = passage['high']
+
+    is_viable = result['viability'].values >= 0.5
+    result['is_viable'] = is_viable
+    result['overall_chance'] = np.where(
+        is_viable,
+        result['viability'].values * result['passage'].values,
+        result['viability'].values * 0.05
+    )
+
+    lookup = model_package.get('pass_rate_lookup')
+    if lookup:
+        result['historical_pass_rate'], _ = lookup.estimate(result['viability'].values)
+
+    return result
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build or time the consolidated model bundle')
+    parser.add_argument('--bundle', action='store_true', help=f'Write {MODEL_DIR}/{MODEL_BUNDLE}')
+    parser.add_argument('--verify', action='store_true', help='Hash every component file instead of trusting size and mtime')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    if args.bundle:
+        # Build through the importable module so PassRateLookup pickles as scoring.PassRateLookup, not __main__
+        import scoring
+        scoring.build_model_bundle(args.model_dir, args.data_dir)
+        bundle_path = f'{args.model_dir}/{MODEL_BUNDLE}'
+        print(f"Wrote {bundle_path} ({os.path.getsize(bundle_path) / 1e6:.1f} MB)")
+
+    if args.verify:
+        current = bundle_is_current(args.model_dir, args.data_dir, verify=True)
+        print(f"Bundle {'matches' if current else 'does not match'} the component files")
+
+    for use_bundle in [False, True]:
+        if use_bundle and not bundle_is_current(args.model_dir, args.data_dir):
+            print("Bundle missing or stale; run with --bundle")
+            continue
+        start = time.perf_counter()
+        load_model_package(args.model_dir, args.data_dir, use_bundle=use_bundle)
+        label = 'bundle' if use_bundle else 'component files'
+        print(f"Load from {label}: {time.perf_counter() - start:.2f}s")
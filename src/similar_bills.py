@@ -0,0 +1,204 @@
+"""
+Nearest-neighbor search over historical bills.
+
+The training bills are pushed through the same feature frame, scaler and
+feature selector as a live bill (the progressive viability model, which has
+the fullest feature set), and the resulting vectors are saved as a float32
+.npy together with their squared norms. Both are memory-mapped at load time,
+so nothing is built or copied per process: a top-k query is one exact
+brute-force pass (a matrix-vector product over the mapped vectors, a few
+milliseconds for the ~77k training bills), with the final candidates
+re-ranked in float64. Outcomes and titles for each historical bill are kept
+alongside in a small .npz.
+
+Usage:
+    python src/similar_bills.py --build --training data/bills_6congress_training.csv
+    python src/similar_bills.py --query 118-HR-1234 --k 10
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from features import build_feature_frame
+from scoring import load_model_package, prepare_stage_input
+
+SIMILAR_DIR = 'data/similar_bills'
+TRAINING_PATH = 'data/bills_6congress_training.csv'
+INDEX_MODEL = ('viability', 'progressive')
+
+# Per-bill columns kept next to the vectors for display
+META_COLUMNS = ['bill_id', 'title', 'congress', 'passed', 'failure_reason',
+                'days_active', 'action_count', 'cosponsor_count', 'policy_area']
+
+def historical_raw_features(df):
+    """
+    Map training-set columns onto the raw inputs build_feature_frame expects,
+    with the same clipping the training notebook applies
+    """
+    def col(name, default):
+        if name in df.columns:
+            return df[name].fillna(default)
+        return pd.Series(default, index=df.index)
+
+    sponsor_count = (col('dem_sponsors', 0) + col('rep_sponsors', 0) + col('ind_sponsors', 0)).clip(1, 10)
+    cosponsor_count = col('cosponsor_count', 0)
+    dem_total = col('dem_sponsors', 0) + col('dem_cosponsors', 0)
+    rep_total = col('rep_sponsors', 0) + col('rep_cosponsors', 0)
+    party_dominance = ((dem_total - rep_total) / (sponsor_count + cosponsor_count + 1)).abs()
+
+    return pd.DataFrame({
+        'sponsor_party': col('sponsor_party', 'Unknown'),
+        'policy_area': col('policy_area', 'Unknown'),
+        'sponsor_count': sponsor_count,
+        'cosponsor_count': cosponsor_count,
+        'original_cosponsor_count': col('original_cosponsor_count', 0),
+        'title_length': col('title_length', 100).clip(10, 500),
+        'title_word_count': col('title_word_count', 20).clip(2, 100),
+        'subject_count': col('subject_count', 1).clip(1, 20),
+        'dem_total': dem_total,
+        'rep_total': rep_total,
+        'bipartisan_score': 1 - party_dominance,
+        'has_bipartisan_support': col('is_bipartisan', 0),
+        'days_active': col('days_active', 30).clip(1, 730),
+        'action_count': col('action_count', 1).clip(1, 100),
+        'committee_count': col('committee_count', 0),
+        'congress': col('congress', 118),
+        'month_introduced': col('month_introduced', 1),
+        'quarter_introduced': col('quarter_introduced', 1),
+        'is_election_year': col('is_election_year', 0).astype(int)
+    }, index=df.index)
+
+def index_vectors(features_df, model_package):
+    """
+    Scaled, selected feature vectors in the index's space (float32)
+    """
+    model_type, stage = INDEX_MODEL
+    model = model_package[f'{model_type}_models'][stage]
+    return prepare_stage_input(model, features_df).to_numpy(dtype=np.float32)
+
+def build_index(training_path=TRAINING_PATH, model_package=None, output_dir=SIMILAR_DIR):
+    """
+    Vectorize every historical bill and write vectors.npy, norms.npy and bills.npz
+    """
+    model_package = model_package or load_model_package()
+    df = pd.read_csv(training_path)
+    features_df = build_feature_frame(historical_raw_features(df), model_package['label_encoders'])
+    vectors = index_vectors(features_df, model_package)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, 'vectors.npy'), vectors)
+    np.save(os.path.join(output_dir, 'norms.npy'), np.einsum('ij,ij->i', vectors, vectors))
+
+    meta = {}
+    for column in META_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series('', index=df.index)
+        if values.dtype.kind in 'iufb':
+            meta[column] = values.fillna(-1).to_numpy()
+        else:
+            meta[column] = values.fillna('').astype(str).to_numpy(dtype=str)
+    np.savez_compressed(os.path.join(output_dir, 'bills.npz'), **meta)
+
+    print(f"Indexed {len(vectors)} bills ({vectors.shape[1]} features) into {output_dir}")
+    return SimilarBills.load(output_dir)
+
+class SimilarBills:
+    """
+    Memory-mapped historical vectors and norms with exact top-k lookups
+    """
+
+    # float32 candidates re-ranked in float64, so rounding can't reorder the final k
+    RERANK_FACTOR = 4
+
+    def __init__(self, vectors, bills, norms=None):
+        self.vectors = vectors
+        self.bills = bills
+        self.norms = norms if norms is not None else np.einsum('ij,ij->i', vectors, vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @classmethod
+    def load(cls, output_dir=SIMILAR_DIR):
+        """
+        Load a built index; returns None if it hasn't been built
+        """
+        vectors_path = os.path.join(output_dir, 'vectors.npy')
+        norms_path = os.path.join(output_dir, 'norms.npy')
+        bills_path = os.path.join(output_dir, 'bills.npz')
+        if not (os.path.exists(vectors_path) and os.path.exists(bills_path)):
+            return None
+        vectors = np.load(vectors_path, mmap_mode='r')
+        # Indexes built before norms were saved compute them once here
+        norms = np.load(norms_path, mmap_mode='r') if os.path.exists(norms_path) else None
+        with np.load(bills_path, allow_pickle=False) as f:
+            bills = pd.DataFrame({column: f[column] for column in f.files})
+        return cls(vectors, bills, norms)
+
+    def query_vectors(self, vectors, k=10):
+        """
+        Top-k neighbors for already-vectorized bills: (distances, positions),
+        nearest first, as sklearn's tree.query returns them
+        """
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        k = min(k, len(self))
+        n_candidates = min(k * self.RERANK_FACTOR, len(self))
+
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2; |q|^2 is the same for every x so it can't change the ranking
+        scores = self.norms[None, :] - 2 * (queries @ self.vectors.T)
+        candidates = np.argpartition(scores, n_candidates - 1, axis=1)[:, :n_candidates]
+
+        distances = np.empty((len(queries), k))
+        positions = np.empty((len(queries), k), dtype=np.intp)
+        for i, (query, rows) in enumerate(zip(queries.astype(np.float64), candidates)):
+            rows = np.sort(rows)  # ascending, so the mapped rows are read in file order
+            exact = np.sqrt(((self.vectors[rows].astype(np.float64) - query) ** 2).sum(axis=1))
+            order = np.argsort(exact, kind='stable')[:k]
+            distances[i], positions[i] = exact[order], rows[order]
+        return distances, positions
+
+    def query(self, features_df, model_package, k=10):
+        """
+        Most similar historical bills for the first row of a feature frame
+        """
+        distances, positions = self.query_vectors(index_vectors(features_df.iloc[:1], model_package), k)
+        neighbors = self.bills.iloc[positions[0]].reset_index(drop=True)
+        neighbors.insert(0, 'distance', distances[0])
+        return neighbors
+
+def outcome_summary(neighbors):
+    """
+    Pass/fail counts among neighbors with known outcomes
+    """
+    known = neighbors[neighbors['passed'].astype(int) != -1]
+    passed = int((known['passed'].astype(int) == 1).sum())
+    return {
+        'neighbors': len(neighbors),
+        'known': len(known),
+        'passed': passed,
+        'pass_rate': passed / len(known) * 100 if len(known) else np.nan
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Nearest-neighbor index over historical bills')
+    parser.add_argument('--build', action='store_true', help='Build the index from the training CSV')
+    parser.add_argument('--training', default=TRAINING_PATH)
+    parser.add_argument('--output-dir', default=SIMILAR_DIR)
+    parser.add_argument('--query', metavar='BILL_ID', help='Neighbors of a bill already in the index')
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    index = build_index(args.training, output_dir=args.output_dir) if args.build else SimilarBills.load(args.output_dir)
+    if index is None:
+        print(f"No index in {args.output_dir}. Run with --build first.")
+    elif args.query:
+        matches = np.flatnonzero(index.bills['bill_id'].str.upper() == args.query.upper())
+        if not len(matches):
+            print(f"{args.query} is not in the index")
+        else:
+            distances, positions = index.query_vectors(index.vectors[matches[0]], args.k + 1)
+            neighbors = index.bills.iloc[positions[0][1:]].reset_index(drop=True)
+            neighbors.insert(0, 'distance', distances[0][1:])
+            print(neighbors.to_string(index=False))
+            print(outcome_summary(neighbors))
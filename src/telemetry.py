@@ -0,0 +1,170 @@
+"""
+Lightweight span timing for the hot paths.
+
+Wrap a block in `with span('name'):` (or a function in `@timed('name')`)
+and each completed span is:
+- added to the current request's trace, if one was started with
+  start_trace() (the app shows it as a waterfall in a hidden debug panel)
+- logged as one JSON line on the 'billtracker.timing' logger
+  (set TIMING_LOG=1 to print them to stderr)
+- observed in Prometheus histograms/counters when prometheus_client is
+  installed and METRICS_PORT is set (exposed on that port)
+
+Spans cost a couple of perf_counter calls when none of that is enabled.
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger('billtracker.timing')
+if os.getenv('TIMING_LOG'):
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+
+_current_trace = contextvars.ContextVar('billtracker_trace', default=None)
+_current_parent = contextvars.ContextVar('billtracker_span_parent', default=None)
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def _prometheus():
+    """
+    (histogram, error counter) when prometheus_client and METRICS_PORT are available, else None
+    """
+    global _metrics
+    if _metrics is None and METRICS_PORT:
+        with _metrics_lock:
+            if _metrics is None:
+                try:
+                    from prometheus_client import Counter, Histogram, start_http_server
+                except ImportError:
+                    logger.warning("METRICS_PORT is set but prometheus_client is not installed; metrics disabled")
+                    _metrics = False
+                    return None
+                histogram = Histogram('billtracker_span_seconds', 'Duration of timed spans', ['span'],
+                                      buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+                errors = Counter('billtracker_span_errors_total', 'Spans that raised', ['span'])
+                start_http_server(int(METRICS_PORT))
+                _metrics = (histogram, errors)
+    return _metrics or None
+
+class Trace:
+    """
+    Spans recorded during one request, with start offsets relative to the trace start
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def to_frame(self):
+        """
+        Spans as a DataFrame ordered by start time: span, parent, start_ms, duration_ms, error, attrs
+        """
+        import pandas as pd
+
+        columns = ['span', 'parent', 'start_ms', 'duration_ms', 'error', 'attrs']
+        with self._lock:
+            rows = list(self.spans)
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame(rows)[columns].sort_values('start_ms').reset_index(drop=True)
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+def start_trace(name='request'):
+    """
+    Begin collecting spans for the current request (replaces any previous trace)
+    """
+    trace = Trace(name)
+    _current_trace.set(trace)
+    _current_parent.set(None)
+    return trace
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block. Keyword arguments are logged with the span; the block can
+    add more through the yielded dict (e.g. `with span('x') as attrs: attrs['rows'] = n`).
+    """
+    parent = _current_parent.get()
+    parent_token = _current_parent.set(name)
+    error = None
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_parent.reset(parent_token)
+        _record(name, parent, start, end, error, attrs)
+
+def _record(name, parent, start, end, error, attrs):
+    duration_ms = (end - start) * 1000
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add({
+            'span': name,
+            'parent': parent,
+            'start_ms': (start - trace.start) * 1000,
+            'duration_ms': duration_ms,
+            'error': error,
+            'attrs': attrs
+        })
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'span': name, 'parent': parent, 'duration_ms': round(duration_ms, 2),
+                                'error': error, 'thread': threading.current_thread().name, **attrs},
+                               default=str))
+
+    metrics = _prometheus()
+    if metrics:
+        histogram, errors = metrics
+        histogram.labels(span=name).observe(end - start)
+        if error:
+            errors.labels(span=name).inc()
+
+def timed(name=None):
+    """
+    Decorator form of span(), named after the function by default.
+    Coroutine functions are timed until they complete, not until they return a coroutine.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+"""
+Legislative timeline table for the app: date parsing, de-duplication and
+display formatting of a bill's actions, kept out of the Streamlit script so
+it can be reused and benchmarked.
+"""
+from datetime import datetime
+
+import pandas as pd
+
+# Formats the API might return, tried in order before pandas' general parser
+DATE_FORMATS = [
+    '%Y-%m-%d',  # Standard ISO format
+    '%Y-%m-%dT%H:%M:%S',  # ISO with time
+    '%Y-%m-%dT%H:%M:%SZ',  # ISO with UTC
+    '%Y-%m-%dT%H:%M:%S.%fZ',  # ISO with milliseconds
+    '%m/%d/%Y',  # US format
+    '%d/%m/%Y',  # European format
+]
+
+def parse_action_date(date_str):
+    """
+    Parse dates from various formats the API might return
+    """
+    if pd.isna(date_str) or not date_str:
+        return None
+
+    for fmt in DATE_FORMATS:
+        try:
+            return pd.to_datetime(date_str, format=fmt)
+        except:
+            continue
+
+    # If all formats fail, try pandas general parser
+    try:
+        return pd.to_datetime(date_str)
+    except:
+        return None
+
+def build_timeline(actions_df, now=None):
+    """
+    Parse, sort and de-duplicate actions and format them for display.
+    Returns (valid_actions, timeline_df); valid_actions keeps parsed_date for metrics.
+    """
+    now = now or datetime.now()
+
+    # Apply parsing to all dates
+    actions_df['parsed_date'] = actions_df['date'].apply(parse_action_date)
+
+    # Remove any rows with invalid dates
+    valid_actions = actions_df.dropna(subset=['parsed_date']).copy()
+
+    if len(valid_actions) > 0:
+        # Sort by date in descending order (most recent first)
+        valid_actions = valid_actions.sort_values('parsed_date', ascending=False)
+
+    # Remove true duplicates (same date AND same text)
+    # But keep actions that happened on the same date with different text
+    valid_actions['date_str'] = valid_actions['parsed_date'].dt.strftime('%Y-%m-%d')
+    valid_actions = valid_actions.drop_duplicates(subset=['date_str', 'text'], keep='first')
+
+    # Format the data for display
+    timeline_data = []
+    for _, action in valid_actions.iterrows():
+        # Clean and truncate action text
+        action_text = str(action['text']).strip()
+        if len(action_text) > 200:
+            action_text = action_text[:197] + "..."
+
+        # Calculate days ago
+        days_ago = (now - action['parsed_date']).days
+
+        timeline_data.append({
+            'Date': action['parsed_date'].strftime('%B %d, %Y'),
+            'Action': action_text,
+            'Days Ago': days_ago,
+            'Chamber': action.get('source_system', 'Unknown') if 'source_system' in action else 'Congress'
+        })
+
+    return valid_actions, pd.DataFrame(timeline_data)
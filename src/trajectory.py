@@ -0,0 +1,278 @@
+"""
+As-of feature reconstruction and score trajectory for a single bill.
+
+The app scores a bill as of today. replay_features() rebuilds the raw model
+inputs as they stood on every date in the bill's history by replaying its
+action dates and cosponsor sponsorship dates: bill_history() sorts the events
+once and as_of_raw() answers every snapshot date with cumulative searches,
+not a loop per snapshot (backtest.py uses the same two functions for
+point-in-time snapshots of past bills). score_trajectory() then scores all
+snapshots in one batch through scoring.score_bills, so each stage model
+(new_bill, early_stage, progressive) runs once however many events the bill
+has.
+
+The last snapshot (today) reproduces the features the app builds for the
+current score. The "already became law" feature boost the app applies is not
+replayed; the trajectory is the raw model output.
+
+Usage:
+    python src/trajectory.py 118 hr 1234
+"""
+from datetime import datetime
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from features import raw_features_from_bill, build_feature_frame
+from scoring import score_bills
+
+@dataclass(slots=True)
+class BillHistory:
+    """
+    One bill's dated events, sorted for as-of lookups. The cum_* arrays are running
+    cosponsor counts with a leading 0, so cum_dem[k] counts the first k cosponsors.
+    """
+    static: dict
+    start: np.datetime64
+    first_action: np.datetime64
+    action_days: np.ndarray
+    cosponsor_days: np.ndarray
+    cum_dem: np.ndarray
+    cum_rep: np.ndarray
+    cum_original: np.ndarray
+    committee_days: np.ndarray
+    dem_sponsors: int = 0
+    rep_sponsors: int = 0
+
+def _event_days(values):
+    """
+    Parse API dates to datetime64[D], NaT where missing or unparseable
+    """
+    values = [value or None for value in values]
+    try:
+        # Plain YYYY-MM-DD, which is what the API sends, parses without pandas
+        return np.array(values, dtype='datetime64[D]')
+    except ValueError:
+        pass
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce')
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_localize(None)
+    return parsed.values.astype('datetime64[D]')
+
+def _running_count(flags):
+    return np.concatenate([[0], np.cumsum(flags, dtype=np.int64)])
+
+def _committee_days(bill, actions, action_days, start):
+    """
+    Date each of the bill's committees first appears: the first action naming it,
+    else the first referral, else introduction
+    """
+    names = [name.strip() for name in bill.committees.split(',')] if bill is not None and bill.committees else []
+    if not names:
+        return np.array([], dtype='datetime64[D]')
+
+    referral = [day for action, day in zip(actions, action_days)
+                if not np.isnat(day) and 'referred to' in (action.text or '').lower()]
+    fallback = min(referral) if referral else start
+
+    first_seen = {}
+    for action, day in zip(actions, action_days):
+        if np.isnat(day) or not action.committees:
+            continue
+        for name in action.committees.split(', '):
+            if name not in first_seen or day < first_seen[name]:
+                first_seen[name] = day
+    return np.sort(np.array([first_seen.get(name, fallback) for name in names], dtype='datetime64[D]'))
+
+def bill_history(comprehensive_data, congress=118, today=None):
+    """
+    BillHistory from fetch_comprehensive_bill_data output (bill_info, actions,
+    cosponsors and subjects are all that is read)
+    """
+    bill = comprehensive_data['bill_info']
+    actions = comprehensive_data['actions']
+    cosponsors = comprehensive_data['cosponsors']
+    today = today if today is not None else np.datetime64(datetime.now().date(), 'D')
+
+    action_days = _event_days([a.date for a in actions])
+    known_actions = np.sort(action_days[~np.isnat(action_days)])
+    first_action = known_actions[0] if len(known_actions) else np.datetime64('NaT', 'D')
+
+    introduced = _event_days([bill.introduced_date if bill is not None else None])[0]
+    if np.isnat(introduced):
+        introduced = today if np.isnat(first_action) else first_action
+    start = introduced if np.isnat(first_action) else min(introduced, first_action)
+
+    # Cosponsors without a sponsorship date are treated as original (there from the start)
+    cosponsor_days = _event_days([c.sponsored_date for c in cosponsors])
+    cosponsor_days[np.isnat(cosponsor_days)] = start
+    order = np.argsort(cosponsor_days, kind='stable')
+    parties = np.array([c.party for c in cosponsors], dtype=object)[order]
+    original = np.array([bool(c.is_original) for c in cosponsors], dtype=bool)[order]
+
+    return BillHistory(
+        # Everything that doesn't change over the bill's life (party, titles, subjects...)
+        static=raw_features_from_bill(bill, {}, comprehensive_data['subjects'], 1, congress),
+        start=start,
+        first_action=first_action,
+        action_days=known_actions,
+        cosponsor_days=cosponsor_days[order],
+        cum_dem=_running_count(parties == 'D'),
+        cum_rep=_running_count(parties == 'R'),
+        cum_original=_running_count(original),
+        committee_days=_committee_days(bill, actions, action_days, start),
+        dem_sponsors=bill.dem_sponsors if bill is not None else 0,
+        rep_sponsors=bill.rep_sponsors if bill is not None else 0
+    )
+
+def as_of_raw(history, snapshot_days):
+    """
+    Raw feature columns (numpy arrays, one entry per snapshot date) as the bill
+    stood at the end of each date, ready for features.build_feature_frame
+    """
+    snapshot_days = np.asarray(snapshot_days, dtype='datetime64[D]')
+    n = len(snapshot_days)
+    raw = {col: np.full(n, value) for col, value in history.static.items()}
+
+    action_count = np.searchsorted(history.action_days, snapshot_days, side='right')
+    cosponsor_count = np.searchsorted(history.cosponsor_days, snapshot_days, side='right')
+    dem_total = history.dem_sponsors + history.cum_dem[cosponsor_count]
+    rep_total = history.rep_sponsors + history.cum_rep[cosponsor_count]
+    party_total = dem_total + rep_total
+
+    raw['action_count'] = action_count
+    raw['cosponsor_count'] = cosponsor_count
+    raw['original_cosponsor_count'] = history.cum_original[cosponsor_count]
+    raw['dem_total'] = dem_total
+    raw['rep_total'] = rep_total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw['bipartisan_score'] = np.where(party_total > 0, np.minimum(dem_total, rep_total) / party_total * 2, 0.0)
+    raw['committee_count'] = np.searchsorted(history.committee_days, snapshot_days, side='right')
+
+    # Same rule as the app: days since the first action, 1 before there are any
+    if np.isnat(history.first_action):
+        raw['days_active'] = np.ones(n, dtype=np.int64)
+    else:
+        elapsed = (snapshot_days - history.first_action).astype(np.int64)
+        raw['days_active'] = np.where(action_count > 0, elapsed, 1)
+
+    # The app takes these from the scoring date
+    month = snapshot_days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    year = snapshot_days.astype('datetime64[Y]').astype(np.int64) + 1970
+    raw['month_introduced'] = month
+    raw['quarter_introduced'] = (month - 1) // 3 + 1
+    raw['is_election_year'] = (year % 4 == 0).astype(np.int64)
+    return raw
+
+def _event_labels(actions, cosponsor_days, snapshot_days):
+    """
+    Short description of what happened on each snapshot date (for chart hover text)
+    """
+    latest_action = {}
+    for action, day in zip(actions, _event_days([a.date for a in actions])):
+        if not np.isnat(day):
+            latest_action.setdefault(day, action.text or '')
+
+    days, added = np.unique(cosponsor_days, return_counts=True)
+    cosponsors_added = dict(zip(days, added))
+
+    labels = []
+    for day in snapshot_days:
+        parts = []
+        if day in latest_action:
+            text = latest_action[day]
+            parts.append(text if len(text) <= 80 else text[:77] + '...')
+        if day in cosponsors_added:
+            n = cosponsors_added[day]
+            parts.append(f"+{n} cosponsor{'s' if n > 1 else ''}")
+        labels.append('; '.join(parts))
+    return labels
+
+def replay_features(comprehensive_data, congress=118, label_encoders=None, dates=None, now=None):
+    """
+    Model feature frame with one row per as-of date, indexed by date.
+
+    Takes fetch_comprehensive_bill_data output. By default the snapshots are the
+    introduction date, every date with an action or new cosponsor, and today.
+    """
+    now = now or datetime.now()
+    today = np.datetime64(now.date(), 'D')
+    history = bill_history(comprehensive_data, congress, today)
+
+    if dates is None:
+        snapshot_days = np.concatenate([[history.start, today], history.action_days, history.cosponsor_days])
+    else:
+        snapshot_days = _event_days(list(dates))
+        snapshot_days = snapshot_days[~np.isnat(snapshot_days)]
+    snapshot_days = np.unique(snapshot_days)
+    snapshot_days = snapshot_days[(snapshot_days >= history.start) & (snapshot_days <= today)]
+    if not len(snapshot_days):
+        snapshot_days = np.array([today], dtype='datetime64[D]')
+
+    raw = pd.DataFrame(as_of_raw(history, snapshot_days))
+    raw['event'] = _event_labels(comprehensive_data['actions'], history.cosponsor_days, snapshot_days)
+
+    features_df = build_feature_frame(raw, label_encoders)
+    features_df.index = pd.DatetimeIndex(snapshot_days, name='as_of')
+    return features_df
+
+def score_trajectory(comprehensive_data, model_package, congress=118, dates=None, now=None):
+    """
+    Viability/passage scores at every as-of date, one batch call per stage model.
+    Returns the score_bills columns plus the date's counts and event description.
+    """
+    features_df = replay_features(comprehensive_data, congress, model_package.get('label_encoders'), dates, now)
+    scores = score_bills(features_df, model_package)
+    for col in ['days_active', 'action_count', 'cosponsor_count', 'committee_count', 'bipartisan_score', 'event']:
+        scores[col] = features_df[col]
+    return scores
+
+def trajectory_figure(scores):
+    """
+    Plotly line chart of viability, passage and overall chance over time
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for col, name in [('viability', 'Viability'), ('passage', 'Passage (if viable)'), ('overall_chance', 'Overall chance')]:
+        fig.add_trace(go.Scatter(
+            x=scores.index, y=scores[col] * 100, name=name, mode='lines+markers', line_shape='hv',
+            customdata=np.stack([scores['stage'], scores['days_active'], scores['event']], axis=-1),
+            hovertemplate='%{y:.1f}%<br>%{customdata[0]} model, day %{customdata[1]}<br>%{customdata[2]}<extra>' + name + '</extra>'
+        ))
+    for stage_start in scores.index[scores['stage'].ne(scores['stage'].shift())][1:]:
+        fig.add_vline(x=stage_start, line_dash='dot', line_color='gray')
+    fig.update_layout(yaxis_title='Probability (%)', yaxis_range=[0, 100], hovermode='x unified',
+                      height=350, margin=dict(l=20, r=20, t=30, b=20))
+    return fig
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    from data_fetch import fetch_comprehensive_bill_data
+    from scoring import load_model_package, MODEL_DIR, DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Replay a bill's history and score it at every event date")
+    parser.add_argument('congress', type=int)
+    parser.add_argument('bill_type')
+    parser.add_argument('bill_id')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    data = fetch_comprehensive_bill_data(args.bill_id, congress=args.congress, bill_type=args.bill_type)
+    if not data:
+        print(f"Could not fetch {args.bill_type.upper()}.{args.bill_id}")
+        raise SystemExit(1)
+    package = load_model_package(args.model_dir, args.data_dir)
+
+    start = time.perf_counter()
+    scores = score_trajectory(data, package, congress=args.congress)
+    elapsed = time.perf_counter() - start
+
+    with pd.option_context('display.max_rows', None, 'display.width', 160, 'display.max_colwidth', 60):
+        print(scores[['stage', 'days_active', 'action_count', 'cosponsor_count', 'viability', 'passage',
+                      'overall_chance', 'event']].to_string(float_format=lambda v: f'{v:.3f}'))
+    print(f"\n{len(scores)} snapshots scored in {elapsed * 1000:.0f} ms")
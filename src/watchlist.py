@@ -0,0 +1,277 @@
+"""
+Watchlist daemon: polls tracked bills and re-scores only the ones that changed.
+
+Each poll sends a conditional request per bill (ETag / Last-Modified), compares
+latestAction and the cosponsor count with what we saw last time, folds the
+delta into the feature store and batch-scores every changed bill together.
+Scores are appended to a timestamped history table.
+
+Watchlist file format, one bill per line (interval in minutes is optional):
+    118 hr 1234
+    118/s/567 15
+    # comments are ignored
+
+Usage:
+    python src/watchlist.py watchlist.txt --interval 60
+    python src/watchlist.py watchlist.txt --once --api-base http://127.0.0.1:8765/v3
+"""
+import os
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import schedule
+
+import data_fetch
+import ratelimit
+from data_fetch import fetch_bill_status
+from feature_store import FeatureStore, make_bill_id
+from features import build_feature_frame
+from scoring import load_model_package, score_bills
+
+WATCHLIST_DB = os.getenv('WATCHLIST_DB', 'data/watchlist.db')
+DEFAULT_INTERVAL_MINUTES = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_state (
+    bill_id TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    latest_action_date TEXT,
+    latest_action_text TEXT,
+    cosponsor_count INTEGER,
+    last_polled TEXT,
+    last_changed TEXT
+);
+CREATE TABLE IF NOT EXISTS score_history (
+    bill_id TEXT,
+    scored_at TEXT,
+    stage TEXT,
+    days_active INTEGER,
+    viability REAL,
+    viability_low REAL,
+    viability_high REAL,
+    passage REAL,
+    overall_chance REAL,
+    trigger TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_score_history_bill ON score_history (bill_id, scored_at);
+"""
+
+def parse_bill_ref(ref):
+    """
+    Parse '118 hr 1234', '118/hr/1234' or '118-HR-1234' into (congress, bill_type, bill_id)
+    """
+    parts = ref.replace('/', ' ').replace('-', ' ').split()
+    if len(parts) != 3:
+        raise ValueError(f"Unrecognised bill reference: {ref!r}")
+    congress, bill_type, bill_id = parts
+    return int(congress), bill_type.lower(), bill_id
+
+def load_watchlist(path, default_interval=DEFAULT_INTERVAL_MINUTES):
+    """
+    Read a watchlist file into a list of bill dicts
+    """
+    bills = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.replace('/', ' ').split()
+            interval = default_interval
+            if len(parts) == 4:
+                interval = int(parts[3])
+                parts = parts[:3]
+            congress, bill_type, bill_id = parse_bill_ref(' '.join(parts))
+            bills.append({
+                'congress': congress,
+                'bill_type': bill_type,
+                'bill_id': bill_id,
+                'interval': interval
+            })
+    return bills
+
+class Watchlist:
+    """
+    Change detection state plus score history for a set of tracked bills
+    """
+
+    def __init__(self, db_path=WATCHLIST_DB, store=None, model_package=None):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.store = store or FeatureStore()
+        self._model_package = model_package
+
+    @property
+    def model_package(self):
+        if self._model_package is None:
+            self._model_package = load_model_package()
+        return self._model_package
+
+    def _state(self, bill_key):
+        row = self.conn.execute('SELECT * FROM poll_state WHERE bill_id = ?', (bill_key,)).fetchone()
+        return dict(row) if row else None
+
+    def _save_state(self, bill_key, status, changed):
+        now = datetime.now().isoformat()
+        previous = self._state(bill_key) or {}
+        latest_date = status.get('latest_action_date', previous.get('latest_action_date'))
+        latest_text = status.get('latest_action_text', previous.get('latest_action_text'))
+        cosponsor_count = status.get('cosponsor_count', previous.get('cosponsor_count'))
+        with self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO poll_state
+                       (bill_id, etag, last_modified, latest_action_date, latest_action_text,
+                        cosponsor_count, last_polled, last_changed)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (bill_key, status.get('etag'), status.get('last_modified'), latest_date, latest_text,
+                 cosponsor_count, now, now if changed else previous.get('last_changed'))
+            )
+
+    def detect_change(self, bill):
+        """
+        Probe one bill. Returns (changed, status); status is None on error.
+        """
+        bill_key = make_bill_id(bill['bill_id'], bill['congress'], bill['bill_type'])
+        state = self._state(bill_key)
+        status = fetch_bill_status(
+            bill['bill_id'], bill['congress'], bill['bill_type'],
+            etag=state['etag'] if state else None,
+            last_modified=state['last_modified'] if state else None
+        )
+        if status is None or status['not_modified']:
+            return False, status
+        if state is None:
+            return True, status
+        changed = (
+            state['latest_action_date'] != status['latest_action_date']
+            or state['latest_action_text'] != status['latest_action_text']
+            or state['cosponsor_count'] != status['cosponsor_count']
+        )
+        return changed, status
+
+    def poll(self, bills):
+        """
+        Poll a group of bills once and batch re-score the ones that changed
+        """
+        changed = []
+        for bill in bills:
+            bill_key = make_bill_id(bill['bill_id'], bill['congress'], bill['bill_type'])
+            is_changed, status = self.detect_change(bill)
+            if status is None:
+                continue
+            if is_changed:
+                changed.append((bill, bill_key, status))
+            else:
+                self._save_state(bill_key, status, changed=False)
+
+        if not changed:
+            print(f"[{datetime.now():%H:%M:%S}] Polled {len(bills)} bills, no changes")
+            return []
+
+        raws = []
+        triggers = []
+        refreshed = []
+        for bill, bill_key, status in changed:
+            # The probe already fetched the changed /bill record; don't spend a second request on it
+            _, delta = self.store.refresh_bill(bill['bill_id'], bill['congress'], bill['bill_type'],
+                                               bill=status['bill'])
+            raw = self.store.raw_features(bill_key)
+            if raw is None or delta.get('failed'):
+                # Poll state isn't saved, so the change is picked up again next time
+                continue
+            refreshed.append((bill_key, status))
+            raws.append(raw)
+            triggers.append(', '.join(f'{k}={v}' for k, v in delta.items()) or 'bill updated')
+
+        if raws:
+            try:
+                self.record_scores(raws, triggers)
+            except Exception as e:
+                # Leave poll state untouched so the change is picked up again next time
+                print(f"Error scoring changed bills: {str(e)}")
+                return []
+
+        for bill_key, status in refreshed:
+            self._save_state(bill_key, status, changed=True)
+
+        print(f"[{datetime.now():%H:%M:%S}] Polled {len(bills)} bills, re-scored {len(raws)}")
+        return [bill_key for bill_key, _ in refreshed]
+
+    def record_scores(self, raws, triggers):
+        """
+        Batch-score raw feature rows and append them to the score history
+        """
+        package = self.model_package
+        features_df = build_feature_frame(raws, package['label_encoders'])
+        scores = score_bills(features_df, package)
+        scored_at = datetime.now().isoformat()
+
+        rows = [
+            (raw['bill_id'], scored_at, score.stage, int(raw['days_active']), float(score.viability),
+             float(score.viability_low), float(score.viability_high), float(score.passage),
+             float(score.overall_chance), trigger)
+            for raw, score, trigger in zip(raws, scores.itertuples(index=False), triggers)
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO score_history
+                       (bill_id, scored_at, stage, days_active, viability, viability_low,
+                        viability_high, passage, overall_chance, trigger)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+        return scores
+
+    def history(self, bill_key=None):
+        """
+        Score history as a DataFrame, optionally for a single bill
+        """
+        query = 'SELECT * FROM score_history'
+        params = ()
+        if bill_key:
+            query += ' WHERE bill_id = ?'
+            params = (bill_key,)
+        return pd.read_sql_query(query + ' ORDER BY bill_id, scored_at', self.conn, params=params)
+
+def run(bills, watch=None, once=False):
+    """
+    Poll every bill now, then keep polling each interval group on its schedule
+    """
+    watch = watch or Watchlist()
+    watch.poll(bills)
+    if once:
+        return watch
+
+    groups = {}
+    for bill in bills:
+        groups.setdefault(bill['interval'], []).append(bill)
+    for interval, group in groups.items():
+        schedule.every(interval).minutes.do(watch.poll, group)
+
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Poll tracked bills and re-score the ones that changed')
+    parser.add_argument('watchlist', help='Watchlist file, one bill per line')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL_MINUTES,
+                        help='Default polling interval in minutes')
+    parser.add_argument('--once', action='store_true', help='Poll once and exit')
+    parser.add_argument('--db', default=WATCHLIST_DB, help='Watchlist state/history database')
+    parser.add_argument('--api-base', help='Override the Congress.gov API base URL (e.g. a local stand-in)')
+    args = parser.parse_args()
+
+    if args.api_base:
+        data_fetch.CONGRESS_API_BASE = args.api_base.rstrip('/')
+    ratelimit.set_default_priority('bulk')
+
+    run(load_watchlist(args.watchlist, args.interval), Watchlist(args.db), once=args.once)